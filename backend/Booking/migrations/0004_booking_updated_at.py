@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Booking', '0003_bookinghome_average_cost'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookinghome',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='bookinglocation',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -24,6 +24,7 @@ class BookingLocation(models.Model):
     average_cost = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     number_of_people = models.PositiveIntegerField(default=1)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.user.username} → {self.location.location_name}"
@@ -51,6 +52,7 @@ class BookingHome(models.Model):
     average_cost = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     number_of_guests = models.PositiveIntegerField(default=1)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.user.email} → {self.home.location_name}"
@@ -1,11 +1,13 @@
 from rest_framework import viewsets, permissions
+from Location.conditional import ConditionalGetMixin
 from .models import BookingLocation,BookingHome
 from .serializers import BookingLocationSerializer,BookingHomeSerializer
 
-class BookingViewSet(viewsets.ModelViewSet):
+class BookingViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = BookingLocation.objects.all()
     serializer_class = BookingLocationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    conditional_related = ("location",)
 
     def get_queryset(self):
         # Users only see their own bookings
@@ -22,10 +24,11 @@ class BookingViewSet(viewsets.ModelViewSet):
             average_cost=average_cost
         )
 
-class BookingHomeViewSet(viewsets.ModelViewSet):
+class BookingHomeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = BookingHome.objects.all()
     serializer_class = BookingHomeSerializer
     permission_classes = [permissions.IsAuthenticated]
+    conditional_related = ("home",)
 
     def get_queryset(self):
         # Users only see their own bookings
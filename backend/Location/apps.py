@@ -4,3 +4,25 @@ from django.apps import AppConfig
 class LocationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Location'
+
+    def ready(self):
+        from django.db.models.signals import pre_save, post_save, post_delete, post_migrate
+        from .catalog_cache import catalog_changed
+        from .geo import place_saved, place_deleted
+        from .images import image_changed, image_saved
+        from .models import Location, Homes
+        from .search import restore_search_index
+
+        # table rebuilds during migrate drop the SQLite FTS triggers
+        post_migrate.connect(restore_search_index, sender=self, dispatch_uid="location_search_index")
+
+        # keep the in-memory spatial indexes in step with catalog writes
+        for model in (Location, Homes):
+            # placeholders first: the catalog cache bump below must see the final row
+            pre_save.connect(image_changed, sender=model, dispatch_uid=f"image_pre_save_{model.__name__}")
+            post_save.connect(image_saved, sender=model, dispatch_uid=f"image_save_{model.__name__}")
+            post_save.connect(place_saved, sender=model, dispatch_uid=f"geo_save_{model.__name__}")
+            post_delete.connect(place_deleted, sender=model, dispatch_uid=f"geo_delete_{model.__name__}")
+            # cached list/detail responses for the model become unreachable
+            post_save.connect(catalog_changed, sender=model, dispatch_uid=f"catalog_cache_save_{model.__name__}")
+            post_delete.connect(catalog_changed, sender=model, dispatch_uid=f"catalog_cache_delete_{model.__name__}")
@@ -0,0 +1,139 @@
+# Location/catalog_cache.py
+"""Read-through cache of serialized ``Location`` / ``Homes`` list and detail responses.
+
+Entries are keyed on the model, a per-model *version*, the host and the full
+query string, so every page, filter and ordering combination is cached
+separately. ``post_save`` / ``post_delete`` handlers (connected in
+``LocationConfig.ready``) replace a model's version with a fresh token instead
+of deleting keys: entries written under the old version are simply never read
+again and age out through the TTL or LRU. A response computed while a write
+was in flight is stored under the version it started with, so it cannot
+resurrect stale data.
+
+With the ``local`` backend the version lives in process memory and a write only
+invalidates the process that made it; other workers catch up within ``TTL``.
+Use ``BACKEND="django"`` with a shared cache (Redis, Memcached) when several
+processes serve the API.
+"""
+import hashlib
+import threading
+import uuid
+
+from django.conf import settings
+from rest_framework.response import Response
+
+from assistant.cache import LocalBackend, DjangoCacheBackend, _MISSING
+
+DEFAULT_CATALOG_CACHE_SETTINGS = {
+    "ENABLED": True,
+    "BACKEND": "local",          # "local" (in-process LRU) or "django"
+    "CACHE_ALIAS": "default",
+    "MAX_ENTRIES": 2048,
+    "TTL": 5 * 60,               # seconds, per entry
+    "KEY_PREFIX": "catalog",
+}
+
+
+class CatalogCache:
+    def __init__(self, backend, ttl=None, prefix="catalog", enabled=True):
+        self.backend = backend
+        self.ttl = ttl
+        self.prefix = prefix
+        self.enabled = enabled
+        self._counts = {}       # model label -> [hits, misses]
+        self._lock = threading.Lock()
+
+    def _version_key(self, model):
+        return f"{self.prefix}:ver:{model._meta.label_lower}"
+
+    def version(self, model) -> str:
+        version = self.backend.get(self._version_key(model))
+        if version is _MISSING:
+            # an evicted or expired version must never come back as an old one
+            version = self.bump(model)
+        return version
+
+    def bump(self, model) -> str:
+        version = uuid.uuid4().hex[:12]
+        self.backend.set(self._version_key(model), version, None)
+        return version
+
+    def key_for(self, model, request, kind):
+        params = sorted(request.query_params.lists())
+        raw = "|".join([request.get_host(), request.path, repr(params)])
+        digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()
+        return f"{self.prefix}:{model._meta.label_lower}:{self.version(model)}:{kind}:{digest}"
+
+    def _count(self, model, hit):
+        with self._lock:
+            counts = self._counts.setdefault(model._meta.label_lower, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def get_or_render(self, model, request, kind, render):
+        """Return ``(response, hit)``: the cached data for this request, or ``render()``.
+
+        ``render`` returns a DRF ``Response``; only 200 responses are stored.
+        """
+        if not self.enabled:
+            return render(), False
+        key = self.key_for(model, request, kind)
+        data = self.backend.get(key)
+        if data is not _MISSING:
+            self._count(model, True)
+            return Response(data), True
+        self._count(model, False)
+        response = render()
+        if response.status_code == 200:
+            self.backend.set(key, response.data, self.ttl)
+        return response, False
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {}
+            for label, (hits, misses) in self._counts.items():
+                total = hits + misses
+                stats[label] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / total, 4) if total else 0.0,
+                }
+            return stats
+
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            self._counts = {}
+
+
+def build_catalog_cache(config=None) -> CatalogCache:
+    conf = dict(DEFAULT_CATALOG_CACHE_SETTINGS)
+    conf.update(config or {})
+    if conf["BACKEND"] == "django":
+        backend = DjangoCacheBackend(conf["CACHE_ALIAS"])
+    else:
+        backend = LocalBackend(max_entries=conf["MAX_ENTRIES"])
+    return CatalogCache(backend, ttl=conf["TTL"], prefix=conf["KEY_PREFIX"], enabled=conf["ENABLED"])
+
+
+_catalog_cache = None
+_catalog_cache_lock = threading.Lock()
+
+
+def get_catalog_cache() -> CatalogCache:
+    """Return the process-wide catalog cache, building it from settings on first use."""
+    global _catalog_cache
+    if _catalog_cache is None:
+        with _catalog_cache_lock:
+            if _catalog_cache is None:
+                _catalog_cache = build_catalog_cache(getattr(settings, "LOCATION_CATALOG_CACHE", None))
+    return _catalog_cache
+
+
+def reset_catalog_cache():
+    global _catalog_cache
+    with _catalog_cache_lock:
+        _catalog_cache = None
+
+
+def catalog_changed(sender, **kwargs):
+    get_catalog_cache().bump(sender)
@@ -0,0 +1,91 @@
+# Location/conditional.py
+"""Conditional GET (``ETag`` / ``Last-Modified``) for model viewsets.
+
+Validators come from aggregate queries rather than from the rendered body: a
+list is identified by ``COUNT(*)`` and ``MAX(updated_at)`` over the filtered
+queryset, a detail view by the row's ``updated_at``. When a payload embeds
+related rows (a plan's places, a booking's home), their ``MAX(updated_at)`` and
+link count are folded in as well, so editing a place changes the plans that
+show it. A matching ``If-None-Match`` / ``If-Modified-Since`` is answered with
+304 before anything is serialized.
+
+Lists only get an ``ETag``: deleting a row lowers the count but leaves
+``MAX(updated_at)`` where it was (or moves it back), so a ``Last-Modified`` date
+would let ``If-Modified-Since`` answer 304 for a list that lost rows.
+"""
+import hashlib
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    """Adds validators and 304 handling to ``list`` and ``retrieve``.
+
+    Models must have an ``updated_at`` column. ``conditional_related`` names
+    relations (FK or M2M) whose rows appear in the payload and also carry
+    ``updated_at``.
+    """
+    conditional_related = ()
+
+    def conditional_validators(self, queryset):
+        """``(parts, last_modified)`` describing the current state of ``queryset``."""
+        agg = queryset.aggregate(rows=Count("pk"), last=Max("updated_at"))
+        parts = [agg["rows"], agg["last"]]
+        stamps = [agg["last"]]
+        for relation in self.conditional_related:
+            # one query per relation; joining several M2Ms at once would multiply the counts
+            related = queryset.aggregate(links=Count(relation), last=Max(f"{relation}__updated_at"))
+            parts += [relation, related["links"], related["last"]]
+            stamps.append(related["last"])
+        stamps = [s for s in stamps if s is not None]
+        return parts, max(stamps) if stamps else None
+
+    def conditional_response(self, request, queryset, render, dated=True):
+        """Answer 304 or render; ``dated=False`` sends and checks the ETag only."""
+        if request.method not in ("GET", "HEAD"):
+            return render()
+        parts, last_modified = self.conditional_validators(queryset)
+        if not dated:
+            last_modified = None
+        identity = [
+            request.get_full_path(),
+            getattr(request, "accepted_media_type", ""),
+            request.user.pk if request.user.is_authenticated else None,
+            *parts,
+        ]
+        etag = quote_etag(hashlib.sha1(repr(identity).encode("utf-8")).hexdigest())
+        timestamp = int(last_modified.timestamp()) if last_modified is not None else None
+
+        not_modified = get_conditional_response(request._request, etag=etag, last_modified=timestamp)
+        if not_modified is not None:
+            return not_modified
+
+        response = render()
+        if response.status_code == 200:
+            response["ETag"] = etag
+            if timestamp is not None:
+                response["Last-Modified"] = http_date(timestamp)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.conditional_response(
+            request, queryset, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs),
+            dated=False,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        # validate against the row without loading it; a missing row falls through to the 404
+        render = lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.get_queryset()
+        field = queryset.model._meta.pk if self.lookup_field == "pk" else queryset.model._meta.get_field(self.lookup_field)
+        try:
+            value = field.to_python(self.kwargs[lookup_url_kwarg])
+        except (TypeError, ValueError, DjangoValidationError):
+            # not a valid id (``/locations/abc/``): the regular lookup answers 404
+            return render()
+        return self.conditional_response(request, queryset.filter(**{self.lookup_field: value}), render)
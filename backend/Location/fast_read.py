@@ -0,0 +1,148 @@
+# Location/fast_read.py
+"""Fast read path for the catalog list endpoints.
+
+``LocationSerializer`` / ``HomesSerializer`` build a model instance per row, run
+every value through DRF field objects and call ``build_absolute_uri`` twice per
+row (``location_image`` and ``image_url``). ``RowReader`` produces the same JSON
+from ``.values()`` rows: the field list and a converter per field are worked
+out once from the serializer, and the absolute media URL prefix once per
+request.
+
+Serializers with fields the reader does not know how to convert are rejected
+up front (``UnsupportedSerializer``) so callers can keep using DRF for them.
+``python manage.py bench_catalog_serializers`` compares both paths.
+"""
+import decimal
+import threading
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
+from rest_framework import fields as drf_fields
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+from .images import derivative_prefix, image_settings, servable, srcsets
+
+# SerializerMethodFields the reader can produce: name -> (file field, kind)
+METHOD_FIELDS = {
+    "image_url": ("location_image", "file"),
+    "image_srcset": ("location_image", "srcset"),
+}
+
+
+class UnsupportedSerializer(Exception):
+    pass
+
+
+def _datetime(value):
+    value = timezone.localtime(value) if settings.USE_TZ and timezone.is_aware(value) else value
+    text = value.isoformat()
+    return text[:-6] + "Z" if text.endswith("+00:00") else text
+
+
+def _decimal_converter(field):
+    if not getattr(field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING):
+        return None
+    if field.localize or field.normalize_output:
+        return None
+    exponent = decimal.Decimal(1).scaleb(-field.decimal_places)
+    return lambda value: f"{value.quantize(exponent):f}"
+
+
+class RowReader:
+    """Converts ``.values()`` rows into the dicts a ``ModelSerializer`` would return."""
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self.model = serializer_class.Meta.model
+        self.output = []        # (key, source column, kind, converter)
+        self.columns = []
+        for name, field in serializer_class().fields.items():
+            if isinstance(field, serializers.SerializerMethodField):
+                if name not in METHOD_FIELDS:
+                    raise UnsupportedSerializer(f"{serializer_class.__name__}.{name}")
+                self._add(name, *METHOD_FIELDS[name], None)
+            elif isinstance(field, drf_fields.FileField):
+                if not getattr(field, "use_url", api_settings.UPLOADED_FILES_USE_URL):
+                    raise UnsupportedSerializer(f"{serializer_class.__name__}.{name}")
+                self._add(name, field.source, "file", None)
+            elif isinstance(field, drf_fields.DecimalField):
+                converter = _decimal_converter(field)
+                if converter is None:
+                    raise UnsupportedSerializer(f"{serializer_class.__name__}.{name}")
+                self._add(name, field.source, "value", converter)
+            elif isinstance(field, drf_fields.DateTimeField):
+                if getattr(field, "format", api_settings.DATETIME_FORMAT) != drf_fields.ISO_8601:
+                    raise UnsupportedSerializer(f"{serializer_class.__name__}.{name}")
+                self._add(name, field.source, "value", _datetime)
+            elif isinstance(field, (drf_fields.CharField, drf_fields.ChoiceField)):
+                self._add(name, field.source, "value", str)
+            elif isinstance(field, (drf_fields.IntegerField, drf_fields.FloatField, drf_fields.BooleanField)):
+                self._add(name, field.source, "value", None)
+            else:
+                raise UnsupportedSerializer(f"{serializer_class.__name__}.{name}")
+
+    def _add(self, key, column, kind, converter):
+        if column == "*" or "." in column:
+            raise UnsupportedSerializer(f"{self.serializer_class.__name__}.{key}")
+        self.output.append((key, column, kind, converter))
+        if column not in self.columns:
+            self.columns.append(column)
+
+    def media_url(self, request):
+        """Return ``name -> absolute URL`` for this request's media files."""
+        storage = self.model._meta.get_field(METHOD_FIELDS["image_url"][0]).storage
+        if not isinstance(storage, FileSystemStorage):
+            return lambda name: request.build_absolute_uri(storage.url(name))
+        prefix = request.build_absolute_uri(storage.base_url)
+
+        def url_for(name):
+            if ":" in name:
+                # a stored URL rather than a path; urljoin inside storage.url keeps it as is
+                return request.build_absolute_uri(storage.url(name))
+            return prefix + filepath_to_uri(name).lstrip("/")
+
+        return url_for
+
+    def values(self, queryset):
+        """``queryset.values()`` with the serializer's columns, keeping annotations the ordering needs."""
+        extra = [name for name in queryset.query.annotations if name not in self.columns]
+        return queryset.values(*self.columns, *extra)
+
+    def rows(self, rows, request):
+        url_for = self.media_url(request)
+        prefix, conf = derivative_prefix(request), image_settings()
+        output = self.output
+        result = []
+        for row in rows:
+            item = {}
+            for key, column, kind, converter in output:
+                value = row[column]
+                if kind == "file":
+                    item[key] = url_for(value) if value else None
+                elif kind == "srcset":
+                    item[key] = srcsets(prefix, value, conf) if servable(value) else None
+                elif value is None or converter is None:
+                    item[key] = value
+                else:
+                    item[key] = converter(value)
+            result.append(item)
+        return result
+
+
+_readers = {}
+_readers_lock = threading.Lock()
+
+
+def get_row_reader(serializer_class):
+    """Return the cached ``RowReader`` for ``serializer_class``, or None if it needs DRF."""
+    if serializer_class not in _readers:
+        with _readers_lock:
+            if serializer_class not in _readers:
+                try:
+                    _readers[serializer_class] = RowReader(serializer_class)
+                except UnsupportedSerializer:
+                    _readers[serializer_class] = None
+    return _readers[serializer_class]
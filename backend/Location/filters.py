@@ -0,0 +1,102 @@
+# Location/filters.py
+"""Query-string filtering and ordering for the catalog list endpoints.
+
+Supported parameters (all optional):
+
+* ``category`` – one or more categories, comma separated
+* ``city`` / ``country`` – exact match
+* ``min_cost`` / ``max_cost`` – inclusive ``average_cost`` range
+* ``min_rating`` – minimum ``rating``
+* ``ordering`` – one of ``CatalogOrderingFilter.ordering_fields``, ``-`` for descending
+
+The equality filters lead the composite indexes declared on the models
+(``(category, rating)``, ``(city, average_cost)``, ``(country, rating)``), so a
+filtered page is an index range scan however large the catalog gets.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import DecimalField, Value
+from django.db.models.functions import Coalesce
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+
+
+def _decimal_param(params, name):
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        return Decimal(value)
+    except (InvalidOperation, ValueError):
+        raise ValidationError({name: "A number is required."})
+
+
+class CatalogFilter(BaseFilterBackend):
+    params = ("category", "city", "country", "min_cost", "max_cost", "min_rating")
+
+    def is_active(self, request):
+        return any(str(request.query_params.get(name, "")).strip() for name in self.params)
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        categories = [c.strip() for c in params.get("category", "").split(",") if c.strip()]
+        if categories:
+            valid = dict(queryset.model.CATEGORY_CHOICES)
+            unknown = [c for c in categories if c not in valid]
+            if unknown:
+                raise ValidationError({"category": f"Unknown category: {', '.join(unknown)}."})
+            queryset = queryset.filter(category__in=categories)
+        for field in ("city", "country"):
+            value = params.get(field, "").strip()
+            if value:
+                queryset = queryset.filter(**{field: value})
+
+        min_cost = _decimal_param(params, "min_cost")
+        max_cost = _decimal_param(params, "max_cost")
+        min_rating = _decimal_param(params, "min_rating")
+        if min_cost is not None:
+            queryset = queryset.filter(average_cost__gte=min_cost)
+        if max_cost is not None:
+            queryset = queryset.filter(average_cost__lte=max_cost)
+        if min_rating is not None:
+            queryset = queryset.filter(rating__gte=min_rating)
+        return queryset
+
+
+class CatalogOrderingFilter(OrderingFilter):
+    """``?ordering=`` restricted to indexed columns.
+
+    ``CursorPagination`` reads the ordering from this filter, so the cursor
+    follows whatever order the client asked for. Rating and cost are nullable and
+    a cursor cannot point at NULL, so they are ordered through a non-null
+    ``sort_key`` annotation that puts unknown values last in either direction.
+    """
+    ordering_fields = ["created_at", "rating", "average_cost", "location_name"]
+    nullable_fields = {"rating", "average_cost"}
+    SORT_KEY = "sort_key"
+    # beyond any rating or DecimalField(max_digits=10, decimal_places=2) cost
+    LOW, HIGH = Decimal("-1"), Decimal("100000000")
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        # cursor pagination pages on the first field only; keep a single one
+        field = ordering[0]
+        if field.lstrip("-") in self.nullable_fields:
+            return ["-" + self.SORT_KEY if field.startswith("-") else self.SORT_KEY]
+        return [field]
+
+    def requested_field(self, request):
+        params = request.query_params.get(self.ordering_param, "")
+        fields = [f.strip() for f in params.split(",") if f.strip().lstrip("-") in self.ordering_fields]
+        return fields[0] if fields else None
+
+    def filter_queryset(self, request, queryset, view):
+        field = self.requested_field(request)
+        if field and field.lstrip("-") in self.nullable_fields:
+            fallback = self.LOW if field.startswith("-") else self.HIGH
+            queryset = queryset.annotate(**{self.SORT_KEY: Coalesce(
+                field.lstrip("-"), Value(fallback), output_field=DecimalField(max_digits=12, decimal_places=2),
+            )})
+        return super().filter_queryset(request, queryset, view)
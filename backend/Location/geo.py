@@ -0,0 +1,422 @@
+# Location/geo.py
+"""Coordinates, geohash cells and nearest-place queries for the catalog.
+
+Two indexes answer ``nearby`` queries:
+
+* ``geohash`` – every row with coordinates stores a 12-character geohash in an
+  indexed column (kept in step by ``GeohashMixin.save``). A radius query
+  becomes a handful of btree range scans over the cells covering the circle,
+  followed by an exact haversine check. It needs no process memory.
+* ``SpatialIndex`` – an in-memory KD-tree per model over points on the unit
+  sphere, for radius and k-nearest queries without touching the database. Rows
+  saved or deleted after a build are kept in a small overlay until the next
+  rebuild, which is due once the overlay grows past ``MAX_PENDING`` or
+  ``REFRESH_SECONDS`` have elapsed.
+
+Building the tree takes seconds at a million rows, so builds run in a
+background thread (``BACKGROUND``): a stale index keeps serving until its
+replacement is swapped in, and before the first build finishes queries use the
+geohash scan.
+
+``nearby(model, lat, lng, radius_km, k, queryset)`` uses the KD-tree when one
+is ready and falls back to the geohash scan otherwise. ``queryset`` restricts
+the candidates (catalog filters), so a filtered query still returns ``k`` rows
+when that many match.
+"""
+import heapq
+import logging
+import math
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+GEOHASH_LENGTH = 12
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+DEFAULT_GEO_INDEX_SETTINGS = {
+    "ENABLED": True,           # in-memory KD-tree; False means geohash scans only
+    "REFRESH_SECONDS": 600,    # full rebuild interval; 0 disables it
+    "MAX_PENDING": 1000,       # overlay size that triggers a rebuild
+    "BACKGROUND": True,        # build in a thread instead of inside the request
+    "MAX_OVERFETCH": 4096,     # filtered queries: nearest rows fetched before filtering while searching
+}
+
+# unbounded geohash queries widen the radius in these steps until k rows are found
+GEOHASH_SEARCH_RADII_KM = (25, 100, 400, 1600, 6400)
+
+Nearby = namedtuple("Nearby", ["pk", "distance_km"])
+
+
+def geo_index_settings() -> dict:
+    conf = dict(DEFAULT_GEO_INDEX_SETTINGS)
+    conf.update(getattr(settings, "LOCATION_GEO_INDEX", None) or {})
+    return conf
+
+
+def has_coordinates(lat, lng) -> bool:
+    return lat is not None and lng is not None
+
+
+def encode_geohash(lat, lng, length=GEOHASH_LENGTH) -> str:
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    chars = []
+    bit, ch, even = 0, 0, True
+    while len(chars) < length:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                ch = (ch << 1) | 1
+                lng_lo = mid
+            else:
+                ch <<= 1
+                lng_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch = (ch << 1) | 1
+                lat_lo = mid
+            else:
+                ch <<= 1
+                lat_hi = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(_BASE32[ch])
+            bit, ch = 0, 0
+    return "".join(chars)
+
+
+def cell_size(length):
+    """``(lat_degrees, lng_degrees)`` spanned by a geohash cell of ``length`` characters."""
+    bits = 5 * length
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+
+def haversine_km(lat1, lng1, lat2, lng2) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def covering_cells(lat, lng, radius_km):
+    """Geohash prefixes whose cells together cover the circle, or None for "everything".
+
+    Picks the longest prefix whose cells are at least ``radius_km`` across, then
+    takes the cell holding the centre and its eight neighbours.
+    """
+    km_per_deg = math.pi * EARTH_RADIUS_KM / 180
+    cos_lat = max(math.cos(math.radians(min(abs(lat) + radius_km / km_per_deg, 90.0))), 0.0)
+    length = 0
+    for candidate in range(1, GEOHASH_LENGTH + 1):
+        lat_deg, lng_deg = cell_size(candidate)
+        if lat_deg * km_per_deg < radius_km or lng_deg * km_per_deg * cos_lat < radius_km:
+            break
+        length = candidate
+    if length == 0:
+        return None
+    lat_deg, lng_deg = cell_size(length)
+    cells = set()
+    for dlat in (-lat_deg, 0.0, lat_deg):
+        for dlng in (-lng_deg, 0.0, lng_deg):
+            cell_lat = max(-90.0, min(90.0, lat + dlat))
+            cell_lng = (lng + dlng + 180.0) % 360.0 - 180.0
+            cells.add(encode_geohash(cell_lat, cell_lng, length))
+    return sorted(cells)
+
+
+def bounding_box(lat, lng, radius_km) -> Q:
+    """Latitude/longitude ranges containing the circle (empty ``Q`` when it spans the globe)."""
+    km_per_deg = math.pi * EARTH_RADIUS_KM / 180
+    dlat = radius_km / km_per_deg
+    if dlat >= 180.0:
+        return Q()
+    condition = Q(latitude__gte=lat - dlat, latitude__lte=lat + dlat)
+    if lat - dlat <= -90.0 or lat + dlat >= 90.0:
+        # the circle reaches a pole, so every longitude is inside it
+        return condition
+    dlng = dlat / math.cos(math.radians(max(abs(lat - dlat), abs(lat + dlat))))
+    if dlng >= 180.0:
+        return condition
+    west, east = lng - dlng, lng + dlng
+    if west < -180.0:
+        return condition & (Q(longitude__gte=west + 360.0) | Q(longitude__lte=east))
+    if east > 180.0:
+        return condition & (Q(longitude__gte=west) | Q(longitude__lte=east - 360.0))
+    return condition & Q(longitude__gte=west, longitude__lte=east)
+
+
+def geohash_filter(cells) -> Q:
+    # range predicates rather than LIKE so any btree index on ``geohash`` applies
+    condition = Q()
+    for cell in cells:
+        condition |= Q(geohash__gte=cell, geohash__lt=cell + "~")
+    return condition
+
+
+def _unit_vector(lat, lng):
+    p, l = math.radians(lat), math.radians(lng)
+    return (math.cos(p) * math.cos(l), math.cos(p) * math.sin(l), math.sin(p))
+
+
+def _chord(radius_km) -> float:
+    # straight-line distance through the unit sphere for a great-circle distance
+    return 2 * math.sin(min(radius_km / EARTH_RADIUS_KM, math.pi) / 2)
+
+
+def _arc_km(chord) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+def _dist2(a, b):
+    return (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2
+
+
+class KDTree:
+    """Static, array-backed 3-d tree; node ``mid`` of range ``[lo, hi)`` splits on axis ``depth % 3``."""
+
+    def __init__(self, items):
+        # items: iterable of (pk, (x, y, z))
+        self.items = list(items)
+        self._build(0, len(self.items), 0)
+
+    def __len__(self):
+        return len(self.items)
+
+    def _build(self, lo, hi, depth):
+        stack = [(lo, hi, depth)]
+        items = self.items
+        while stack:
+            lo, hi, depth = stack.pop()
+            if hi - lo <= 1:
+                continue
+            axis = depth % 3
+            items[lo:hi] = sorted(items[lo:hi], key=lambda item: item[1][axis])
+            mid = (lo + hi) // 2
+            stack.append((lo, mid, depth + 1))
+            stack.append((mid + 1, hi, depth + 1))
+
+    def nearest(self, point, k, chord=None, exclude=()):
+        """Up to ``k`` closest ``(pk, chord_distance)`` pairs, optionally capped at ``chord``.
+
+        Rows in ``exclude`` are skipped.
+        """
+        bound2 = chord * chord if chord is not None else float("inf")
+        heap = []          # max-heap of (-d2, pk)
+        items = self.items
+
+        def visit(lo, hi, depth):
+            nonlocal bound2
+            if lo >= hi:
+                return
+            mid = (lo + hi) // 2
+            pk, coords = items[mid]
+            d2 = _dist2(point, coords)
+            if d2 <= bound2 and pk not in exclude:
+                heapq.heappush(heap, (-d2, pk))
+                if len(heap) > k:
+                    heapq.heappop(heap)
+                if len(heap) == k:
+                    bound2 = min(bound2, -heap[0][0])
+            diff = point[depth % 3] - coords[depth % 3]
+            near, far = ((lo, mid), (mid + 1, hi)) if diff <= 0 else ((mid + 1, hi), (lo, mid))
+            visit(near[0], near[1], depth + 1)
+            if diff * diff <= bound2:
+                visit(far[0], far[1], depth + 1)
+
+        visit(0, len(items), 0)
+        return sorted(((pk, math.sqrt(-nd2)) for nd2, pk in heap), key=lambda pair: pair[1])
+
+
+class SpatialIndex:
+    """KD-tree over one model's coordinates plus an overlay of rows changed since the build."""
+
+    def __init__(self, model):
+        self.model = model
+        self.tree = KDTree(())
+        self.built_at = None
+        self._pending = {}      # pk -> unit vector, or None once deleted
+        self._lock = threading.RLock()
+
+    def build(self):
+        """Load the tree from the database.
+
+        Writes made while the build runs land in the overlay (the index receives
+        updates from the moment it is created), so none are lost to the snapshot.
+        """
+        rows = self.model.objects.filter(latitude__isnull=False, longitude__isnull=False)
+        tree = KDTree(
+            (pk, _unit_vector(lat, lng)) for pk, lat, lng in rows.values_list("pk", "latitude", "longitude").iterator()
+        )
+        with self._lock:
+            self.tree = tree
+            self.built_at = time.monotonic()
+
+    def update(self, pk, lat, lng):
+        with self._lock:
+            self._pending[pk] = _unit_vector(lat, lng) if has_coordinates(lat, lng) else None
+
+    def remove(self, pk):
+        with self._lock:
+            self._pending[pk] = None
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def query(self, lat, lng, radius_km=None, k=20):
+        """Up to ``k`` ``Nearby`` rows closest to ``(lat, lng)``, within ``radius_km`` if given."""
+        point = _unit_vector(lat, lng)
+        chord = _chord(radius_km) if radius_km is not None else None
+        with self._lock:
+            tree, pending = self.tree, dict(self._pending)
+        # tree entries for changed rows are stale; the overlay holds their current position
+        hits = tree.nearest(point, k, chord, exclude=pending)
+        limit = chord if chord is not None else float("inf")
+        for pk, coords in pending.items():
+            if coords is not None:
+                d = math.sqrt(_dist2(point, coords))
+                if d <= limit:
+                    hits.append((pk, d))
+        hits.sort(key=lambda pair: pair[1])
+        return [Nearby(pk, _arc_km(d)) for pk, d in hits[:k]]
+
+
+def geohash_nearby(model, lat, lng, radius_km, k=20, queryset=None):
+    """Database-only ``nearby``: scan the covering geohash cells, then filter exactly.
+
+    Without ``radius_km`` the radius widens through ``GEOHASH_SEARCH_RADII_KM``
+    until ``k`` rows are found, ending with a full scan. Radii too wide for a
+    geohash cell are bounded by a latitude/longitude box instead, and rows are
+    streamed so only the ``k`` best are held in memory.
+    """
+    if radius_km is None:
+        for radius in GEOHASH_SEARCH_RADII_KM:
+            hits = geohash_nearby(model, lat, lng, radius, k, queryset)
+            if len(hits) >= k:
+                return hits
+        radius_km = math.pi * EARTH_RADIUS_KM
+    qs = queryset if queryset is not None else model.objects.all()
+    qs = qs.filter(latitude__isnull=False, longitude__isnull=False)
+    cells = covering_cells(lat, lng, radius_km)
+    qs = qs.filter(geohash_filter(cells) if cells is not None else bounding_box(lat, lng, radius_km))
+    rows = qs.values_list("pk", "latitude", "longitude").iterator()
+    hits = (Nearby(pk, haversine_km(lat, lng, plat, plng)) for pk, plat, plng in rows)
+    return heapq.nsmallest(k, (hit for hit in hits if hit.distance_km <= radius_km), key=lambda hit: hit.distance_km)
+
+
+_indexes = {}           # model -> index serving queries
+_building = {}          # model -> index being built; receives writes as well
+_indexes_lock = threading.Lock()
+
+
+def _build(model, index):
+    try:
+        index.build()
+    except Exception:
+        logger.exception("Building the spatial index for %s failed", model.__name__)
+        with _indexes_lock:
+            _building.pop(model, None)
+        return
+    with _indexes_lock:
+        if _building.get(model) is index:
+            del _building[model]
+            _indexes[model] = index
+
+
+def _build_in_background(model, index):
+    try:
+        _build(model, index)
+    finally:
+        close_old_connections()
+
+
+def get_spatial_index(model):
+    """Return the KD-tree serving ``model``, or None when disabled or not built yet.
+
+    A stale index triggers a rebuild and keeps serving until the new one is
+    swapped in.
+    """
+    conf = geo_index_settings()
+    if not conf["ENABLED"]:
+        return None
+    refresh = conf["REFRESH_SECONDS"]
+
+    def stale(index):
+        return index is None or index.pending > conf["MAX_PENDING"] or (
+            refresh and time.monotonic() - index.built_at > refresh
+        )
+
+    index = _indexes.get(model)
+    if not stale(index):
+        return index
+    with _indexes_lock:
+        index = _indexes.get(model)
+        if not stale(index) or model in _building:
+            return index
+        building = _building[model] = SpatialIndex(model)
+    if conf["BACKGROUND"]:
+        threading.Thread(
+            target=_build_in_background, args=(model, building),
+            name=f"geo-index-{model.__name__}", daemon=True,
+        ).start()
+        return index
+    _build(model, building)
+    return _indexes.get(model)
+
+
+def reset_spatial_indexes():
+    with _indexes_lock:
+        _indexes.clear()
+        _building.clear()
+
+
+def nearby(model, lat, lng, radius_km=None, k=20, queryset=None):
+    """``Nearby(pk, distance_km)`` rows of ``model`` closest to a point, nearest first.
+
+    ``queryset`` (a filtered ``model`` queryset) limits which rows may be
+    returned. On the KD-tree path the nearest rows are over-fetched and checked
+    against it, up to ``MAX_OVERFETCH``; a filter more selective than that is
+    answered by the geohash scan over the filtered queryset.
+    """
+    index = get_spatial_index(model)
+    if index is None:
+        return geohash_nearby(model, lat, lng, radius_km, k, queryset)
+    if queryset is None:
+        return index.query(lat, lng, radius_km, k)
+
+    limit = geo_index_settings()["MAX_OVERFETCH"]
+    fetch = k
+    while fetch <= max(limit, k):
+        hits = index.query(lat, lng, radius_km, fetch)
+        allowed = set(queryset.filter(pk__in=[h.pk for h in hits]).values_list("pk", flat=True))
+        matched = [h for h in hits if h.pk in allowed]
+        if len(matched) >= k or len(hits) < fetch:
+            return matched[:k]
+        fetch *= 4
+    # a selective filter: the database narrows by region and filter together
+    return geohash_nearby(model, lat, lng, radius_km, k, queryset)
+
+
+def _live_indexes(model):
+    # the serving index and, during a rebuild, its replacement
+    return [index for index in (_indexes.get(model), _building.get(model)) if index is not None]
+
+
+def place_saved(sender, instance, **kwargs):
+    # nothing to update until an index exists
+    for index in _live_indexes(sender):
+        index.update(instance.pk, instance.latitude, instance.longitude)
+
+
+def place_deleted(sender, instance, **kwargs):
+    for index in _live_indexes(sender):
+        index.remove(instance.pk)
@@ -0,0 +1,241 @@
+# Location/images.py
+"""Resized WebP/JPEG derivatives and blur placeholders for catalog images.
+
+Scraped and model-sourced images are stored as-is, often several megabytes, and
+list cards only need a few hundred pixels. ``GET /api/images/<name>?w=&fmt=``
+returns ``name`` scaled to the smallest configured width bucket that is at
+least ``w`` (never upscaled), as WebP or JPEG. When ``fmt`` is omitted, WebP is
+used if the client accepts it. Variants are generated with Pillow on first
+request and kept under ``MEDIA_ROOT/<CACHE_DIR>`` with names derived from a
+hash of the source bytes. A replaced image therefore gets new files, and a
+cached variant never needs invalidating.
+
+Each row also stores ``image_placeholder``: a tiny blurred JPEG data URI that
+cards can paint while the real image loads. It is computed when the row's image
+changes (see the ``pre_save`` / ``post_save`` handlers connected in
+``LocationConfig.ready``) so list endpoints never decode images. Responses
+include it only when asked with ``?placeholder=1``.
+"""
+import base64
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils import timezone
+
+from assistant.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IMAGE_SETTINGS = {
+    "WIDTHS": [320, 640, 960, 1280],
+    "FORMATS": ["webp", "jpeg"],
+    "QUALITY": {"webp": 78, "jpeg": 82},
+    "CACHE_DIR": "derived",
+    "PLACEHOLDER_WIDTH": 16,
+    "MAX_AGE": 7 * 24 * 60 * 60,   # Cache-Control for served variants, seconds
+}
+
+CONTENT_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+
+
+class ImageUnavailable(Exception):
+    """The source is missing, is not a servable media path, or is not a readable image."""
+
+
+def image_settings() -> dict:
+    conf = dict(DEFAULT_IMAGE_SETTINGS)
+    conf.update(getattr(settings, "LOCATION_IMAGES", None) or {})
+    return conf
+
+
+def servable(name) -> bool:
+    """True for stored media paths; false for empty values, stored URLs and the variant cache itself."""
+    if not name or ":" in name or name.startswith("/"):
+        return False
+    parts = name.replace("\\", "/").split("/")
+    return ".." not in parts and parts[0] != image_settings()["CACHE_DIR"]
+
+
+def bucket_width(width, widths) -> int:
+    widths = sorted(widths)
+    for bucket in widths:
+        if bucket >= width:
+            return bucket
+    return widths[-1]
+
+
+def derivative_prefix(request):
+    """Absolute URL of the derivatives endpoint, up to where the image name goes."""
+    return request.build_absolute_uri(reverse("image-derivative", kwargs={"name": "_"})[:-1])
+
+
+def srcsets(prefix, name, conf=None):
+    """``{fmt: "url 320w, url 640w, ..."}`` for ``<img srcset>``; ``prefix`` is the absolute endpoint URL."""
+    conf = conf or image_settings()
+    base = prefix + quote(name)
+    return {
+        fmt: ", ".join(f"{base}?w={w}&fmt={fmt} {w}w" for w in sorted(conf["WIDTHS"]))
+        for fmt in conf["FORMATS"]
+    }
+
+
+class _DigestCache:
+    """Source content hashes, keyed on ``(name, size, mtime)`` so a rewritten file is hashed again."""
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def digest(self, storage, name):
+        try:
+            key = (name, storage.size(name), storage.get_modified_time(name).timestamp())
+        except (OSError, NotImplementedError, ValueError) as e:
+            raise ImageUnavailable(name) from e
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+                return value
+        sha = hashlib.sha256()
+        with storage.open(name, "rb") as fh:
+            for chunk in iter(lambda: fh.read(1 << 16), b""):
+                sha.update(chunk)
+        value = sha.hexdigest()[:32]
+        with self._lock:
+            self._data[key] = value
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        return value
+
+
+_digests = _DigestCache()
+_flight = SingleFlight()
+
+
+def _open_image(storage, name, target_width=None):
+    from PIL import Image, ImageOps
+
+    try:
+        with storage.open(name, "rb") as fh:
+            image = Image.open(fh)
+            if target_width and image.format == "JPEG":
+                # let the JPEG decoder downscale by a power of two while reading
+                image.draft("RGB", (target_width, max(1, image.height * target_width // image.width)))
+            image.load()
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise ImageUnavailable(name) from e
+    return ImageOps.exif_transpose(image)
+
+
+def _encode(image, fmt, quality):
+    from PIL import Image
+
+    if fmt == "jpeg":
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+        options = {"quality": quality, "optimize": True, "progressive": True}
+    else:
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() or image.mode == "P" else "RGB")
+        options = {"quality": quality, "method": 4}
+    out = io.BytesIO()
+    image.save(out, format=fmt.upper(), **options)
+    return out.getvalue()
+
+
+def derivative_path(name, width, fmt, storage=None, conf=None):
+    """Absolute path of the ``width``/``fmt`` variant of ``name``, generating it on first use."""
+    from PIL import Image
+
+    conf = conf or image_settings()
+    storage = storage or default_storage
+    if not servable(name) or not storage.exists(name):
+        raise ImageUnavailable(name)
+    width = bucket_width(width, conf["WIDTHS"])
+    digest = _digests.digest(storage, name)
+    relative = os.path.join(conf["CACHE_DIR"], digest[:2], f"{digest}-w{width}.{EXTENSIONS[fmt]}")
+    path = os.path.join(settings.MEDIA_ROOT, relative)
+    if os.path.exists(path):
+        return path
+
+    def generate():
+        if os.path.exists(path):
+            return path
+        image = _open_image(storage, name, width)
+        if image.width > width:
+            image.thumbnail((width, image.height), Image.Resampling.LANCZOS)
+        data = _encode(image, fmt, conf["QUALITY"][fmt])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write then rename, so a concurrent reader never sees a partial file
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return path
+
+    path, _ = _flight.do(path, generate)
+    return path
+
+
+def placeholder_data_uri(name, storage=None, conf=None) -> str:
+    """A blurred ~16px JPEG of ``name`` as a ``data:`` URI, or "" when it cannot be read."""
+    from PIL import ImageFilter
+
+    conf = conf or image_settings()
+    storage = storage or default_storage
+    if not servable(name):
+        return ""
+    try:
+        image = _open_image(storage, name, conf["PLACEHOLDER_WIDTH"] * 8)
+    except ImageUnavailable:
+        logger.warning("Could not build a placeholder for %s", name)
+        return ""
+    width = conf["PLACEHOLDER_WIDTH"]
+    image.thumbnail((width, max(1, width * image.height // max(image.width, 1))))
+    image = image.convert("RGB").filter(ImageFilter.GaussianBlur(1))
+    data = _encode(image, "jpeg", 40)
+    return "data:image/jpeg;base64," + base64.b64encode(data).decode("ascii")
+
+
+def image_changed(sender, instance, raw=False, **kwargs):
+    """pre_save: drop a placeholder that belongs to a previous image."""
+    if raw or instance.pk is None:
+        return
+    previous = sender.objects.filter(pk=instance.pk).values_list("location_image", flat=True).first()
+    if (previous or "") != (instance.location_image.name or ""):
+        instance.image_placeholder = ""
+
+
+def image_saved(sender, instance, raw=False, **kwargs):
+    """post_save: compute the placeholder for a new image."""
+    name = instance.location_image.name
+    if raw or instance.image_placeholder or not name:
+        return
+    placeholder = placeholder_data_uri(name)
+    if placeholder:
+        instance.image_placeholder = placeholder
+        instance.updated_at = timezone.now()
+        # a queryset update, so this handler does not run again; updated_at moves the ETag on
+        sender.objects.filter(pk=instance.pk).update(image_placeholder=placeholder, updated_at=instance.updated_at)
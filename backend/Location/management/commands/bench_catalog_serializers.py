@@ -0,0 +1,96 @@
+# Location/management/commands/bench_catalog_serializers.py
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory
+from django.test.utils import override_settings
+
+from Location.fast_read import RowReader
+from Location.models import Location, Homes
+from Location.serializers import LocationSerializer, HomesSerializer
+
+MODELS = {
+    "location": (Location, LocationSerializer),
+    "homes": (Homes, HomesSerializer),
+}
+CATEGORIES = ["nature", "city", "beach", "historical"]
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare rows per second of the DRF catalog serializer and the fast .values() "
+        "read path (Location.fast_read). Sample rows are inserted in a transaction that "
+        "is rolled back, so the database is left unchanged."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+        parser.add_argument("--model", choices=sorted(MODELS), default="location")
+        parser.add_argument("--repeat", type=int, default=3, help="Report the best of this many runs.")
+
+    def handle(self, *args, **options):
+        model, serializer_class = MODELS[options["model"]]
+        reader = RowReader(serializer_class)
+        host = "bench.localhost"
+        request = RequestFactory().get("/api/", HTTP_HOST=host)
+
+        with override_settings(ALLOWED_HOSTS=[host]):
+            for count in options["rows"]:
+                try:
+                    with transaction.atomic():
+                        self._seed(model, count)
+                        queryset = model.objects.order_by("-created_at")
+                        self._check(queryset, serializer_class, reader, request)
+                        drf = self._best(options["repeat"], lambda: serializer_class(
+                            list(queryset), many=True, context={"request": request}
+                        ).data)
+                        fast = self._best(options["repeat"], lambda: reader.rows(reader.values(queryset), request))
+                        raise _Rollback
+                except _Rollback:
+                    pass
+                self.stdout.write(
+                    f"{count:>8} rows  drf {count / drf:>10,.0f} rows/s  "
+                    f"fast {count / fast:>10,.0f} rows/s  speedup x{drf / fast:.1f}"
+                )
+
+    def _seed(self, model, count):
+        model.objects.bulk_create(
+            (
+                model(
+                    location_name=f"Bench place {i}",
+                    city=f"City {i % 500}",
+                    country="India",
+                    description="Benchmark row",
+                    category=CATEGORIES[i % len(CATEGORIES)],
+                    location_image=f"locations/bench-{i}.jpg" if i % 3 else "",
+                    average_cost=Decimal(1000 + i % 9000),
+                    rating=Decimal(i % 50) / 10,
+                    latitude=10 + (i % 1000) / 100,
+                    longitude=70 + (i % 1000) / 100,
+                )
+                for i in range(count)
+            ),
+            batch_size=5000,
+        )
+
+    def _check(self, queryset, serializer_class, reader, request):
+        sample = queryset[:200]
+        expected = serializer_class(list(sample), many=True, context={"request": request}).data
+        actual = reader.rows(reader.values(sample), request)
+        if [dict(row) for row in expected] != actual:
+            raise CommandError("Fast read path output differs from the serializer; not benchmarking.")
+
+    def _best(self, repeat, func):
+        best = None
+        for _ in range(max(repeat, 1)):
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
@@ -0,0 +1,47 @@
+# Location/management/commands/build_image_placeholders.py
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from Location.catalog_cache import get_catalog_cache
+from Location.images import ImageUnavailable, derivative_path, image_settings, placeholder_data_uri, servable
+from Location.models import Location, Homes
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute blur placeholders for catalog rows whose image has none (rows saved "
+        "before placeholders existed). With --warm, also pre-generate every width/format "
+        "variant so the first visitors do not pay for resizing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--warm", action="store_true", help="Also generate the resized variants.")
+        parser.add_argument("--force", action="store_true", help="Recompute existing placeholders too.")
+
+    def handle(self, *args, **options):
+        conf = image_settings()
+        for model in (Location, Homes):
+            rows = model.objects.exclude(location_image="").exclude(location_image__isnull=True)
+            if not options["force"]:
+                rows = rows.filter(image_placeholder="")
+            done = failed = 0
+            for pk, name in rows.values_list("pk", "location_image").iterator():
+                if not servable(name):
+                    continue
+                placeholder = placeholder_data_uri(name, conf=conf)
+                if not placeholder:
+                    failed += 1
+                    continue
+                model.objects.filter(pk=pk).update(image_placeholder=placeholder, updated_at=timezone.now())
+                done += 1
+                if options["warm"]:
+                    for fmt in conf["FORMATS"]:
+                        for width in conf["WIDTHS"]:
+                            try:
+                                derivative_path(name, width, fmt, conf=conf)
+                            except ImageUnavailable:
+                                break
+            if done:
+                # queryset updates send no post_save
+                get_catalog_cache().bump(model)
+            self.stdout.write(f"{model.__name__}: {done} placeholders built, {failed} unreadable images.")
@@ -0,0 +1,105 @@
+from django.db import migrations
+
+SEARCH_MODELS = ("Location", "Homes")
+SEARCH_COLUMNS = ("location_name", "city", "country", "description")
+
+
+def _sqlite_create(schema_editor, model):
+    table = model._meta.db_table
+    fts = f"{table}_fts"
+    cols = ", ".join(SEARCH_COLUMNS)
+    new_cols = ", ".join(f"new.{c}" for c in SEARCH_COLUMNS)
+    old_cols = ", ".join(f"old.{c}" for c in SEARCH_COLUMNS)
+    statements = [
+        f'CREATE VIRTUAL TABLE "{fts}" USING fts5({cols}, content=\'{table}\', content_rowid=\'id\', '
+        f"tokenize='unicode61 remove_diacritics 2')",
+        f'CREATE TRIGGER "{fts}_ai" AFTER INSERT ON "{table}" BEGIN '
+        f'INSERT INTO "{fts}"(rowid, {cols}) VALUES (new.id, {new_cols}); END',
+        f'CREATE TRIGGER "{fts}_ad" AFTER DELETE ON "{table}" BEGIN '
+        f'INSERT INTO "{fts}"("{fts}", rowid, {cols}) VALUES (\'delete\', old.id, {old_cols}); END',
+        f'CREATE TRIGGER "{fts}_au" AFTER UPDATE ON "{table}" BEGIN '
+        f'INSERT INTO "{fts}"("{fts}", rowid, {cols}) VALUES (\'delete\', old.id, {old_cols}); '
+        f'INSERT INTO "{fts}"(rowid, {cols}) VALUES (new.id, {new_cols}); END',
+        f'INSERT INTO "{fts}"("{fts}") VALUES (\'rebuild\')',
+    ]
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def _sqlite_drop(schema_editor, model):
+    fts = f"{model._meta.db_table}_fts"
+    for suffix in ("ai", "ad", "au"):
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS "{fts}_{suffix}"')
+    schema_editor.execute(f'DROP TABLE IF EXISTS "{fts}"')
+
+
+def _postgres_indexes(model):
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+
+    name = model._meta.model_name
+    vector = (
+        SearchVector("location_name", weight="A", config="simple")
+        + SearchVector("city", weight="A", config="simple")
+        + SearchVector("country", weight="B", config="simple")
+        + SearchVector("description", weight="D", config="simple")
+    )
+    fts = GinIndex(vector, name=f"{name}_search_gin")
+    trigram = [
+        GinIndex(fields=[field], opclasses=["gin_trgm_ops"], name=f"{name}_{field}_trgm")
+        for field in ("location_name", "city")
+    ]
+    return fts, trigram
+
+
+def _postgres_has_trigram(schema_editor):
+    from django.db import transaction
+
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        return True
+    except Exception:
+        # needs a privileged role; full-text search still works without it
+        return False
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for model_name in SEARCH_MODELS:
+        model = apps.get_model("Location", model_name)
+        if vendor == "sqlite":
+            try:
+                _sqlite_create(schema_editor, model)
+            except Exception:
+                # SQLite built without FTS5: Location.search falls back to icontains
+                _sqlite_drop(schema_editor, model)
+        elif vendor == "postgresql":
+            fts, trigram = _postgres_indexes(model)
+            schema_editor.add_index(model, fts)
+            if _postgres_has_trigram(schema_editor):
+                for index in trigram:
+                    schema_editor.add_index(model, index)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for model_name in SEARCH_MODELS:
+        model = apps.get_model("Location", model_name)
+        if vendor == "sqlite":
+            _sqlite_drop(schema_editor, model)
+        elif vendor == "postgresql":
+            name = model._meta.model_name
+            for index in (f"{name}_search_gin", f"{name}_location_name_trgm", f"{name}_city_trgm"):
+                schema_editor.execute(f'DROP INDEX IF EXISTS "{index}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Location', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
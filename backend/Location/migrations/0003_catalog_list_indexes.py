@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Location', '0002_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='homes',
+            index=models.Index(fields=['category', 'rating'], name='home_category_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='homes',
+            index=models.Index(fields=['city', 'average_cost'], name='home_city_cost_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='homes',
+            index=models.Index(fields=['country', 'rating'], name='home_country_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='homes',
+            index=models.Index(fields=['created_at'], name='home_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['category', 'rating'], name='loc_category_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['city', 'average_cost'], name='loc_city_cost_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['country', 'rating'], name='loc_country_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['created_at'], name='loc_created_at_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:23
+
+import django.core.validators
+from django.db import migrations, models
+
+
+def restore_search_triggers(apps, schema_editor):
+    # SQLite rebuilt both tables for the AddFields above, dropping the FTS triggers from 0002
+    from Location.search import restore_sqlite_fts
+
+    tables = [apps.get_model("Location", name)._meta.db_table for name in ("Location", "Homes")]
+    restore_sqlite_fts(schema_editor.connection, tables)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Location', '0003_catalog_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='homes',
+            name='geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='homes',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)]),
+        ),
+        migrations.AddField(
+            model_name='homes',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)]),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=12),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-90), django.core.validators.MaxValueValidator(90)]),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(-180), django.core.validators.MaxValueValidator(180)]),
+        ),
+        migrations.AddIndex(
+            model_name='homes',
+            index=models.Index(fields=['geohash'], name='home_geohash_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='location',
+            index=models.Index(fields=['geohash'], name='loc_geohash_idx'),
+        ),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Location', '0004_coordinates_geohash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='homes',
+            name='image_placeholder',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='image_placeholder',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+    ]
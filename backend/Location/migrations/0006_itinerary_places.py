@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:45
+
+from django.db import migrations, models
+from django.db.models import F, Q
+
+
+def mark_itinerary_places(apps, schema_editor):
+    # rows planner.views.attach_places_from_itinerary created before the flag existed:
+    # city copied from the name and no country
+    for name in ("Location", "Homes"):
+        model = apps.get_model("Location", name)
+        model.objects.filter(Q(country__isnull=True) | Q(country=""), city=F("location_name")).update(
+            from_itinerary=True
+        )
+
+
+def restore_search_triggers(apps, schema_editor):
+    # SQLite rebuilt both tables for the AddFields above, dropping the FTS triggers from 0002
+    from Location.search import restore_sqlite_fts
+
+    tables = [apps.get_model("Location", name)._meta.db_table for name in ("Location", "Homes")]
+    restore_sqlite_fts(schema_editor.connection, tables)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Location', '0005_image_placeholder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='homes',
+            name='from_itinerary',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='from_itinerary',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+        migrations.RunPython(mark_itinerary_places, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,21 @@
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
-class Location(models.Model):
+from .geo import encode_geohash, has_coordinates
+
+
+class GeohashMixin:
+    """Keeps ``geohash`` in step with ``latitude``/``longitude`` on every save."""
+
+    def save(self, *args, **kwargs):
+        self.geohash = encode_geohash(self.latitude, self.longitude) if has_coordinates(self.latitude, self.longitude) else ""
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"latitude", "longitude"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "geohash"}
+        super().save(*args, **kwargs)
+
+
+class Location(GeohashMixin, models.Model):
     CATEGORY_CHOICES = [
         ('nature', 'Nature'),
         ('city', 'City'),
@@ -17,16 +32,33 @@ class Location(models.Model):
     description = models.TextField(blank=True, null=True)
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES, default='nature')
     location_image = models.ImageField(upload_to='locations/', blank=True, null=True)
+    # blurred thumbnail data URI, maintained by Location.images
+    image_placeholder = models.TextField(blank=True, default="", editable=False)
     best_time_to_visit = models.CharField(max_length=100, blank=True, null=True)
     average_cost = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     rating = models.DecimalField(max_digits=3, decimal_places=1, blank=True, null=True)
+    latitude = models.FloatField(blank=True, null=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(blank=True, null=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    geohash = models.CharField(max_length=12, blank=True, default="", editable=False)
+    # created on the fly from a generated plan's activity names, not curated
+    from_itinerary = models.BooleanField(default=False, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # composite indexes behind the catalog list filters (Location.filters)
+        indexes = [
+            models.Index(fields=["category", "rating"], name="loc_category_rating_idx"),
+            models.Index(fields=["city", "average_cost"], name="loc_city_cost_idx"),
+            models.Index(fields=["country", "rating"], name="loc_country_rating_idx"),
+            models.Index(fields=["created_at"], name="loc_created_at_idx"),
+            models.Index(fields=["geohash"], name="loc_geohash_idx"),
+        ]
+
     def __str__(self):
         return self.location_name
 
-class Homes(models.Model):
+class Homes(GeohashMixin, models.Model):
     CATEGORY_CHOICES = [
         ('nature', 'Nature'),
         ('city', 'City'),
@@ -43,11 +75,28 @@ class Homes(models.Model):
     description = models.TextField(blank=True, null=True)
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES, default='nature')
     location_image = models.ImageField(upload_to='locations/', blank=True, null=True)
+    # blurred thumbnail data URI, maintained by Location.images
+    image_placeholder = models.TextField(blank=True, default="", editable=False)
     best_time_to_visit = models.CharField(max_length=100, blank=True, null=True)
     average_cost = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     rating = models.DecimalField(max_digits=3, decimal_places=1, blank=True, null=True)
+    latitude = models.FloatField(blank=True, null=True, validators=[MinValueValidator(-90), MaxValueValidator(90)])
+    longitude = models.FloatField(blank=True, null=True, validators=[MinValueValidator(-180), MaxValueValidator(180)])
+    geohash = models.CharField(max_length=12, blank=True, default="", editable=False)
+    # created on the fly from a generated plan's activity names, not curated
+    from_itinerary = models.BooleanField(default=False, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # composite indexes behind the catalog list filters (Location.filters)
+        indexes = [
+            models.Index(fields=["category", "rating"], name="home_category_rating_idx"),
+            models.Index(fields=["city", "average_cost"], name="home_city_cost_idx"),
+            models.Index(fields=["country", "rating"], name="home_country_rating_idx"),
+            models.Index(fields=["created_at"], name="home_created_at_idx"),
+            models.Index(fields=["geohash"], name="home_geohash_idx"),
+        ]
+
     def __str__(self):
         return self.location_name
\ No newline at end of file
@@ -0,0 +1,336 @@
+# Location/search.py
+"""Ranked full-text search over ``Location`` and ``Homes``.
+
+Two query APIs, ``search_places(model, query, limit)`` for one query and
+``search_places_many(model, queries, per_query)`` for a batch of them in a
+single statement, with a backend per database:
+
+* PostgreSQL – ``to_tsvector`` full-text search (weighted name/city > country >
+  description) plus ``pg_trgm`` similarity on name and city for typos and
+  partial names, backed by GIN expression indexes.
+* SQLite – an FTS5 external-content table per model, ranked with ``bm25``.
+* Anything else (or SQLite without FTS5) – ranked ``icontains`` lookups.
+
+The indexes are created by migration ``Location.0002_search_index``. They are
+maintained by the database itself (expression indexes on PostgreSQL, triggers on
+SQLite), so every save, bulk insert and queryset update is searchable at once.
+SQLite drops a table's triggers whenever a migration rebuilds it, so
+``restore_sqlite_fts`` puts them back (and re-indexes) after every ``migrate``.
+"""
+import re
+import threading
+from functools import reduce
+from operator import or_
+
+from django.db import connection
+from django.db.models import Case, F, FloatField, IntegerField, Q, Value, When, Window
+from django.db.models.functions import RowNumber
+
+SEARCH_CONFIG = "simple"     # no stemming: place names are not English words
+TRIGRAM_THRESHOLD = 0.3
+
+# FTS5 column weights, in column order (name, city, country, description)
+BM25_WEIGHTS = (10.0, 8.0, 3.0, 1.0)
+
+SEARCH_FIELDS = ("location_name", "city", "country", "description")
+
+STOPWORDS = frozenset({
+    "a", "an", "and", "the", "in", "on", "at", "to", "of", "for", "with", "near", "from",
+    "trip", "visit", "hotel", "hotels", "stay", "plan", "days", "day", "i", "want", "me", "my",
+})
+
+_WORD_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def query_terms(query):
+    """Lower-cased words of ``query`` that are worth searching for."""
+    return [w for w in _WORD_RE.findall((query or "").casefold()) if len(w) > 1 and w not in STOPWORDS]
+
+
+def fts_table(model):
+    return f"{model._meta.db_table}_fts"
+
+
+def sqlite_fts_triggers(table):
+    """``{trigger name: CREATE TRIGGER sql}`` keeping ``<table>_fts`` in step with ``table``."""
+    fts = f"{table}_fts"
+    cols = ", ".join(SEARCH_FIELDS)
+    new_cols = ", ".join(f"new.{c}" for c in SEARCH_FIELDS)
+    old_cols = ", ".join(f"old.{c}" for c in SEARCH_FIELDS)
+    delete = f'INSERT INTO "{fts}"("{fts}", rowid, {cols}) VALUES (\'delete\', old.id, {old_cols});'
+    insert = f'INSERT INTO "{fts}"(rowid, {cols}) VALUES (new.id, {new_cols});'
+    return {
+        f"{fts}_ai": f'CREATE TRIGGER IF NOT EXISTS "{fts}_ai" AFTER INSERT ON "{table}" BEGIN {insert} END',
+        f"{fts}_ad": f'CREATE TRIGGER IF NOT EXISTS "{fts}_ad" AFTER DELETE ON "{table}" BEGIN {delete} END',
+        f"{fts}_au": f'CREATE TRIGGER IF NOT EXISTS "{fts}_au" AFTER UPDATE ON "{table}" BEGIN {delete} {insert} END',
+    }
+
+
+def _sqlite_objects(conn, kind):
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = %s", [kind])
+        return {row[0] for row in cursor.fetchall()}
+
+
+def restore_sqlite_fts(conn, tables):
+    """Re-create missing FTS triggers for ``tables`` and rebuild those indexes.
+
+    A migration that rebuilds a table on SQLite (most ``AddField`` /
+    ``AlterField`` operations) silently drops its triggers, after which writes
+    no longer reach the FTS table. Returns the tables that had to be repaired.
+    """
+    if conn.vendor != "sqlite":
+        return []
+    existing_tables = _sqlite_objects(conn, "table")
+    existing_triggers = _sqlite_objects(conn, "trigger")
+    repaired = []
+    for table in tables:
+        fts = f"{table}_fts"
+        if fts not in existing_tables or table not in existing_tables:
+            continue
+        triggers = sqlite_fts_triggers(table)
+        if set(triggers) <= existing_triggers:
+            continue
+        with conn.cursor() as cursor:
+            for sql in triggers.values():
+                cursor.execute(sql)
+            # rows written while the triggers were missing are not in the index
+            cursor.execute(f'INSERT INTO "{fts}"("{fts}") VALUES (\'rebuild\')')
+        repaired.append(table)
+    return repaired
+
+
+def restore_search_index(sender, using="default", **kwargs):
+    """post_migrate: repair the SQLite FTS triggers a table rebuild may have dropped."""
+    from django.db import connections
+    from .models import Location, Homes
+
+    if restore_sqlite_fts(connections[using], [m._meta.db_table for m in (Location, Homes)]):
+        reset_search_backend()
+
+
+def search_vector():
+    from django.contrib.postgres.search import SearchVector
+
+    return (
+        SearchVector("location_name", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("city", weight="A", config=SEARCH_CONFIG)
+        + SearchVector("country", weight="B", config=SEARCH_CONFIG)
+        + SearchVector("description", weight="D", config=SEARCH_CONFIG)
+    )
+
+
+def _ranked_batch(queryset, clauses, per_query):
+    """Shared ORM batch query: ``clauses`` is a list of ``(query_index, condition, rank)``.
+
+    Each row is attributed to the first query it matches (so it appears once),
+    numbered within that query by rank, and cut at ``per_query`` rows -- all in
+    one SELECT. The OR of the conditions is applied as a plain WHERE first so the
+    full-text / trigram indexes select the candidates; the CASE only labels them.
+    """
+    if not clauses:
+        return []
+    query_index = Case(
+        *[When(condition, then=Value(i)) for i, condition, _ in clauses],
+        default=None, output_field=IntegerField(),
+    )
+    rank = Case(
+        *[When(query_index=i, then=r) for i, _, r in clauses],
+        default=Value(0.0), output_field=FloatField(),
+    )
+    qs = (
+        queryset.filter(reduce(or_, [condition for _, condition, _ in clauses]))
+        .annotate(query_index=query_index)
+        .annotate(search_rank=rank)
+        .annotate(query_row=Window(
+            RowNumber(), partition_by=[F("query_index")], order_by=[F("search_rank").desc(), F("pk").asc()],
+        ))
+        .filter(query_row__lte=per_query)
+        .order_by("query_index", "query_row")
+    )
+    return [(obj.query_index, obj) for obj in qs]
+
+
+class ContainsSearchBackend:
+    """Portable fallback: ``icontains`` on name/city/country, ranked by match quality."""
+
+    name = "contains"
+
+    def _clause(self, query):
+        condition = Q(location_name__icontains=query) | Q(city__icontains=query) | Q(country__iexact=query)
+        rank = Case(
+            When(location_name__iexact=query, then=Value(5)),
+            When(city__iexact=query, then=Value(4)),
+            When(location_name__istartswith=query, then=Value(3)),
+            When(location_name__icontains=query, then=Value(2)),
+            default=Value(1),
+            output_field=IntegerField(),
+        )
+        return condition, rank
+
+    def search(self, model, query, limit=10):
+        query = (query or "").strip()
+        if not query:
+            return []
+        condition, rank = self._clause(query)
+        return list(model.objects.filter(condition).annotate(search_rank=rank).order_by("-search_rank", "pk")[:limit])
+
+    def search_many(self, model, queries, per_query=10):
+        clauses = []
+        for i, query in enumerate(queries):
+            query = (query or "").strip()
+            if query:
+                clauses.append((i, *self._clause(query)))
+        return _ranked_batch(model.objects.all(), clauses, per_query)
+
+
+class SQLiteFTSSearchBackend:
+    name = "sqlite_fts5"
+
+    def match_expression(self, query):
+        # every term is quoted (no FTS syntax injection) and prefix-matched; like the
+        # PostgreSQL ``websearch`` query, a row must contain all of them
+        terms = query_terms(query)
+        return " ".join('"{}"*'.format(t.replace('"', '""')) for t in terms)
+
+    def search(self, model, query, limit=10):
+        expression = self.match_expression(query)
+        if not expression:
+            return []
+        table = fts_table(model)
+        weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM "{table}" WHERE "{table}" MATCH %s ORDER BY bm25("{table}", {weights}) LIMIT %s',
+                [expression, limit],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        rows = model.objects.in_bulk(ids)
+        return [rows[pk] for pk in ids if pk in rows]
+
+    def search_many(self, model, queries, per_query=10):
+        expressions = [(i, self.match_expression(q)) for i, q in enumerate(queries)]
+        expressions = [(i, e) for i, e in expressions if e]
+        if not expressions:
+            return []
+        table = fts_table(model)
+        weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+        matches = " UNION ALL ".join(
+            f'SELECT %s, rowid, bm25("{table}", {weights}) FROM "{table}" WHERE "{table}" MATCH %s'
+            for _ in expressions
+        )
+        # a row matching several queries is kept for the first one only
+        sql = (
+            f"WITH matches(q, rid, score) AS ({matches}), "
+            "firsts AS (SELECT rid, MIN(q) AS q FROM matches GROUP BY rid), "
+            "ranked AS (SELECT m.q, m.rid, ROW_NUMBER() OVER (PARTITION BY m.q ORDER BY m.score, m.rid) AS n "
+            "FROM matches m JOIN firsts f ON f.rid = m.rid AND f.q = m.q) "
+            "SELECT q, rid FROM ranked WHERE n <= %s ORDER BY q, n"
+        )
+        params = [p for pair in expressions for p in pair] + [per_query]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            hits = cursor.fetchall()
+        rows = model.objects.in_bulk([rid for _, rid in hits])
+        return [(q, rows[rid]) for q, rid in hits if rid in rows]
+
+
+class PostgresSearchBackend:
+    name = "postgres"
+
+    def __init__(self, trigram=False):
+        self.trigram = trigram
+
+    def _clause(self, query, document):
+        from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+        from django.db.models.functions import Greatest
+
+        ts_query = SearchQuery(query, config=SEARCH_CONFIG, search_type="websearch")
+        condition = Q(document=ts_query)
+        rank = SearchRank(document, ts_query)
+        if self.trigram:
+            # ``%`` lookups can use the trigram GIN indexes
+            condition |= Q(location_name__trigram_similar=query) | Q(city__trigram_similar=query)
+            rank = rank + Greatest(TrigramSimilarity("location_name", query), TrigramSimilarity("city", query))
+        return condition, rank
+
+    def search(self, model, query, limit=10):
+        query = (query or "").strip()
+        if not query:
+            return []
+        condition, rank = self._clause(query, F("document"))
+        qs = model.objects.annotate(document=search_vector()).filter(condition).annotate(search_rank=rank)
+        return list(qs.order_by("-search_rank", "pk")[:limit])
+
+    def search_many(self, model, queries, per_query=10):
+        clauses = []
+        for i, query in enumerate(queries):
+            query = (query or "").strip()
+            if query:
+                clauses.append((i, *self._clause(query, F("document"))))
+        return _ranked_batch(model.objects.annotate(document=search_vector()), clauses, per_query)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def _sqlite_fts_ready():
+    """FTS5 tables exist and the triggers that keep them current are all in place."""
+    from .models import Location, Homes
+
+    tables = _sqlite_objects(connection, "table")
+    triggers = _sqlite_objects(connection, "trigger")
+    return all(
+        fts_table(m) in tables and set(sqlite_fts_triggers(m._meta.db_table)) <= triggers
+        for m in (Location, Homes)
+    )
+
+
+def _postgres_has_trigram():
+    from django.apps import apps
+
+    if not apps.is_installed("django.contrib.postgres"):
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def build_search_backend():
+    if connection.vendor == "postgresql":
+        return PostgresSearchBackend(trigram=_postgres_has_trigram())
+    if connection.vendor == "sqlite" and _sqlite_fts_ready():
+        return SQLiteFTSSearchBackend()
+    return ContainsSearchBackend()
+
+
+def get_search_backend():
+    """Return the backend for the default database, detected on first use."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = build_search_backend()
+    return _backend
+
+
+def reset_search_backend():
+    global _backend
+    with _backend_lock:
+        _backend = None
+
+
+def search_places(model, query, limit=10):
+    """Return up to ``limit`` ``model`` rows matching ``query``, best match first."""
+    return get_search_backend().search(model, query, limit)
+
+
+def search_places_many(model, queries, per_query=10):
+    """Search ``model`` for every query in one statement.
+
+    Returns ``(query_index, row)`` pairs ordered by query then rank, at most
+    ``per_query`` rows per query, each row listed once (under the first query it
+    matches).
+    """
+    return get_search_backend().search_many(model, list(queries), per_query)
@@ -1,15 +1,31 @@
 from rest_framework import serializers
 from django.conf import settings
+from .images import derivative_prefix, servable, srcsets
 from .models import Location, Homes
 
 
+def image_srcset(serializer, obj):
+    """``{"webp": srcset, "jpeg": srcset}`` of resized variants, or None without a stored image."""
+    img = getattr(obj, 'location_image', None)
+    name = getattr(img, 'name', None) or ''
+    request = serializer.context.get('request')
+    if request is None or not servable(name):
+        return None
+    return srcsets(derivative_prefix(request), name)
+
+
 class LocationSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Location
-        # include model fields plus `image_url`
-        fields = '__all__'
+        # include model fields plus `image_url`; the blur placeholder only goes to
+        # the cards that paint it (LocationCardSerializer)
+        exclude = ['image_placeholder']
+
+    def get_image_srcset(self, obj):
+        return image_srcset(self, obj)
 
     def get_image_url(self, obj):
         """Return an absolute URL for the location image when possible."""
@@ -34,10 +50,14 @@ class LocationSerializer(serializers.ModelSerializer):
 
 class HomesSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Homes
-        fields = '__all__'
+        exclude = ['image_placeholder']
+
+    def get_image_srcset(self, obj):
+        return image_srcset(self, obj)
 
     def get_image_url(self, obj):
         img = getattr(obj, 'location_image', None)
@@ -54,3 +74,19 @@ class HomesSerializer(serializers.ModelSerializer):
             base = getattr(settings, 'SITE_BASE', '') or ''
             return base + url
         return url
+
+
+class LocationCardSerializer(LocationSerializer):
+    """``LocationSerializer`` plus ``image_placeholder``, for list cards that paint it."""
+
+    class Meta(LocationSerializer.Meta):
+        exclude = None
+        fields = '__all__'
+
+
+class HomesCardSerializer(HomesSerializer):
+    """``HomesSerializer`` plus ``image_placeholder``, for list cards that paint it."""
+
+    class Meta(HomesSerializer.Meta):
+        exclude = None
+        fields = '__all__'
@@ -1,3 +1,161 @@
-from django.test import TestCase
+import random
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from .geo import KDTree, SpatialIndex, _unit_vector, geohash_nearby, haversine_km, reset_spatial_indexes
+from .models import Location
+from .search import reset_search_backend, search_places, search_places_many
+
+
+class ConditionalListTests(TestCase):
+    def setUp(self):
+        self.first = Location.objects.create(location_name="Baga Beach", city="Goa", category="beach")
+        self.second = Location.objects.create(location_name="Solang Valley", city="Manali")
+
+    def test_list_has_an_etag_but_no_last_modified(self):
+        response = self.client.get("/api/locations/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("ETag", response)
+        self.assertNotIn("Last-Modified", response)
+
+    def test_deleting_a_row_invalidates_the_list(self):
+        etag = self.client.get("/api/locations/")["ETag"]
+        self.assertEqual(self.client.get("/api/locations/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.first.delete()
+
+        response = self.client.get("/api/locations/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 1)
+
+    def test_if_modified_since_is_ignored_for_lists(self):
+        since = self.client.get(f"/api/locations/{self.second.pk}/")["Last-Modified"]
+
+        self.second.delete()
+
+        response = self.client.get("/api/locations/", HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, 200)
+
+    def test_detail_keeps_last_modified(self):
+        response = self.client.get(f"/api/locations/{self.first.pk}/")
+        self.assertIn("Last-Modified", response)
+
+        self.assertEqual(
+            self.client.get(f"/api/locations/{self.first.pk}/", HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]).status_code,
+            304,
+        )
+
+
+class ImagePlaceholderTests(TestCase):
+    def setUp(self):
+        self.location = Location.objects.create(location_name="Baga Beach", city="Goa")
+        Location.objects.filter(pk=self.location.pk).update(image_placeholder="data:image/jpeg;base64,AAAA")
+
+    def test_placeholder_is_left_out_by_default(self):
+        for path in ("/api/locations/", f"/api/locations/{self.location.pk}/"):
+            data = self.client.get(path).json()
+            row = data["results"][0] if "results" in data else data
+            self.assertNotIn("image_placeholder", row)
+
+    def test_placeholder_is_sent_when_asked_for(self):
+        row = self.client.get("/api/locations/", {"placeholder": 1}).json()["results"][0]
+
+        self.assertEqual(row["image_placeholder"], "data:image/jpeg;base64,AAAA")
+        self.assertIn("image_srcset", row)
+
+
+class ConditionalRetrieveTests(TestCase):
+    def test_malformed_id_is_a_404(self):
+        for path in ("/api/locations/abc/", "/api/homes/1.5/", "/api/locations/abc/?placeholder=1"):
+            self.assertEqual(self.client.get(path).status_code, 404, path)
+
+
+@override_settings(LOCATION_GEO_INDEX={"BACKGROUND": False})
+class NearbyParamTests(TestCase):
+    def setUp(self):
+        reset_spatial_indexes()
+        self.addCleanup(reset_spatial_indexes)
+        Location.objects.create(location_name="Baga Beach", city="Goa", latitude=15.55, longitude=73.75)
+
+    def test_non_finite_numbers_are_rejected(self):
+        for params in (
+            {"lat": "nan", "lng": "nan"},
+            {"lat": "15.5", "lng": "inf"},
+            {"lat": "15.5", "lng": "73.7", "k": "nan"},
+            {"lat": "15.5", "lng": "73.7", "radius_km": "-inf"},
+        ):
+            response = self.client.get("/api/locations/nearby/", params)
+            self.assertEqual(response.status_code, 400, params)
+
+    def test_finite_query_returns_rows(self):
+        response = self.client.get("/api/locations/nearby/", {"lat": "15.5", "lng": "73.7", "k": "5"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row["location_name"] for row in response.json()["results"]], ["Baga Beach"])
+
+
+def brute_force(points, lat, lng, k, radius_km=None):
+    ranked = sorted((haversine_km(lat, lng, plat, plng), pk) for pk, (plat, plng) in points.items())
+    return [pk for d, pk in ranked if radius_km is None or d <= radius_km][:k]
+
+
+class KDTreeTests(SimpleTestCase):
+    def setUp(self):
+        rng = random.Random(7)
+        self.points = {pk: (rng.uniform(-80, 80), rng.uniform(-180, 180)) for pk in range(500)}
+        # a cluster around Goa so small radii have something to find
+        self.points.update({1000 + i: (15.5 + rng.uniform(-1, 1), 73.8 + rng.uniform(-1, 1)) for i in range(200)})
+        self.tree = KDTree((pk, _unit_vector(lat, lng)) for pk, (lat, lng) in self.points.items())
+        self.queries = [(15.5, 73.8), (0, 179.9), (-79, -10), (60, 0)]
+
+    def test_k_nearest_matches_brute_force(self):
+        for lat, lng in self.queries:
+            for k in (1, 5, 50):
+                got = [pk for pk, _ in self.tree.nearest(_unit_vector(lat, lng), k)]
+                self.assertEqual(got, brute_force(self.points, lat, lng, k), (lat, lng, k))
+
+    def test_radius_and_exclusions(self):
+        index = SpatialIndex(Location)
+        index.tree = self.tree
+        lat, lng = self.queries[0]
+        index.remove(1000)
+        index.update(1001, 15.5, 73.8)   # moved onto the query point
+        moved = dict(self.points)
+        moved[1001] = (15.5, 73.8)
+        del moved[1000]
+
+        for radius_km in (5, 50, 300):
+            got = index.query(lat, lng, radius_km=radius_km, k=30)
+            self.assertEqual([hit.pk for hit in got], brute_force(moved, lat, lng, 30, radius_km), radius_km)
+            for hit in got:
+                self.assertAlmostEqual(hit.distance_km, haversine_km(lat, lng, *moved[hit.pk]), places=6)
+
+    def test_empty_tree(self):
+        self.assertEqual(KDTree(()).nearest(_unit_vector(0, 0), 5), [])
+
+
+class GeohashNearbyTests(TestCase):
+    def test_matches_brute_force(self):
+        rng = random.Random(11)
+        points = {}
+        for _ in range(120):
+            lat, lng = 15.5 + rng.uniform(-2, 2), 73.8 + rng.uniform(-2, 2)
+            points[Location.objects.create(location_name="Spot", latitude=lat, longitude=lng).pk] = (lat, lng)
+
+        for radius_km in (10, 80, None):
+            got = [hit.pk for hit in geohash_nearby(Location, 15.5, 73.8, radius_km, k=15)]
+            self.assertEqual(got, brute_force(points, 15.5, 73.8, 15, radius_km), radius_km)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        reset_search_backend()
+        self.addCleanup(reset_search_backend)
+        self.goa = Location.objects.create(location_name="Calangute Beach", city="North Goa", country="India")
+        Location.objects.create(location_name="North Sikkim Monastery", city="Gangtok", country="India")
+        Location.objects.create(location_name="Goa Velha", city="Panaji", country="India")
+
+    def test_every_word_of_a_multi_word_term_must_match(self):
+        self.assertEqual(search_places(Location, "North Goa", 10), [self.goa])
+        self.assertEqual(search_places_many(Location, ["North Goa"], 1), [(0, self.goa)])
@@ -2,7 +2,7 @@
 
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import LocationViewSet,HomesViewSet
+from .views import LocationViewSet,HomesViewSet,ImageDerivativeView,CatalogCacheStatsView
 
 # Create a router and register the Location viewset
 router = DefaultRouter()
@@ -10,4 +10,6 @@ router.register(r'locations', LocationViewSet, basename='location')
 router.register(r'homes', HomesViewSet, basename='homes')
 urlpatterns = [
     path('', include(router.urls)),
+    path('images/<path:name>', ImageDerivativeView.as_view(), name='image-derivative'),
+    path('catalog-cache/stats/', CatalogCacheStatsView.as_view(), name='catalog-cache-stats'),
 ]
@@ -1,15 +1,200 @@
 from rest_framework import viewsets, permissions
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
+import math
+import os
+from assistant.permissions import MonitoringViewMixin
+from .catalog_cache import get_catalog_cache
+from .conditional import ConditionalGetMixin
+from .fast_read import get_row_reader
+from .filters import CatalogFilter, CatalogOrderingFilter
+from .geo import has_coordinates, nearby
+from .images import CONTENT_TYPES, ImageUnavailable, derivative_path, image_settings
 from .models import Location,Homes
-from .serializers import LocationSerializer,HomesSerializer
+from .serializers import LocationSerializer,HomesSerializer,LocationCardSerializer,HomesCardSerializer
 
-class LocationViewSet(viewsets.ModelViewSet):
+NEARBY_DEFAULT_K = 20
+NEARBY_MAX_K = 100
+NEARBY_MAX_RADIUS_KM = 1000
+
+
+class CatalogCursorPagination(CursorPagination):
+    page_size = 20
+    page_size_query_param = "limit"
+    max_page_size = 100
+    # newest first unless ``?ordering=`` says otherwise (see CatalogOrderingFilter)
+    ordering = "-created_at"
+
+
+def _float_param(params, name, low=None, high=None):
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValidationError({name: "A number is required."})
+    if not math.isfinite(number):
+        # "nan" and "inf" parse, and NaN passes every range comparison below
+        raise ValidationError({name: "A number is required."})
+    if (low is not None and number < low) or (high is not None and number > high):
+        raise ValidationError({name: f"Must be between {low} and {high}."})
+    return number
+
+
+def nearby_origin(params):
+    """``(lat, lng)`` from ``?lat=&lng=``, or from the row named by ``?location=`` / ``?home=``."""
+    for name, model in (("location", Location), ("home", Homes)):
+        pk = params.get(name)
+        if pk:
+            if not str(pk).isdigit():
+                raise ValidationError({name: "An id is required."})
+            origin = get_object_or_404(model, pk=pk)
+            if not has_coordinates(origin.latitude, origin.longitude):
+                raise ValidationError({name: "This place has no coordinates."})
+            return origin.latitude, origin.longitude
+    lat = _float_param(params, "lat", -90, 90)
+    lng = _float_param(params, "lng", -180, 180)
+    if lat is None or lng is None:
+        raise ValidationError({"detail": "Pass lat and lng, or a location / home id."})
+    return lat, lng
+
+
+class CatalogCacheMixin:
+    """Serves ``list`` / ``retrieve`` through the catalog response cache."""
+
+    def _cached(self, request, kind, render):
+        response, hit = get_catalog_cache().get_or_render(self.queryset.model, request, kind, render)
+        response["X-Cache"] = "HIT" if hit else "MISS"
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(request, "list", lambda: super(CatalogCacheMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(
+            request, "detail", lambda: super(CatalogCacheMixin, self).retrieve(request, *args, **kwargs)
+        )
+
+
+class CatalogCacheStatsView(MonitoringViewMixin, APIView):
+    """Hit/miss counters of the catalog response cache, per model (staff or the monitoring token)."""
+
+    def get(self, request):
+        return Response(get_catalog_cache().stats())
+
+
+class FastListMixin:
+    """Lists through ``Location.fast_read`` (``.values()`` rows, no DRF fields) when the serializer allows it."""
+
+    def list(self, request, *args, **kwargs):
+        reader = get_row_reader(self.get_serializer_class())
+        if reader is None:
+            return super().list(request, *args, **kwargs)
+        queryset = reader.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(reader.rows(page, request))
+        return Response(reader.rows(queryset, request))
+
+
+class CatalogViewSetMixin(ConditionalGetMixin, CatalogCacheMixin, FastListMixin):
+    # conditional GET runs first, so a 304 skips the cache lookup as well
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = CatalogCursorPagination
+    filter_backends = [CatalogFilter, CatalogOrderingFilter]
+    ordering = "-created_at"
+    # ``?placeholder=1`` adds ``image_placeholder``, which only the image cards render
+    card_serializer_class = None
+
+    def get_serializer_class(self):
+        if self.card_serializer_class is not None and self.request.query_params.get("placeholder") in ("1", "true"):
+            return self.card_serializer_class
+        return super().get_serializer_class()
+
+    @action(detail=False, methods=["get"])
+    def nearby(self, request):
+        """Closest rows to a point, nearest first, each with ``distance_km``.
+
+        ``?radius_km=`` bounds the search (default: unbounded k-nearest) and
+        ``?k=`` caps the result count. The catalog filters select which rows
+        count, so a filtered query still returns ``k`` rows when that many match.
+        """
+        params = request.query_params
+        lat, lng = nearby_origin(params)
+        radius_km = _float_param(params, "radius_km", 0, NEARBY_MAX_RADIUS_KM)
+        k = int(_float_param(params, "k", 1, NEARBY_MAX_K) or NEARBY_DEFAULT_K)
+        catalog_filter = CatalogFilter()
+        queryset = catalog_filter.filter_queryset(request, self.get_queryset(), self)
+        hits = nearby(
+            self.queryset.model, lat, lng, radius_km, k,
+            queryset=queryset if catalog_filter.is_active(request) else None,
+        )
+
+        rows = queryset.in_bulk([h.pk for h in hits])
+        results = []
+        for hit in hits:
+            obj = rows.get(hit.pk)
+            if obj is not None:
+                data = self.get_serializer(obj).data
+                data["distance_km"] = round(hit.distance_km, 3)
+                results.append(data)
+        return Response({"origin": {"lat": lat, "lng": lng}, "results": results})
+
+
+class LocationViewSet(CatalogViewSetMixin, viewsets.ModelViewSet):
     queryset = Location.objects.all()
     serializer_class = LocationSerializer
-    permission_classes = [IsAuthenticatedOrReadOnly]
+    card_serializer_class = LocationCardSerializer
 
-class HomesViewSet(viewsets.ModelViewSet):
+class HomesViewSet(CatalogViewSetMixin, viewsets.ModelViewSet):
     queryset = Homes.objects.all()
     serializer_class = HomesSerializer
-    permission_classes = [IsAuthenticatedOrReadOnly]
+    card_serializer_class = HomesCardSerializer
+
+
+class ImageDerivativeView(APIView):
+    """Resized WebP/JPEG variant of a stored catalog image (see Location.images).
+
+    ``?w=`` is snapped to the configured width buckets; ``?fmt=webp|jpeg``
+    defaults to WebP when the client accepts it.
+    """
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+
+    def get(self, request, name):
+        conf = image_settings()
+        widths = sorted(conf["WIDTHS"])
+        try:
+            width = int(request.query_params.get("w") or widths[-1])
+        except ValueError:
+            raise ValidationError({"w": "An integer width is required."})
+        fmt = request.query_params.get("fmt")
+        negotiated = fmt is None
+        if negotiated:
+            fmt = "webp" if "image/webp" in request.META.get("HTTP_ACCEPT", "") and "webp" in conf["FORMATS"] else "jpeg"
+        if fmt not in conf["FORMATS"]:
+            raise ValidationError({"fmt": f"One of: {', '.join(conf['FORMATS'])}."})
+        try:
+            path = derivative_path(name, max(width, 1), fmt, conf=conf)
+        except ImageUnavailable:
+            raise Http404("No such image.")
 
+        # the file name is the source hash plus the variant, so it is a strong validator
+        etag = quote_etag(os.path.basename(path))
+        response = get_conditional_response(request._request, etag=etag)
+        if response is None:
+            response = FileResponse(open(path, "rb"), content_type=CONTENT_TYPES[fmt])
+            response["ETag"] = etag
+        patch_cache_control(response, public=True, max_age=conf["MAX_AGE"])
+        if negotiated:
+            patch_vary_headers(response, ["Accept"])
+        return response
@@ -4,3 +4,22 @@ from django.apps import AppConfig
 class AssistantConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'assistant'
+
+    def ready(self):
+        from django.conf import settings
+        from django.db.models.signals import post_save, post_delete
+        from Location.models import Location, Homes
+        from .gazetteer import place_saved, place_deleted
+        from .places import place_changed
+
+        # keep the in-memory gazetteer in step with catalog writes
+        for model in (Location, Homes):
+            post_save.connect(place_saved, sender=model, dispatch_uid=f"gazetteer_save_{model.__name__}")
+            post_delete.connect(place_deleted, sender=model, dispatch_uid=f"gazetteer_delete_{model.__name__}")
+            # a new or renamed row may satisfy a term cached as "not in catalog"
+            post_save.connect(place_changed, sender=model, dispatch_uid=f"places_save_{model.__name__}")
+
+        if getattr(settings, 'ASSISTANT_WARM_UP', False):
+            from .registry import get_registry
+
+            get_registry().warm_up()
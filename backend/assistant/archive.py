@@ -0,0 +1,36 @@
+# assistant/archive.py
+"""Cold-storage encoding for archived conversations.
+
+``compact_conversations`` packs the messages of idle conversations into one
+gzip-compressed JSON blob per conversation (a ``ConversationArchive`` row) and
+deletes the per-message rows. ``Conversation.rehydrate()`` restores them, with
+their original ids, the next time the conversation is opened.
+"""
+import gzip
+import json
+
+from django.utils.dateparse import parse_datetime
+
+CODEC = "gzip-json-v1"
+
+_FIELDS = ("id", "seq", "role", "content", "meta")
+
+
+def pack_messages(messages) -> bytes:
+    rows = []
+    for m in messages:
+        row = {f: getattr(m, f) for f in _FIELDS}
+        row["created_at"] = m.created_at.isoformat()
+        rows.append(row)
+    payload = json.dumps(rows, ensure_ascii=False, separators=(",", ":"))
+    return gzip.compress(payload.encode("utf-8"), compresslevel=6)
+
+
+def unpack_messages(blob, codec=CODEC) -> list:
+    """Decode an archive blob into a list of message dicts (``created_at`` parsed)."""
+    if codec != CODEC:
+        raise ValueError(f"Unsupported archive codec {codec!r}")
+    rows = json.loads(gzip.decompress(bytes(blob)).decode("utf-8"))
+    for row in rows:
+        row["created_at"] = parse_datetime(row["created_at"])
+    return rows
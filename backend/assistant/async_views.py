@@ -0,0 +1,193 @@
+# assistant/async_views.py
+"""ASGI-native versions of the LLM-bound assistant endpoints.
+
+DRF views are synchronous, so these are plain Django async views. The Gemini
+call is awaited on the event loop; only ORM work runs through ``sync_to_async``,
+which lets a single ASGI worker keep many LLM requests in flight.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import JsonResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .models import SequenceConflict
+from .serializers import ChatRequestSerializer
+from .context import build_context
+from .services import agenerate_safe_reply, agenerate_chat_turn
+from .views import (
+    get_or_create_conversation, match_catalog, persist_primary_destination, gazetteer_response, chat_turn_payload,
+)
+from .gazetteer import resolve_destination
+from Location.serializers import LocationSerializer, HomesSerializer
+
+
+def _authenticate(request):
+    """Resolve ``request.user`` the way the DRF views do: a JWT Bearer header or nobody.
+
+    The session cookie is deliberately ignored. These views are CSRF exempt, so
+    honouring it would let another site post as a logged-in admin.
+    """
+    result = JWTAuthentication().authenticate(request)
+    request.user = result[0] if result is not None else AnonymousUser()
+    return request.user
+
+
+async def aauthenticate(request):
+    """Authenticate an async request; returns a 401 JsonResponse on bad credentials."""
+    try:
+        await sync_to_async(_authenticate)(request)
+    except exceptions.AuthenticationFailed as e:
+        detail = e.detail if isinstance(e.detail, dict) else {"detail": e.detail}
+        return JsonResponse(detail, status=401)
+    return None
+
+
+def parse_json_body(request):
+    if not request.body:
+        return {}
+    try:
+        data = json.loads(request.body)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _serialize_matches(locations, homes, request=None):
+    context = {"request": request} if request is not None else {}
+    return (
+        LocationSerializer(locations, many=True, context=context).data,
+        HomesSerializer(homes, many=True, context=context).data,
+    )
+
+
+class AsyncChatView(View):
+    """Async counterpart of ``ChatView``."""
+
+    async def post(self, request):
+        denied = await aauthenticate(request)
+        if denied:
+            return denied
+        data = parse_json_body(request)
+        if data is None:
+            return JsonResponse({"detail": "Invalid JSON body."}, status=400)
+        ser = ChatRequestSerializer(data=data)
+        if not ser.is_valid():
+            return JsonResponse(ser.errors, status=400)
+        conv_id = ser.validated_data.get("conversation_id")
+        user_msg = ser.validated_data["message"]
+        model_name = ser.validated_data.get("model_name") or "gemini-2.5-flash"
+
+        def start_turn():
+            conversation = get_or_create_conversation(request, conv_id, model_name)
+            try:
+                user_message = conversation.append_message(
+                    "user", user_msg, expected_seq=ser.validated_data.get("expected_seq")
+                )
+            except SequenceConflict as e:
+                return conversation, e, None
+            return conversation, user_message, build_context(conversation)
+
+        conversation, user_message, history = await sync_to_async(start_turn)()
+        if isinstance(user_message, SequenceConflict):
+            return JsonResponse({
+                "error": "Conversation changed since it was last read; reload and retry.",
+                "conversation_id": conversation.id,
+                "seq": user_message.current_seq,
+            }, status=409)
+
+        turn = await agenerate_chat_turn(history, model_name=conversation.model_name)
+        reply_text = turn.get("reply") or ""
+        classification = turn.get("classification") or {}
+
+        def finish_turn():
+            meta = {"classification": classification, "reply_to_seq": user_message.seq, "llm": turn.get("llm")}
+            if turn.get("error"):
+                meta["error"] = turn["error"]
+            reply_message = conversation.append_message("assistant", reply_text, meta=meta)
+            try:
+                persist_primary_destination(classification, user_msg)
+            except Exception:
+                # Non-fatal: keep chat flow working even if persistence fails
+                pass
+            return chat_turn_payload(
+                conversation, [user_message, reply_message], reply_text, classification,
+                ser.validated_data["response_mode"],
+            )
+
+        return JsonResponse(await sync_to_async(finish_turn)())
+
+
+class AsyncChatClassificationView(View):
+    """Async counterpart of ``ChatClassificationView``."""
+
+    async def post(self, request):
+        denied = await aauthenticate(request)
+        if denied:
+            return denied
+        data = parse_json_body(request) or {}
+        user_input = data.get("message", "")
+        if not user_input:
+            return JsonResponse({"error": "Message is required."}, status=400)
+
+        hit = await sync_to_async(resolve_destination)(user_input)
+        if hit:
+            return JsonResponse(await sync_to_async(gazetteer_response)(hit, request))
+
+        gemini_data = await agenerate_safe_reply(user_input)
+        if isinstance(gemini_data, dict) and gemini_data.get("error") and not gemini_data.get("fallback"):
+            return JsonResponse(gemini_data)
+
+        classification = gemini_data.get("fallback") if gemini_data.get("fallback") else gemini_data
+
+        def lookup():
+            locations, homes = match_catalog(classification, user_input)
+            return _serialize_matches(locations, homes, request)
+
+        loc_data, home_data = await sync_to_async(lookup)()
+        return JsonResponse({
+            "gemini_classification": gemini_data,
+            "classification_source": "llm",
+            "matching_locations": loc_data,
+            "matching_homes": home_data,
+            "auto_scraped_locations": [],
+            "auto_scraped_homes": [],
+        })
+
+
+class AsyncChatSearchView(View):
+    """Async counterpart of ``ChatSearchView``."""
+
+    async def post(self, request):
+        denied = await aauthenticate(request)
+        if denied:
+            return denied
+        data = parse_json_body(request) or {}
+        user_input = data.get("message", "")
+        if not user_input:
+            return JsonResponse({"error": "Message is required."}, status=400)
+
+        hit = await sync_to_async(resolve_destination)(user_input)
+        if hit:
+            return JsonResponse(await sync_to_async(gazetteer_response)(hit))
+
+        gemini_data = await agenerate_safe_reply(user_input)
+        if "error" in gemini_data:
+            return JsonResponse({"error": gemini_data["error"]}, status=500)
+
+        def lookup():
+            locations, homes = match_catalog(gemini_data, user_input)
+            return _serialize_matches(locations, homes)
+
+        loc_data, home_data = await sync_to_async(lookup)()
+        return JsonResponse({
+            "gemini_classification": gemini_data,
+            "classification_source": "llm",
+            "matching_locations": loc_data,
+            "matching_homes": home_data,
+            "auto_scraped_locations": [],
+            "auto_scraped_homes": [],
+        })
@@ -0,0 +1,264 @@
+# assistant/cache.py
+"""Response cache for Gemini calls.
+
+Responses are keyed on the normalized prompt, the model name and the generation
+config so that the same destination prompt ("3 days in Goa") is only sent to the
+model once per TTL window. Two backends are available: an in-process LRU (the
+default) and the Django cache framework, selected via ``ASSISTANT_LLM_CACHE``.
+Concurrent misses for the same key are coalesced (see assistant.singleflight), so
+a burst of identical prompts reaches the model once.
+"""
+
+import copy
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .singleflight import SingleFlight, build_lock_backend
+
+DEFAULT_CACHE_SETTINGS = {
+    "BACKEND": "local",      # "local" (in-process LRU) or "django" (django.core.cache)
+    "MAX_ENTRIES": 1024,
+    "TTL": 60 * 60,          # seconds
+    "CACHE_ALIAS": "default",
+    "KEY_PREFIX": "llm",
+    "ENABLED": True,
+    "COALESCE": True,        # share one in-flight call between identical concurrent misses
+    "LOCK_DIR": "",          # directory for per-key file locks; coalesces across processes on one host
+}
+
+_MISSING = object()
+
+
+def normalize_prompt(prompt) -> str:
+    """Collapse whitespace and case so trivially different phrasings share a key."""
+    if not isinstance(prompt, str):
+        prompt = json.dumps(prompt, sort_keys=True, default=str)
+    return re.sub(r"\s+", " ", prompt).strip().casefold()
+
+
+class LocalBackend:
+    """Bounded in-process LRU with per-entry TTL expiry.
+
+    Values are deep-copied on the way in and out, as a pickling cache backend
+    would, so a caller that edits what it got back cannot change the entry.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return _MISSING
+            expires_at, value = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+        return copy.deepcopy(value)
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DjangoCacheBackend:
+    """Delegates storage to a configured Django cache (eviction is handled by that backend)."""
+
+    def __init__(self, alias="default"):
+        from django.core.cache import caches
+
+        self._cache = caches[alias]
+
+    def get(self, key):
+        return self._cache.get(key, _MISSING)
+
+    def set(self, key, value, ttl=None):
+        self._cache.set(key, value, timeout=ttl)
+
+    def delete(self, key):
+        self._cache.delete(key)
+
+    def clear(self):
+        self._cache.clear()
+
+
+class ResponseCache:
+    """Caches parsed model responses and keeps hit/miss counters."""
+
+    def __init__(self, backend, ttl=None, key_prefix="llm", enabled=True, flight=None):
+        self.backend = backend
+        self.ttl = ttl
+        self.key_prefix = key_prefix
+        self.enabled = enabled
+        self.flight = flight
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def make_key(self, prompt, model_name, generation_config=None, namespace="") -> str:
+        payload = json.dumps(
+            {
+                "prompt": normalize_prompt(prompt),
+                "model": model_name,
+                "config": generation_config or {},
+                "ns": namespace,
+            },
+            sort_keys=True,
+            default=str,
+        )
+        digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        return f"{self.key_prefix}:{digest}"
+
+    def get(self, key):
+        if not self.enabled:
+            return _MISSING
+        value = self.backend.get(key)
+        with self._lock:
+            if value is _MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        if self.enabled:
+            self.backend.set(key, value, ttl if ttl is not None else self.ttl)
+
+    def get_or_call(self, key, func, cacheable=None):
+        """Return the cached value for ``key`` or call ``func`` and store its result.
+
+        ``cacheable`` decides whether a freshly computed result may be stored; by
+        default error payloads (dicts with an ``error`` key) are never cached.
+        Concurrent misses for the same key share a single ``func()`` call; error
+        payloads are shared with those waiters too, just not stored.
+        """
+        value = self.get(key)
+        if value is not _MISSING:
+            return value
+        check = cacheable or is_cacheable_response
+
+        def compute():
+            # another process holding the key's lock may have just filled the cache
+            value = self._recheck(key)
+            if value is _MISSING:
+                value = func()
+                if check(value):
+                    self.set(key, value)
+            return value
+
+        if self.flight is None:
+            return compute()
+        return self.flight.do(key, compute)[0]
+
+    async def aget_or_call(self, key, coro_func, cacheable=None):
+        """Async ``get_or_call``; ``coro_func`` returns an awaitable.
+
+        Local lookups are in-memory and safe to run on the event loop.
+        """
+        value = self.get(key)
+        if value is not _MISSING:
+            return value
+        check = cacheable or is_cacheable_response
+
+        async def compute():
+            value = self._recheck(key)
+            if value is _MISSING:
+                value = await coro_func()
+                if check(value):
+                    self.set(key, value)
+            return value
+
+        if self.flight is None:
+            return await compute()
+        return (await self.flight.ado(key, compute))[0]
+
+    def _recheck(self, key):
+        # only worth a second lookup when a cross-process lock may have been waited on
+        if not self.enabled or self.flight is None or self.flight.lock_backend is None:
+            return _MISSING
+        return self.backend.get(key)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": (hits / total) if total else 0.0,
+            "size": len(self.backend) if hasattr(self.backend, "__len__") else None,
+            "coalesced": self.flight.coalesced if self.flight is not None else 0,
+        }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+        if self.flight is not None:
+            self.flight.coalesced = 0
+
+    def clear(self):
+        self.backend.clear()
+        self.reset_stats()
+
+
+def is_cacheable_response(value) -> bool:
+    if not isinstance(value, dict):
+        return value is not None
+    return "error" not in value and "raw_text" not in value
+
+
+def build_cache(config=None) -> ResponseCache:
+    conf = dict(DEFAULT_CACHE_SETTINGS)
+    conf.update(config or {})
+    if conf["BACKEND"] == "django":
+        backend = DjangoCacheBackend(conf["CACHE_ALIAS"])
+    else:
+        backend = LocalBackend(max_entries=conf["MAX_ENTRIES"])
+    return ResponseCache(
+        backend,
+        ttl=conf["TTL"],
+        key_prefix=conf["KEY_PREFIX"],
+        enabled=conf["ENABLED"],
+        flight=SingleFlight(build_lock_backend(conf["LOCK_DIR"])) if conf["COALESCE"] else None,
+    )
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide response cache, building it from settings on first use."""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = build_cache(getattr(settings, "ASSISTANT_LLM_CACHE", None))
+    return _response_cache
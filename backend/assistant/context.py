@@ -0,0 +1,134 @@
+# assistant/context.py
+"""Token-budgeted conversation context for chat turns.
+
+Instead of replaying the whole conversation on every turn, the last few messages
+are sent verbatim and everything older is folded into a rolling summary stored
+on the ``Conversation``. Only messages that slid out of the recent window since
+the previous turn are read and folded, so the per-turn cost stays flat however
+long the chat grows.
+
+A summary line is a message's first sentence plus every sentence that states a
+trip constraint (budget, dates or duration, party size; see ``CONSTRAINT_RE``).
+When the summary outgrows its share of the budget, lines without constraints
+go first, so "our budget is ₹30,000" from twenty turns ago is still sent.
+"""
+import re
+
+from django.conf import settings
+
+DEFAULT_CONTEXT_SETTINGS = {
+    "RECENT_MESSAGES": 8,     # messages sent verbatim (user + assistant)
+    "TOKEN_BUDGET": 2000,     # approximate tokens for summary + recent messages
+    "SUMMARY_LINE_CHARS": 160,
+}
+
+
+def context_settings() -> dict:
+    conf = dict(DEFAULT_CONTEXT_SETTINGS)
+    conf.update(getattr(settings, "ASSISTANT_CONTEXT", None) or {})
+    return conf
+
+
+_MONTHS = r"jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|june?|july?|aug(?:ust)?|sept?(?:ember)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?"
+
+# sentences stating the trip's budget, dates / duration or party size
+CONSTRAINT_RE = re.compile(
+    r"₹|\$\s*\d|\b(?:rs\.?|inr)\s*\d|\d\s*(?:rupees|rs\b|inr\b|k\b|lakhs?\b)|\bbudget|\bafford"
+    rf"|\b\d+\s*(?:days?|nights?|weeks?)\b|\bweekend\b|\b(?:{_MONTHS})\b|\bmay\s+\d|\d\s+may\b"
+    r"|\b\d{1,2}(?:st|nd|rd|th)\b|\b\d{1,2}[/-]\d{1,2}\b|\b(?:tomorrow|next (?:week|month))\b"
+    r"|\b(?:\d+|two|three|four|five|six)\s+(?:people|persons?|adults?|kids|children|travell?ers|guests|of us)\b"
+    r"|\b(?:solo|couple|family|honeymoon|with (?:my|our) \w+)\b",
+    re.IGNORECASE,
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English prose)."""
+    return (len(text or "") + 3) // 4
+
+
+def _clip(sentence: str, max_chars: int) -> str:
+    """Shorten ``sentence`` to ``max_chars``, keeping its first constraint in view."""
+    if len(sentence) <= max_chars:
+        return sentence
+    match = CONSTRAINT_RE.search(sentence)
+    if match is None or match.end() <= max_chars - 1:
+        return sentence[: max_chars - 1].rstrip() + "…"
+    start = max(0, match.start() - max_chars // 4)
+    return "…" + sentence[start: start + max_chars - 2].strip() + "…"
+
+
+def summarize_message(role: str, content: str, max_chars: int) -> str:
+    """Condense one message into a single summary line.
+
+    The line holds the first sentence and any later sentences stating a trip
+    constraint, each clipped to ``max_chars``.
+    """
+    text = re.sub(r"\s+", " ", content or "").strip()
+    first, *rest = re.split(r"(?<=[.!?])\s", text)
+    kept = [first] + [sentence for sentence in rest if CONSTRAINT_RE.search(sentence)]
+    who = "User" if role == "user" else "Assistant"
+    return f"{who}: " + " … ".join(_clip(sentence, max_chars) for sentence in kept)
+
+
+def _drop_rank(line: str) -> int:
+    """Lines with a lower rank leave the summary first: chit-chat, then the assistant's constraints."""
+    if not CONSTRAINT_RE.search(line):
+        return 0
+    return 2 if line.startswith("User:") else 1
+
+
+def fold_into_summary(summary: str, messages, conf: dict) -> str:
+    """Append summary lines for ``messages`` and keep the summary within half the budget.
+
+    Once the summary outgrows its share, the oldest line of the lowest ``_drop_rank``
+    is dropped until it fits; what the user said about budget, dates and party size
+    is dropped last.
+    """
+    lines = [l for l in (summary or "").split("\n") if l]
+    lines.extend(summarize_message(m.role, m.content, conf["SUMMARY_LINE_CHARS"]) for m in messages)
+    limit = conf["TOKEN_BUDGET"] // 2
+    while lines and estimate_tokens("\n".join(lines)) > limit:
+        ranks = [_drop_rank(line) for line in lines]
+        del lines[ranks.index(min(ranks))]
+    return "\n".join(lines)
+
+
+def build_context(conversation, conf: dict = None) -> list:
+    """Return the ``{"role", "content"}`` list to send for the next turn.
+
+    Reads at most ``RECENT_MESSAGES`` rows plus the rows that left the window since
+    the last call, updates ``conversation.summary`` in place and saves it when it
+    changes. A ``system`` entry carrying the summary is prepended when one exists.
+    """
+    conf = conf or context_settings()
+    recent = list(conversation.messages.order_by("-created_at", "-id")[: conf["RECENT_MESSAGES"]])
+    recent.reverse()
+    if conversation.summary_until_id:
+        # messages already folded into the summary are not repeated verbatim
+        recent = [m for m in recent if m.id > conversation.summary_until_id]
+
+    if recent:
+        # fold anything between the previous summary boundary and the recent window
+        stale = conversation.messages.filter(id__lt=recent[0].id)
+        if conversation.summary_until_id:
+            stale = stale.filter(id__gt=conversation.summary_until_id)
+        stale = list(stale.order_by("created_at", "id"))
+    else:
+        stale = []
+
+    # enforce the token budget on the verbatim window (always keep the latest message)
+    budget = conf["TOKEN_BUDGET"]
+    while len(recent) > 1 and sum(estimate_tokens(m.content) for m in recent) > budget // 2:
+        stale.append(recent.pop(0))
+
+    if stale:
+        conversation.summary = fold_into_summary(conversation.summary, stale, conf)
+        conversation.summary_until_id = stale[-1].id
+        conversation.save(update_fields=["summary", "summary_until_id"])
+
+    context = []
+    if conversation.summary:
+        context.append({"role": "system", "content": conversation.summary})
+    context.extend({"role": m.role, "content": m.content} for m in recent)
+    return context
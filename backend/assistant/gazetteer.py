@@ -0,0 +1,319 @@
+# assistant/gazetteer.py
+"""In-memory gazetteer of catalog places.
+
+Names and cities of every ``Location`` and ``Homes`` row are tokenized into a
+token trie. Scanning a message then finds every known place it mentions in one
+pass, preferring the longest phrase at each position ("new delhi" over
+"delhi"). When a message names a known place with high confidence,
+``/classify/`` and ``/search/`` answer from here without calling Gemini.
+
+Only curated rows are indexed: places ``attach_places_from_itinerary`` created
+from a generated plan (``from_itinerary``) are often activity names like
+"Local Transport". A match counts as confident when it is a multi-word place
+name, when it is all the message says apart from trip vocabulary ("goa",
+"5 days in goa"), or when it is written capitalised like a proper noun and is
+the only place the message names.
+
+The trie is built from the database on first use. ``post_save`` /
+``post_delete`` handlers (connected in ``AssistantConfig.ready``) update it in
+place, and it is rebuilt every ``REFRESH_SECONDS`` to pick up writes made by
+other processes. With ``BACKGROUND`` the rebuild runs in a thread while the old
+trie keeps answering, and the new one is swapped in when it is complete.
+"""
+import logging
+import re
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from Location.search import STOPWORDS as QUERY_STOPWORDS
+
+DEFAULT_GAZETTEER_SETTINGS = {
+    "ENABLED": True,
+    "MIN_CHARS": 3,            # shorter phrases are too ambiguous to skip the model
+    "REFRESH_SECONDS": 300,    # full rebuild interval; 0 disables it
+    "BACKGROUND": True,        # refresh in a thread, serving the old trie meanwhile
+}
+
+logger = logging.getLogger(__name__)
+
+# single words that show up as catalog cities/names but are ordinary travel vocabulary
+STOPWORDS = frozenset({
+    "beach", "city", "hotel", "home", "homes", "resort", "stay", "trip", "travel", "visit",
+    "place", "places", "north", "south", "east", "west", "central", "old", "new",
+})
+
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+# ``proper``: every token of the phrase was capitalised in the text
+Match = namedtuple("Match", ["phrase", "start", "end", "refs", "proper"])
+GazetteerHit = namedtuple("GazetteerHit", ["classification", "matches"])
+
+
+def gazetteer_settings() -> dict:
+    conf = dict(DEFAULT_GAZETTEER_SETTINGS)
+    conf.update(getattr(settings, "ASSISTANT_GAZETTEER", None) or {})
+    return conf
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall((text or "").casefold())
+
+
+def _filler(token) -> bool:
+    """Trip vocabulary and numbers that do not change what place a message is about."""
+    return token.isdigit() or len(token) < 2 or token in QUERY_STOPWORDS
+
+
+class Gazetteer:
+    """Token trie mapping place phrases to the catalog rows that carry them."""
+
+    END = "$"
+
+    def __init__(self, min_chars=3):
+        self.min_chars = min_chars
+        self._root = {}
+        self._display = {}      # phrase -> name as written in the catalog
+        self._phrases = {}      # (kind, pk) -> phrases indexed for that row
+        self._lock = threading.RLock()
+        self.built_at = None
+
+    def __len__(self):
+        return len(self._phrases)
+
+    def _node(self, tokens, create=False):
+        node = self._root
+        for token in tokens:
+            child = node.get(token)
+            if child is None:
+                if not create:
+                    return None
+                child = node[token] = {}
+            node = child
+        return node
+
+    def add(self, kind, pk, names, country=None):
+        """Index (or re-index) one catalog row under each of ``names``."""
+        with self._lock:
+            self.remove(kind, pk)
+            phrases = set()
+            for name in names:
+                tokens = tokenize(name)
+                if not tokens:
+                    continue
+                phrase = " ".join(tokens)
+                node = self._node(tokens, create=True)
+                node.setdefault(self.END, {})[(kind, pk)] = country or ""
+                self._display.setdefault(phrase, " ".join((name or "").split()))
+                phrases.add(phrase)
+            if phrases:
+                self._phrases[(kind, pk)] = phrases
+
+    def remove(self, kind, pk):
+        with self._lock:
+            for phrase in self._phrases.pop((kind, pk), ()):
+                node = self._node(phrase.split(" "))
+                if node is not None:
+                    node.get(self.END, {}).pop((kind, pk), None)
+
+    def clear(self):
+        with self._lock:
+            self._root = {}
+            self._display = {}
+            self._phrases = {}
+
+    def scan(self, text):
+        """Return the longest known phrase starting at each position, left to right,
+        without overlaps."""
+        raw = _TOKEN_RE.findall(text or "")
+        tokens = [t.casefold() for t in raw]
+        matches = []
+        i = 0
+        root = self._root
+        while i < len(tokens):
+            node = root
+            best = None
+            j = i
+            while j < len(tokens):
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                j += 1
+                refs = node.get(self.END)
+                if refs:
+                    best = (j, dict(refs))
+            if best is None:
+                i += 1
+                continue
+            end, refs = best
+            proper = all(t[:1].isupper() for t in raw[i:end])
+            matches.append(Match(" ".join(tokens[i:end]), i, end, refs, proper))
+            i = end
+        return matches
+
+    def confident(self, match, matches=(), tokens=()) -> bool:
+        """Whether ``match`` is safe to act on without asking the model.
+
+        ``matches`` are all the places found in the text and ``tokens`` its
+        casefolded tokens.
+        """
+        if len(match.phrase) < self.min_chars or match.phrase in STOPWORDS:
+            return False
+        if match.end - match.start > 1:
+            return True
+        rest = tokens[:match.start] + tokens[match.end:]
+        if tokens and all(_filler(t) for t in rest):
+            return True
+        unique = len({m.phrase for m in matches}) == 1
+        return match.proper and unique
+
+    def resolve(self, text):
+        """Return a ``GazetteerHit`` when ``text`` names a known place with high confidence.
+
+        The first confident match becomes the primary destination and the remaining
+        ones become nearby suggestions, mirroring the model's classification shape.
+        """
+        tokens = tokenize(text)
+        with self._lock:
+            found = self.scan(text)
+            matches = [m for m in found if self.confident(m, found, tokens)]
+            if not matches:
+                return None
+            display = {m.phrase: self._display.get(m.phrase, m.phrase) for m in matches}
+
+        primary = matches[0]
+        countries = [c for c in primary.refs.values() if c]
+        classification = {
+            "primary_destination": {
+                "location": display[primary.phrase],
+                "region": countries[0] if countries else "",
+                "interests": [],
+                "description": "Matched a known place in the catalog.",
+            },
+            "nearby_suggestions": [
+                {"location": display[m.phrase]}
+                for m in dict((m.phrase, m) for m in matches[1:] if m.phrase != primary.phrase).values()
+            ],
+        }
+        return GazetteerHit(classification, matches)
+
+
+def _row_names(obj):
+    return [obj.location_name, obj.city]
+
+
+def build_gazetteer(conf=None, gazetteer=None) -> Gazetteer:
+    """Fill ``gazetteer`` (a new one by default) from every curated ``Location`` and ``Homes`` row."""
+    from Location.models import Location, Homes
+
+    conf = conf or gazetteer_settings()
+    if gazetteer is None:
+        gazetteer = Gazetteer(min_chars=conf["MIN_CHARS"])
+    for kind, model in (("location", Location), ("home", Homes)):
+        rows = model.objects.filter(from_itinerary=False)
+        for pk, name, city, country in rows.values_list("pk", "location_name", "city", "country"):
+            gazetteer.add(kind, pk, [name, city], country)
+    gazetteer.built_at = time.monotonic()
+    return gazetteer
+
+
+_gazetteer = None           # trie serving lookups
+_building = None            # replacement being built; receives writes as well
+_gazetteer_lock = threading.Lock()
+
+
+def _rebuild(conf, gazetteer):
+    global _gazetteer, _building
+    try:
+        build_gazetteer(conf, gazetteer)
+    except Exception:
+        logger.exception("Rebuilding the gazetteer failed")
+        with _gazetteer_lock:
+            if _building is gazetteer:
+                _building = None
+        return
+    with _gazetteer_lock:
+        if _building is gazetteer:
+            _building = None
+            _gazetteer = gazetteer
+
+
+def _rebuild_in_background(conf, gazetteer):
+    try:
+        _rebuild(conf, gazetteer)
+    finally:
+        close_old_connections()
+
+
+def get_gazetteer():
+    """Return the process-wide gazetteer (None when disabled), rebuilding it when stale.
+
+    The first build happens in the calling request. Later refreshes run in a
+    background thread (``BACKGROUND``) and the stale trie answers until then.
+    """
+    global _gazetteer, _building
+    conf = gazetteer_settings()
+    if not conf["ENABLED"]:
+        return None
+    refresh = conf["REFRESH_SECONDS"]
+
+    def stale(gazetteer):
+        return gazetteer is None or (refresh and time.monotonic() - gazetteer.built_at > refresh)
+
+    current = _gazetteer
+    if not stale(current):
+        return current
+    with _gazetteer_lock:
+        current = _gazetteer
+        if current is None:
+            current = _gazetteer = build_gazetteer(conf)
+            return current
+        if not stale(current) or _building is not None:
+            return current
+        building = _building = Gazetteer(min_chars=conf["MIN_CHARS"])
+    if conf["BACKGROUND"]:
+        threading.Thread(
+            target=_rebuild_in_background, args=(conf, building), name="gazetteer-rebuild", daemon=True,
+        ).start()
+        return current
+    _rebuild(conf, building)
+    return _gazetteer
+
+
+def resolve_destination(text):
+    """Gazetteer lookup used by the classify/search views; None means "ask the model"."""
+    gazetteer = get_gazetteer()
+    return gazetteer.resolve(text) if gazetteer is not None else None
+
+
+def reset_gazetteer():
+    global _gazetteer, _building
+    with _gazetteer_lock:
+        _gazetteer = None
+        _building = None
+
+
+def _kind_for(sender):
+    return "home" if sender.__name__ == "Homes" else "location"
+
+
+def _live_gazetteers():
+    # the serving trie and, during a rebuild, its replacement
+    return [g for g in (_gazetteer, _building) if g is not None]
+
+
+def place_saved(sender, instance, **kwargs):
+    # nothing to update until the gazetteer has been built
+    for gazetteer in _live_gazetteers():
+        if instance.from_itinerary:
+            gazetteer.remove(_kind_for(sender), instance.pk)
+        else:
+            gazetteer.add(_kind_for(sender), instance.pk, _row_names(instance), instance.country)
+
+
+def place_deleted(sender, instance, **kwargs):
+    for gazetteer in _live_gazetteers():
+        gazetteer.remove(_kind_for(sender), instance.pk)
@@ -0,0 +1,216 @@
+# assistant/limiter.py
+"""Client-side quota guard for model calls.
+
+Each model gets one ``QuotaGuard`` shared by every request in the process: a
+token bucket sized to our Gemini quota spaces calls out, and a circuit breaker
+trips after repeated ``ResourceExhausted`` errors. While the breaker is open (or
+no token frees up within ``MAX_WAIT``) calls fail fast with ``QuotaUnavailable``
+and the services fall back to their deterministic answers instead of sleeping
+inside the web worker. After ``RESET_TIMEOUT`` a single probe call is let
+through; its result closes or re-opens the breaker.
+"""
+import asyncio
+import threading
+import time
+
+from django.conf import settings
+from google.api_core.exceptions import ResourceExhausted
+
+DEFAULT_QUOTA_SETTINGS = {
+    "ENABLED": True,
+    "REQUESTS_PER_MINUTE": 60,    # sustained rate per model
+    "BURST": 10,                  # bucket capacity
+    "MAX_WAIT": 0.25,             # seconds a call may wait for a token before failing fast
+    "FAILURE_THRESHOLD": 3,       # consecutive quota errors that open the breaker
+    "RESET_TIMEOUT": 30.0,        # seconds the breaker stays open before a probe
+}
+
+
+def quota_settings() -> dict:
+    conf = dict(DEFAULT_QUOTA_SETTINGS)
+    conf.update(getattr(settings, "ASSISTANT_LLM_QUOTA", None) or {})
+    return conf
+
+
+class QuotaUnavailable(ResourceExhausted):
+    """Raised without calling the model: the breaker is open or the bucket is empty."""
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second, capacity, clock=time.monotonic):
+        self.rate = float(rate_per_second)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self._clock = clock
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, max_wait=0.0):
+        """Take one token and return how long the caller must wait before using it.
+
+        Returns ``None`` (taking nothing) when the wait would exceed ``max_wait``.
+        """
+        with self._lock:
+            self._refill(self._clock())
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            if self.rate <= 0:
+                return None
+            wait = (1 - self.tokens) / self.rate
+            if wait > max_wait:
+                return None
+            # the token is borrowed from the future; later callers queue behind it
+            self.tokens -= 1
+            return wait
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold, reset_timeout, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._clock = clock
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self._clock() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN and not self._probing:
+                # exactly one probe at a time while half-open
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = self._clock()
+            self._probing = False
+
+    def release(self):
+        """Give back a half-open probe slot that was not used."""
+        with self._lock:
+            self._probing = False
+
+    def retry_after(self) -> float:
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (self._clock() - self.opened_at))
+
+
+class QuotaGuard:
+    """Token bucket + circuit breaker guarding one model."""
+
+    def __init__(self, conf=None):
+        conf = dict(DEFAULT_QUOTA_SETTINGS, **(conf or {}))
+        self.enabled = conf["ENABLED"]
+        self.max_wait = float(conf["MAX_WAIT"])
+        self.bucket = TokenBucket(conf["REQUESTS_PER_MINUTE"] / 60.0, conf["BURST"])
+        self.breaker = CircuitBreaker(conf["FAILURE_THRESHOLD"], conf["RESET_TIMEOUT"])
+
+    def _reserve(self) -> float:
+        if not self.enabled:
+            return 0.0
+        if not self.breaker.allow():
+            raise QuotaUnavailable(
+                f"Quota circuit open; retry in {self.breaker.retry_after():.0f}s"
+            )
+        wait = self.bucket.reserve(self.max_wait)
+        if wait is None:
+            # nothing was sent, so a half-open probe must not stay claimed
+            self.breaker.release()
+            raise QuotaUnavailable("Client-side rate limit reached")
+        return wait
+
+    def admit(self):
+        """Block for at most ``MAX_WAIT`` until a call may go out; raises ``QuotaUnavailable``."""
+        wait = self._reserve()
+        if wait:
+            time.sleep(wait)
+
+    async def aadmit(self):
+        wait = self._reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+    def record(self, exc=None):
+        """Report the result of an admitted call.
+
+        A quota error counts against the breaker and a success closes it. Any
+        other error says nothing about quota, so it leaves the breaker as it was
+        and only gives back a half-open probe slot.
+        """
+        if not self.enabled:
+            return
+        if exc is None:
+            self.breaker.record_success()
+        elif isinstance(exc, ResourceExhausted):
+            self.breaker.record_failure()
+        else:
+            self.breaker.release()
+
+    def release(self):
+        """Report an admitted call that ended without a result (e.g. an abandoned stream)."""
+        if self.enabled:
+            self.breaker.release()
+
+    def state(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "circuit": self.breaker.state,
+            "consecutive_quota_errors": self.breaker.failures,
+            "retry_after": round(self.breaker.retry_after(), 1),
+            "tokens": round(self.bucket.tokens, 2),
+        }
+
+
+_guards = {}
+_guards_lock = threading.Lock()
+
+
+def get_quota_guard(model_name) -> QuotaGuard:
+    """Return the process-wide guard for ``model_name``, creating it on first use."""
+    guard = _guards.get(model_name)
+    if guard is None:
+        with _guards_lock:
+            guard = _guards.get(model_name)
+            if guard is None:
+                guard = _guards[model_name] = QuotaGuard(quota_settings())
+    return guard
+
+
+def quota_states() -> dict:
+    with _guards_lock:
+        return {name: guard.state() for name, guard in sorted(_guards.items())}
+
+
+def reset_quota_guards():
+    """Forget every guard (e.g. after changing ``ASSISTANT_LLM_QUOTA``)."""
+    with _guards_lock:
+        _guards.clear()
@@ -0,0 +1,81 @@
+# assistant/management/commands/compact_conversations.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from assistant.models import Conversation
+
+
+class Command(BaseCommand):
+    help = (
+        "Archive conversations idle for longer than --idle-days into compressed blobs "
+        "and delete their Message rows. Archived conversations are restored "
+        "automatically when they are opened again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--idle-days", type=int,
+            default=getattr(settings, "ASSISTANT_ARCHIVE_IDLE_DAYS", 30),
+            help="Archive conversations not updated for this many days.",
+        )
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument(
+            "--limit", type=int, default=None,
+            help="Stop after this many conversations (default: all eligible).",
+        )
+        parser.add_argument(
+            "--delete-empty", action="store_true",
+            help="Delete idle conversations that have no messages instead of archiving them.",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be done.")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["idle_days"])
+        idle = Conversation.objects.filter(updated_at__lt=cutoff, archived_at__isnull=True)
+
+        if options["delete_empty"]:
+            empty = idle.annotate(n=Count("messages")).filter(n=0)
+            if options["dry_run"]:
+                count = empty.count()
+            else:
+                with transaction.atomic():
+                    # lock and re-check under the lock: a message appended since makes the row
+                    # non-idle, and deleting it would cascade to that message
+                    pks = list(empty.values_list("pk", flat=True))
+                    locked = list(
+                        Conversation.objects.select_for_update()
+                        .filter(pk__in=pks, updated_at__lt=cutoff, archived_at__isnull=True)
+                        .values_list("pk", flat=True)
+                    )
+                    count = len(locked)
+                    Conversation.objects.filter(pk__in=locked).delete()
+            self.stdout.write(f"{'Would delete' if options['dry_run'] else 'Deleted'} {count} empty conversations.")
+
+        candidates = idle.order_by("updated_at", "pk")
+        if options["limit"]:
+            candidates = candidates[: options["limit"]]
+        if options["dry_run"]:
+            self.stdout.write(f"Would archive {candidates.count()} conversations idle since {cutoff:%Y-%m-%d}.")
+            return
+
+        archived = messages = skipped = 0
+        # load model instances one batch at a time; only the ids are held in full
+        pks = list(candidates.values_list("pk", flat=True))
+        for start in range(0, len(pks), options["batch_size"]):
+            for conversation in Conversation.objects.filter(pk__in=pks[start:start + options["batch_size"]]):
+                count = conversation.archive()
+                if count is None:
+                    skipped += 1
+                    continue
+                archived += 1
+                messages += count
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {archived} conversations ({messages} messages); "
+            f"skipped {skipped} that changed meanwhile."
+        ))
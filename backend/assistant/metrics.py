@@ -0,0 +1,170 @@
+# assistant/metrics.py
+"""In-process instrumentation for LLM calls.
+
+Every model call made by assistant.services runs inside ``track_call``, which
+fills an ``LLMCall`` record (model, kind, token counts, wall time, outcome,
+cache status) and folds it into process-wide counters and histograms.
+``render_prometheus()`` exposes them in the Prometheus text format for scraping.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (16, 64, 256, 1024, 4096, 16384)
+
+OUTCOME_SUCCESS = "success"
+OUTCOME_QUOTA = "quota"
+OUTCOME_PARSE_FAILURE = "parse_failure"
+OUTCOME_FALLBACK = "fallback"
+OUTCOME_ERROR = "error"
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels=()):
+        return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, labels, value) for labels, value in sorted(self._values.items())]
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            series["counts"][bisect.bisect_left(self.buckets, value)] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def snapshot(self, labels=()):
+        with self._lock:
+            series = self._series.get(labels)
+            return None if series is None else {k: (list(v) if isinstance(v, list) else v) for k, v in series.items()}
+
+    def samples(self):
+        out = []
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), series["counts"]):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    out.append((f"{self.name}_bucket", labels + (("le", le),), cumulative))
+                out.append((f"{self.name}_sum", labels, series["sum"]))
+                out.append((f"{self.name}_count", labels, series["count"]))
+        return out
+
+
+LLM_CALLS = Counter("llm_calls_total", "LLM calls by model, kind, outcome and cache status.")
+LLM_PROMPT_TOKENS = Counter("llm_prompt_tokens_total", "Prompt tokens sent to the model.")
+LLM_RESPONSE_TOKENS = Counter("llm_response_tokens_total", "Response tokens produced by the model.")
+LLM_SECONDS = Histogram("llm_call_seconds", "Wall time of LLM calls, including cache lookups.", SECONDS_BUCKETS)
+LLM_RESPONSE_TOKEN_SIZES = Histogram("llm_response_tokens", "Response size in tokens per call.", TOKEN_BUCKETS)
+
+METRICS = [LLM_CALLS, LLM_PROMPT_TOKENS, LLM_RESPONSE_TOKENS, LLM_SECONDS, LLM_RESPONSE_TOKEN_SIZES]
+
+
+class LLMCall:
+    """What happened during one logical model call."""
+
+    def __init__(self, model, kind, cache="bypass"):
+        self.model = model
+        self.kind = kind
+        self.cache = cache          # "hit", "miss" or "bypass"
+        self.outcome = OUTCOME_SUCCESS
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+        self.wall_time = 0.0
+        self._started = time.perf_counter()
+
+    def add_usage(self, prompt_tokens, response_tokens):
+        self.prompt_tokens += prompt_tokens or 0
+        self.response_tokens += response_tokens or 0
+
+    def as_dict(self) -> dict:
+        return {
+            "model": self.model,
+            "kind": self.kind,
+            "cache": self.cache,
+            "outcome": self.outcome,
+            "prompt_tokens": self.prompt_tokens,
+            "response_tokens": self.response_tokens,
+            "wall_ms": round(self.wall_time * 1000, 1),
+        }
+
+
+def record_call(call: LLMCall):
+    """Fold a finished call into the process-wide metrics."""
+    base = (("model", call.model), ("kind", call.kind))
+    LLM_CALLS.inc(base + (("outcome", call.outcome), ("cache", call.cache)))
+    LLM_SECONDS.observe(call.wall_time, base)
+    if call.cache != "hit":
+        LLM_PROMPT_TOKENS.inc(base, call.prompt_tokens)
+        LLM_RESPONSE_TOKENS.inc(base, call.response_tokens)
+        LLM_RESPONSE_TOKEN_SIZES.observe(call.response_tokens, base)
+
+
+@contextmanager
+def track_call(model, kind, cached=False, call=None):
+    """Time a model call and record it on exit.
+
+    With ``cached=True`` the call starts out as a cache ``hit``; the code that
+    actually reaches the provider flips it to ``miss``. An exception escaping the
+    block marks the outcome as ``error`` unless a more specific one was set.
+    """
+    call = call or LLMCall(model, kind)
+    call.model, call.kind = model, kind
+    call.cache = "hit" if cached else "bypass"
+    call._started = time.perf_counter()
+    try:
+        yield call
+    except BaseException:
+        if call.outcome == OUTCOME_SUCCESS:
+            call.outcome = OUTCOME_ERROR
+        raise
+    finally:
+        call.wall_time = time.perf_counter() - call._started
+        record_call(call)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    inner = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in labels)
+    return "{" + inner + "}"
+
+
+def render_prometheus(extra_gauges=None) -> str:
+    """Render all metrics (plus optional ``{name: value}`` gauges) as Prometheus text."""
+    lines = []
+    for metric in METRICS:
+        kind = "histogram" if isinstance(metric, Histogram) else "counter"
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+    for name, value in (extra_gauges or {}).items():
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assistant', '0002_alter_conversation_options_alter_message_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='summary',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='summary_until_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assistant', '0003_conversation_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='seq',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='seq',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assistant', '0004_conversation_seq'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'id'], name='assistant_msg_conv_id_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assistant', '0005_message_conversation_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationArchive',
+            fields=[
+                ('conversation', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='archive_blob', serialize=False, to='assistant.conversation')),
+                ('codec', models.CharField(max_length=32)),
+                ('data', models.BinaryField()),
+                ('message_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='conversation',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
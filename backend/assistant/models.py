@@ -1,6 +1,16 @@
 # assistant/models.py
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+class SequenceConflict(Exception):
+    """Raised when a conversation moved past the sequence number a client expected."""
+
+    def __init__(self, current_seq):
+        super().__init__(f"Conversation is at seq {current_seq}")
+        self.current_seq = current_seq
 
 
 class Conversation(models.Model):
@@ -21,6 +31,14 @@ class Conversation(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     model_name = models.CharField(max_length=128, default="gemini-2.5-flash")
+    # Rolling summary of the turns that no longer fit the verbatim context window
+    # (see assistant.context); summary_until_id is the last message folded into it.
+    summary = models.TextField(blank=True, default="")
+    summary_until_id = models.BigIntegerField(blank=True, null=True)
+    # Incremented on every appended message; used for optimistic concurrency
+    seq = models.PositiveIntegerField(default=0)
+    # Set while the messages live in a ConversationArchive instead of the Message table
+    archived_at = models.DateTimeField(blank=True, null=True)
 
     class Meta:
         ordering = ["-updated_at"]
@@ -28,6 +46,100 @@ class Conversation(models.Model):
     def __str__(self):
         return f"{self.title} ({self.user or self.session_id})"
 
+    def append_message(self, role, content, meta=None, expected_seq=None):
+        """Append a message in a short transaction and return it.
+
+        The conversation's ``seq`` is bumped with a conditional UPDATE, so the row is
+        locked only for the duration of this insert. When ``expected_seq`` is given
+        and another message was appended since, ``SequenceConflict`` is raised.
+        """
+        with transaction.atomic():
+            qs = Conversation.objects.filter(pk=self.pk)
+            if expected_seq is not None:
+                qs = qs.filter(seq=expected_seq)
+            if not qs.update(seq=F("seq") + 1, updated_at=timezone.now()):
+                current = Conversation.objects.values_list("seq", flat=True).get(pk=self.pk)
+                raise SequenceConflict(current)
+            self.seq = Conversation.objects.values_list("seq", flat=True).get(pk=self.pk)
+            return Message.objects.create(
+                conversation=self, role=role, content=content, meta=meta, seq=self.seq
+            )
+
+
+    def archive(self):
+        """Move this conversation's messages into a compressed ``ConversationArchive``.
+
+        Returns the number of messages archived, or None when the conversation
+        changed (or was archived) concurrently.
+
+        The row lock keeps ``append_message`` out on databases that have one; the
+        final UPDATE re-checks ``seq`` for those that do not, and rolls everything
+        back when a message slipped in, so no message is deleted unarchived.
+        """
+        from .archive import CODEC, pack_messages
+
+        with transaction.atomic():
+            locked = Conversation.objects.select_for_update().filter(
+                pk=self.pk, archived_at__isnull=True, seq=self.seq
+            ).first()
+            if locked is None:
+                return None
+            messages = list(self.messages.order_by("id"))
+            ConversationArchive.objects.update_or_create(
+                conversation=self,
+                defaults={"data": pack_messages(messages), "codec": CODEC, "message_count": len(messages)},
+            )
+            Message.objects.filter(pk__in=[m.pk for m in messages]).delete()
+            archived_at = timezone.now()
+            # a queryset update keeps updated_at (the idle clock) untouched
+            if not Conversation.objects.filter(pk=self.pk, archived_at__isnull=True, seq=self.seq).update(
+                archived_at=archived_at
+            ):
+                transaction.set_rollback(True)
+                return None
+            self.archived_at = archived_at
+        return len(messages)
+
+    def rehydrate(self):
+        """Restore archived messages (with their original ids) into the Message table.
+
+        A no-op for conversations that are not archived; safe to call concurrently.
+        """
+        from .archive import unpack_messages
+
+        if self.archived_at is None:
+            return False
+        with transaction.atomic():
+            archive = ConversationArchive.objects.select_for_update().filter(conversation=self).first()
+            if archive is not None:
+                rows = unpack_messages(archive.data, archive.codec)
+                messages = Message.objects.bulk_create(
+                    [Message(conversation=self, **{k: v for k, v in row.items() if k != "created_at"}) for row in rows]
+                )
+                # created_at is auto_now_add, so the original timestamps are written back afterwards
+                for message, row in zip(messages, rows):
+                    message.created_at = row["created_at"]
+                if messages:
+                    Message.objects.bulk_update(messages, ["created_at"])
+                archive.delete()
+            Conversation.objects.filter(pk=self.pk).update(archived_at=None)
+            self.archived_at = None
+        return True
+
+
+class ConversationArchive(models.Model):
+    """Compressed cold-storage copy of an idle conversation's messages."""
+    conversation = models.OneToOneField(
+        Conversation, on_delete=models.CASCADE, primary_key=True, related_name="archive_blob"
+    )
+    codec = models.CharField(max_length=32)
+    data = models.BinaryField()
+    message_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Archive of conversation {self.conversation_id} ({self.message_count} messages)"
+
 
 class Message(models.Model):
     """
@@ -49,9 +161,14 @@ class Message(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     meta = models.JSONField(blank=True, null=True)
+    seq = models.PositiveIntegerField(blank=True, null=True)
 
     class Meta:
         ordering = ["created_at"]
+        indexes = [
+            # history pagination walks a conversation's messages by id
+            models.Index(fields=["conversation", "id"], name="assistant_msg_conv_id_idx"),
+        ]
 
     def __str__(self):
         short_content = self.content[:40].replace("\n", " ")
@@ -0,0 +1,46 @@
+# assistant/permissions.py
+"""Access to the operational endpoints (health, metrics).
+
+They are for staff and for scrapers. A JWT of a staff user works, and so does
+``Authorization: Bearer <ASSISTANT_MONITORING_TOKEN>`` for a monitoring system
+that has no user account. An empty token disables the second option.
+"""
+import hmac
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from rest_framework.permissions import BasePermission
+from rest_framework.settings import api_settings
+
+MONITORING = "monitoring"
+
+
+class MonitoringTokenAuthentication(BaseAuthentication):
+    """Accepts the shared monitoring token; anything else is left to the next authenticator."""
+
+    def authenticate(self, request):
+        token = getattr(settings, "ASSISTANT_MONITORING_TOKEN", "") or ""
+        if not token:
+            return None
+        parts = get_authorization_header(request).split()
+        if len(parts) == 2 and parts[0].lower() == b"bearer" and hmac.compare_digest(parts[1], token.encode("utf-8")):
+            return AnonymousUser(), MONITORING
+        return None
+
+    def authenticate_header(self, request):
+        # answer unauthenticated requests with 401 rather than 403
+        return 'Bearer realm="api"'
+
+
+class IsAdminOrMonitoring(BasePermission):
+    def has_permission(self, request, view):
+        if request.auth == MONITORING:
+            return True
+        return bool(request.user and request.user.is_staff)
+
+
+class MonitoringViewMixin:
+    """Staff users or the monitoring token only."""
+    authentication_classes = [MonitoringTokenAuthentication, *api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    permission_classes = [IsAdminOrMonitoring]
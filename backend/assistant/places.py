@@ -0,0 +1,149 @@
+# assistant/places.py
+"""Batched resolution of classification search terms to catalog rows.
+
+``match_catalog`` used to run a ``Location`` query, a ``Homes.exists()`` and an
+unbounded ``Homes`` fetch for every term. ``PlaceResolver.resolve(terms)``
+instead issues one ranked search per model for the whole batch (see
+``Location.search.search_places_many``), capped per term and deduplicated in
+SQL, so the number of queries no longer grows with the number of terms.
+
+Terms that matched nothing are remembered for ``NEGATIVE_TTL`` seconds and
+skipped on later lookups. Any catalog write drops these entries, because the new
+row may be the one a remembered term was missing.
+"""
+import threading
+from collections import namedtuple
+
+from django.conf import settings
+
+from .cache import LocalBackend, _MISSING
+
+DEFAULT_PLACE_RESOLVER_SETTINGS = {
+    "LOCATIONS_PER_TERM": 1,
+    "HOMES_PER_TERM": 10,
+    "NEGATIVE_TTL": 60,           # seconds; 0 disables negative caching
+    "NEGATIVE_MAX_ENTRIES": 2048,
+}
+
+PlaceMatches = namedtuple("PlaceMatches", ["locations", "homes", "missing"])
+
+
+def normalize_term(term):
+    return " ".join((term or "").casefold().split())
+
+
+class PlaceResolver:
+    def __init__(self, locations_per_term=1, homes_per_term=10, negative_ttl=60, negative_max_entries=2048):
+        self.locations_per_term = locations_per_term
+        self.homes_per_term = homes_per_term
+        self.negative_ttl = negative_ttl
+        self.negative = LocalBackend(max_entries=negative_max_entries)
+        self.negative_hits = 0
+        self._lock = threading.Lock()
+
+    def resolve(self, terms) -> PlaceMatches:
+        """Return the catalog rows for ``terms``, in term order then rank, each row once.
+
+        ``missing`` lists the terms (as given) that matched nothing in either model.
+        """
+        from Location.models import Location, Homes
+        from Location.search import search_places_many
+
+        # dedupe terms, keeping the first spelling of each
+        unique = {}
+        for term in terms:
+            key = normalize_term(term)
+            if key and key not in unique:
+                unique[key] = term
+        keys = []
+        skipped = []
+        for key in unique:
+            if self.negative_ttl and self.negative.get(key) is not _MISSING:
+                skipped.append(key)
+            else:
+                keys.append(key)
+        if skipped:
+            with self._lock:
+                self.negative_hits += len(skipped)
+        if not keys:
+            return PlaceMatches([], [], [unique[k] for k in skipped])
+
+        queries = [unique[k] for k in keys]
+        location_hits = search_places_many(Location, queries, self.locations_per_term)
+        home_hits = search_places_many(Homes, queries, self.homes_per_term)
+
+        found = {i for i, _ in location_hits} | {i for i, _ in home_hits}
+        missing = [keys[i] for i in range(len(keys)) if i not in found]
+        if found and missing:
+            missing = self._confirm_missing(missing, unique)
+        if self.negative_ttl:
+            for key in missing:
+                self.negative.set(key, True, self.negative_ttl)
+        return PlaceMatches(
+            [obj for _, obj in location_hits],
+            [obj for _, obj in home_hits],
+            [unique[k] for k in skipped + missing],
+        )
+
+    def _confirm_missing(self, keys, unique):
+        """Drop the ``keys`` that only came back empty because their rows were
+        listed under an earlier term; searching them again on their own tells."""
+        from Location.models import Location, Homes
+        from Location.search import search_places_many
+
+        while keys:
+            queries = [unique[k] for k in keys]
+            hits = {i for i, _ in search_places_many(Location, queries, 1)}
+            hits |= {i for i, _ in search_places_many(Homes, queries, 1)}
+            if not hits:
+                break
+            keys = [k for i, k in enumerate(keys) if i not in hits]
+        return keys
+
+    def forget_missing(self):
+        self.negative.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"negative_entries": len(self.negative), "negative_hits": self.negative_hits}
+
+
+def build_place_resolver(config=None) -> PlaceResolver:
+    conf = dict(DEFAULT_PLACE_RESOLVER_SETTINGS)
+    conf.update(config or {})
+    return PlaceResolver(
+        locations_per_term=conf["LOCATIONS_PER_TERM"],
+        homes_per_term=conf["HOMES_PER_TERM"],
+        negative_ttl=conf["NEGATIVE_TTL"],
+        negative_max_entries=conf["NEGATIVE_MAX_ENTRIES"],
+    )
+
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def get_place_resolver() -> PlaceResolver:
+    """Return the process-wide resolver, building it from settings on first use."""
+    global _resolver
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                _resolver = build_place_resolver(getattr(settings, "ASSISTANT_PLACE_RESOLVER", None))
+    return _resolver
+
+
+def reset_place_resolver():
+    global _resolver
+    with _resolver_lock:
+        _resolver = None
+
+
+def resolve_places(terms) -> PlaceMatches:
+    return get_place_resolver().resolve(terms)
+
+
+def place_changed(sender, instance=None, **kwargs):
+    # nothing remembered until the resolver has been used
+    if _resolver is not None:
+        _resolver.forget_missing()
@@ -0,0 +1,327 @@
+# assistant/providers.py
+"""LLM provider layer used by assistant.services.
+
+Every model call in the services goes through ``get_provider()``, which returns
+one of:
+
+* ``GeminiProvider`` – the real Gemini API (models come from assistant.registry)
+* ``ReplayProvider`` – deterministic, offline replay of recorded responses with a
+  configurable latency distribution, for load tests and benchmarks
+* ``RecordingProvider`` – wraps another provider and appends every response to a
+  JSONL fixture file that ``ReplayProvider`` can read back
+
+The backend is selected with ``ASSISTANT_LLM_PROVIDER``.
+"""
+import abc
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+from .context import estimate_tokens
+
+DEFAULT_PROVIDER_SETTINGS = {
+    "BACKEND": "gemini",          # "gemini" or "replay"
+    "FIXTURES": "",               # JSONL file read by replay / written by the recorder
+    "RECORD": False,              # wrap the backend in a RecordingProvider
+    "MISS_POLICY": "error",       # replay misses: "error" or "any" (pick a recorded response of the same kind)
+    "LATENCY": {
+        "DISTRIBUTION": "none",   # "none", "fixed", "uniform", "normal" or "lognormal"
+        "MEAN": 0.0,              # seconds
+        "STDDEV": 0.0,
+        "MIN": 0.0,
+        "MAX": 30.0,
+    },
+    "STREAM_CHUNK_CHARS": 24,
+    "SEED": 0,
+}
+
+
+# Text of one generation plus its token usage (estimated when the backend does not report it)
+Completion = namedtuple("Completion", ["text", "prompt_tokens", "response_tokens"])
+
+
+class ProviderNotConfigured(RuntimeError):
+    """The provider cannot serve requests (e.g. no API key)."""
+
+
+class ReplayMiss(LookupError):
+    """No recorded response matches the request."""
+
+
+def fixture_key(model_name, prompt, generation_config=None) -> str:
+    payload = json.dumps(
+        {
+            "model": model_name,
+            "prompt": re.sub(r"\s+", " ", prompt or "").strip(),
+            "config": generation_config or {},
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMProvider(abc.ABC):
+    """Interface for text generation backends.
+
+    ``kind`` names the call site ("reply", "chat", "stream", "plan") so that
+    replays and metrics can tell the prompt families apart. Subclasses must
+    implement ``generate`` and ``agenerate``; ``stream`` and ``health_check``
+    have defaults.
+    """
+
+    name = "base"
+
+    @abc.abstractmethod
+    def generate(self, model_name, prompt, generation_config, kind="") -> Completion:
+        """Return the ``Completion`` for ``prompt``."""
+
+    @abc.abstractmethod
+    async def agenerate(self, model_name, prompt, generation_config, kind="") -> Completion:
+        """Async ``generate``."""
+
+    def stream(self, model_name, prompt, generation_config, kind="stream"):
+        yield self.generate(model_name, prompt, generation_config, kind=kind).text
+
+    def health_check(self, model_names=None) -> dict:
+        return {}
+
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def _model(self, model_name):
+        from .registry import get_registry
+
+        try:
+            return get_registry().get(model_name)
+        except RuntimeError as e:
+            raise ProviderNotConfigured(str(e)) from e
+
+    @staticmethod
+    def _completion(prompt, response):
+        text = (response.text or "").strip()
+        usage = getattr(response, "usage_metadata", None)
+        prompt_tokens = getattr(usage, "prompt_token_count", None)
+        response_tokens = getattr(usage, "candidates_token_count", None)
+        return Completion(
+            text,
+            prompt_tokens if prompt_tokens is not None else estimate_tokens(prompt),
+            response_tokens if response_tokens is not None else estimate_tokens(text),
+        )
+
+    def generate(self, model_name, prompt, generation_config, kind=""):
+        response = self._model(model_name).generate_content(prompt, generation_config=generation_config)
+        return self._completion(prompt, response)
+
+    async def agenerate(self, model_name, prompt, generation_config, kind=""):
+        response = await self._model(model_name).generate_content_async(prompt, generation_config=generation_config)
+        return self._completion(prompt, response)
+
+    def stream(self, model_name, prompt, generation_config, kind="stream"):
+        response = self._model(model_name).generate_content(
+            prompt, generation_config=generation_config, stream=True
+        )
+        for chunk in response:
+            try:
+                text = chunk.text
+            except Exception:
+                # chunks without text parts (e.g. safety metadata) are skipped
+                continue
+            if text:
+                yield text
+
+    def health_check(self, model_names=None) -> dict:
+        from .registry import get_registry
+
+        return get_registry().health_check(model_names)
+
+
+class LatencyModel:
+    """Samples simulated response latencies from a seeded distribution."""
+
+    def __init__(self, conf=None, seed=0):
+        conf = dict(DEFAULT_PROVIDER_SETTINGS["LATENCY"], **(conf or {}))
+        self.distribution = conf["DISTRIBUTION"]
+        self.mean = float(conf["MEAN"])
+        self.stddev = float(conf["STDDEV"])
+        self.min = float(conf["MIN"])
+        self.max = float(conf["MAX"])
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        with self._lock:
+            if self.distribution == "fixed":
+                value = self.mean
+            elif self.distribution == "uniform":
+                value = self._rng.uniform(self.mean - self.stddev, self.mean + self.stddev)
+            elif self.distribution == "normal":
+                value = self._rng.gauss(self.mean, self.stddev)
+            elif self.distribution == "lognormal":
+                # parameterised by the mean/stddev of the resulting latency
+                if self.mean <= 0:
+                    value = 0.0
+                else:
+                    sigma2 = math.log(1 + (self.stddev / self.mean) ** 2)
+                    value = self._rng.lognormvariate(math.log(self.mean) - sigma2 / 2, math.sqrt(sigma2))
+            else:
+                value = 0.0
+        return min(max(value, self.min), self.max)
+
+
+def load_fixtures(path):
+    """Read a JSONL fixture file into ``{key: record}``; missing files yield ``{}``."""
+    records = {}
+    try:
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                line = line.strip()
+                if line:
+                    record = json.loads(line)
+                    records[record["key"]] = record
+    except FileNotFoundError:
+        pass
+    return records
+
+
+class ReplayProvider(LLMProvider):
+    """Serves recorded responses offline, sleeping for a sampled latency first."""
+
+    name = "replay"
+
+    def __init__(self, records=None, latency=None, miss_policy="error", chunk_chars=24):
+        self.records = records or {}
+        self.latency = latency or LatencyModel()
+        self.miss_policy = miss_policy
+        self.chunk_chars = chunk_chars
+        self._by_kind = {}
+        for key in sorted(self.records):
+            self._by_kind.setdefault(self.records[key].get("kind", ""), []).append(self.records[key])
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        return cls(load_fixtures(path), **kwargs)
+
+    def lookup(self, model_name, prompt, generation_config, kind=""):
+        key = fixture_key(model_name, prompt, generation_config)
+        record = self.records.get(key)
+        if record is None and self.miss_policy == "any":
+            candidates = self._by_kind.get(kind) or []
+            if candidates:
+                # deterministic choice so repeated runs replay the same responses
+                record = candidates[int(key, 16) % len(candidates)]
+        if record is None:
+            raise ReplayMiss(f"No recorded {kind or 'LLM'} response for model {model_name}")
+        return record["text"]
+
+    def generate(self, model_name, prompt, generation_config, kind=""):
+        text = self.lookup(model_name, prompt, generation_config, kind)
+        time.sleep(self.latency.sample())
+        return Completion(text, estimate_tokens(prompt), estimate_tokens(text))
+
+    async def agenerate(self, model_name, prompt, generation_config, kind=""):
+        text = self.lookup(model_name, prompt, generation_config, kind)
+        await asyncio.sleep(self.latency.sample())
+        return Completion(text, estimate_tokens(prompt), estimate_tokens(text))
+
+    def stream(self, model_name, prompt, generation_config, kind="stream"):
+        text = self.lookup(model_name, prompt, generation_config, kind)
+        chunks = [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)] or [""]
+        # the sampled latency is spread evenly across the chunks
+        delay = self.latency.sample() / len(chunks)
+        for chunk in chunks:
+            time.sleep(delay)
+            yield chunk
+
+    def health_check(self, model_names=None) -> dict:
+        return {"replay": {"ok": True, "records": len(self.records)}}
+
+
+class RecordingProvider(LLMProvider):
+    """Passes calls through to ``inner`` and appends each response to a JSONL file."""
+
+    name = "recording"
+
+    def __init__(self, inner, path):
+        self.inner = inner
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _record(self, model_name, prompt, generation_config, kind, text):
+        record = {
+            "key": fixture_key(model_name, prompt, generation_config),
+            "kind": kind,
+            "model": model_name,
+            "config": generation_config or {},
+            "prompt": prompt,
+            "text": text,
+        }
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def generate(self, model_name, prompt, generation_config, kind=""):
+        completion = self.inner.generate(model_name, prompt, generation_config, kind=kind)
+        self._record(model_name, prompt, generation_config, kind, completion.text)
+        return completion
+
+    async def agenerate(self, model_name, prompt, generation_config, kind=""):
+        completion = await self.inner.agenerate(model_name, prompt, generation_config, kind=kind)
+        self._record(model_name, prompt, generation_config, kind, completion.text)
+        return completion
+
+    def stream(self, model_name, prompt, generation_config, kind="stream"):
+        parts = []
+        for chunk in self.inner.stream(model_name, prompt, generation_config, kind=kind):
+            parts.append(chunk)
+            yield chunk
+        self._record(model_name, prompt, generation_config, kind, "".join(parts))
+
+    def health_check(self, model_names=None) -> dict:
+        return self.inner.health_check(model_names)
+
+
+def build_provider(config=None) -> LLMProvider:
+    conf = dict(DEFAULT_PROVIDER_SETTINGS)
+    conf.update(config or {})
+    if conf["BACKEND"] == "replay":
+        provider = ReplayProvider.from_file(
+            conf["FIXTURES"],
+            latency=LatencyModel(conf["LATENCY"], seed=conf["SEED"]),
+            miss_policy=conf["MISS_POLICY"],
+            chunk_chars=conf["STREAM_CHUNK_CHARS"],
+        )
+    else:
+        provider = GeminiProvider()
+    if conf["RECORD"] and conf["FIXTURES"]:
+        provider = RecordingProvider(provider, conf["FIXTURES"])
+    return provider
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider() -> LLMProvider:
+    """Return the process-wide provider, building it from settings on first use."""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = build_provider(getattr(settings, "ASSISTANT_LLM_PROVIDER", None))
+    return _provider
+
+
+def set_provider(provider):
+    """Swap the process-wide provider (e.g. a ReplayProvider in load tests); ``None`` resets it."""
+    global _provider
+    with _provider_lock:
+        _provider = provider
@@ -0,0 +1,112 @@
+# assistant/registry.py
+"""Process-wide registry of Gemini models.
+
+``genai.configure`` and ``genai.GenerativeModel`` are relatively expensive and the
+model objects own the transport, so we build each configured model once per
+process and hand the same instance to every request. The registry notices when
+``GEMINI_API_KEY`` changes and rebuilds itself; ``reload()`` does the same on
+demand (e.g. after editing ``ASSISTANT_MODELS``).
+"""
+import logging
+import os
+import threading
+
+import google.generativeai as genai
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _configured_api_key():
+    return getattr(settings, "GEMINI_API_KEY", None) or os.getenv("GEMINI_API_KEY")
+
+
+def _configured_model_names():
+    return list(getattr(settings, "ASSISTANT_MODELS", None) or [])
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._models = {}
+        self._api_key = None
+        self._model_names = set(_configured_model_names())
+
+    def _configure(self, api_key):
+        genai.configure(api_key=api_key)
+        self._api_key = api_key
+        self._models = {}
+
+    def get(self, model_name: str):
+        """Return the shared model instance for ``model_name``.
+
+        Raises ``RuntimeError`` when no API key is configured. Models outside
+        ``ASSISTANT_MODELS`` are built per call and not retained, so arbitrary
+        client-supplied names cannot grow the registry.
+        """
+        api_key = _configured_api_key()
+        if not api_key:
+            raise RuntimeError("GEMINI_API_KEY not configured")
+
+        model = self._models.get(model_name) if api_key == self._api_key else None
+        if model is not None:
+            return model
+
+        with self._lock:
+            if api_key != self._api_key:
+                self._configure(api_key)
+            model = self._models.get(model_name)
+            if model is None:
+                model = genai.GenerativeModel(model_name)
+                if model_name in self._model_names:
+                    self._models[model_name] = model
+            return model
+
+    def warm_up(self, model_names=None):
+        """Build the configured models ahead of the first request.
+
+        Returns the list of model names that are ready; failures are logged.
+        """
+        ready = []
+        for name in model_names or sorted(self._model_names):
+            try:
+                self.get(name)
+                ready.append(name)
+            except Exception as e:
+                logger.warning("Could not warm up model %s: %s", name, e)
+        return ready
+
+    def health_check(self, model_names=None) -> dict:
+        """Probe each model with a token count (no generation quota is spent)."""
+        results = {}
+        for name in model_names or sorted(self._model_names):
+            try:
+                self.get(name).count_tokens("ping")
+                results[name] = {"ok": True}
+            except Exception as e:
+                results[name] = {"ok": False, "error": str(e)}
+        return results
+
+    def reload(self, model_names=None):
+        """Drop every cached model and re-read the API key and model list."""
+        with self._lock:
+            self._model_names = set(model_names if model_names is not None else _configured_model_names())
+            self._models = {}
+            self._api_key = None
+
+    def loaded_models(self):
+        return sorted(self._models)
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    """Return the process-wide registry, creating it on first use."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
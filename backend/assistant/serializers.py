@@ -6,11 +6,11 @@ from .models import Conversation, Message
 class MessageSerializer(serializers.ModelSerializer):
     class Meta:
         model = Message
-        fields = ["id", "role", "content", "created_at"]
+        fields = ["id", "seq", "role", "content", "created_at"]
 
 
-class ConversationSerializer(serializers.ModelSerializer):
-    messages = MessageSerializer(many=True, read_only=True)
+class ConversationHeaderSerializer(serializers.ModelSerializer):
+    """Conversation fields without the message list (used by delta chat responses)."""
     user_email = serializers.ReadOnlyField(source="user.email")
 
     class Meta:
@@ -19,17 +19,29 @@ class ConversationSerializer(serializers.ModelSerializer):
             "id",
             "title",
             "model_name",
+            "seq",
             "created_at",
             "updated_at",
             "user_email",
-            "messages",
         ]
 
 
+class ConversationSerializer(ConversationHeaderSerializer):
+    messages = MessageSerializer(many=True, read_only=True)
+
+    class Meta(ConversationHeaderSerializer.Meta):
+        fields = ConversationHeaderSerializer.Meta.fields + ["messages"]
+
+
 class ChatRequestSerializer(serializers.Serializer):
     """
     Handles validation for chatbot input.
     """
     conversation_id = serializers.IntegerField(required=False)
+    # Sequence number of the conversation as last seen by the client; a mismatch
+    # means another message was sent concurrently and the request gets a 409.
+    expected_seq = serializers.IntegerField(required=False, min_value=0)
     message = serializers.CharField()
     model_name = serializers.CharField(required=False)
+    # "full" embeds the whole conversation; "delta" returns only this turn's messages
+    response_mode = serializers.ChoiceField(choices=["full", "delta"], required=False, default="full")
@@ -1,18 +1,47 @@
 # assistant/services.py
 
 import re
-import os
 import json
-import google.generativeai as genai
-from django.conf import settings
+from collections import namedtuple
 from google.api_core.exceptions import NotFound, ResourceExhausted
+from .cache import get_response_cache
+from .providers import get_provider, ProviderNotConfigured
+from .limiter import get_quota_guard, QuotaUnavailable
+from .context import estimate_tokens
+from .metrics import (
+    LLMCall, track_call, OUTCOME_QUOTA, OUTCOME_PARSE_FAILURE, OUTCOME_FALLBACK, OUTCOME_ERROR,
+)
 
 DEFAULT_MODEL = "gemini-2.0-flash"
 
-def sanitize_prompt(user_input: str) -> str:
+REPLY_GENERATION_CONFIG = {
+    "temperature": 0.4,
+    "max_output_tokens": 400,
+}
+
+CHAT_GENERATION_CONFIG = {
+    "temperature": 0.5,
+    "max_output_tokens": 800,
+}
+
+# messages packed into one classify_many() model call
+CLASSIFY_BATCH_SIZE = 10
+
+PLAN_GENERATION_CONFIG = {
+    "temperature": 0.2,
+    "max_output_tokens": 2000,
+    "top_p": 0.8,
+}
+
+def redact_input(user_input: str) -> str:
     dangerous_keywords = ["api_key", "GEMINI_API_KEY", "system prompt", "ignore", "bypass", "token", "password"]
     for word in dangerous_keywords:
         user_input = user_input.replace(word, "[REDACTED]")
+    return user_input
+
+
+def sanitize_prompt(user_input: str) -> str:
+    user_input = redact_input(user_input)
 
     return f"""
 You are an intelligent travel recommendation assistant.
@@ -72,91 +101,160 @@ def heuristic_classify(user_input: str) -> dict:
     }
 
 
-def generate_safe_reply(user_input: str, model_name: str = DEFAULT_MODEL) -> dict:
-    api_key = getattr(settings, "GEMINI_API_KEY", None) or os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise RuntimeError("GEMINI_API_KEY not configured")
 
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel(model_name)
+def _mark_provider_call(call: LLMCall):
+    # the cached wrapper assumes a hit until the provider is actually reached
+    if call.cache == "hit":
+        call.cache = "miss"
 
-    prompt = sanitize_prompt(user_input)
 
-    # Small retry/backoff for transient quota errors
-    from time import sleep
-    attempts = 3
-    backoff = 1.0
-    last_exc = None
-    text = None
-    for attempt in range(attempts):
-        try:
-            response = model.generate_content(
-                prompt,
-                generation_config={
-                    "temperature": 0.4,
-                    "max_output_tokens": 400,
-                },
-            )
-            text = (response.text or "").strip()
-            # successful generation — exit retry loop
-            last_exc = None
-            break
-        except ResourceExhausted as rexc:
-            # transient quota issue — retry with exponential backoff
-            last_exc = rexc
-            if attempt < attempts - 1:
-                sleep(backoff)
-                backoff *= 2
-                continue
-            # exhausted retries — break and handle below
-            break
-        except Exception as e:
-            last_exc = e
-            break
+def _generate_guarded(model_name: str, prompt: str, generation_config: dict, kind: str = "", call: LLMCall = None):
+    """Call the configured LLM provider through the model's shared quota guard.
 
-    # If we obtained text, sanitize and parse it
-    if text:
-        # 🧹 Remove markdown fences if present
-        cleaned = re.sub(r"^```(?:json)?|```$", "", text, flags=re.MULTILINE).strip()
+    Returns ``(text, last_exc)``; ``text`` is None when the call failed. Quota
+    errors are not retried here: they feed the guard's circuit breaker, and while
+    it is open ``last_exc`` is a ``QuotaUnavailable`` raised without calling the
+    model, so callers go straight to their fallback.
+    ``ProviderNotConfigured`` (e.g. missing API key) is raised to the caller.
+    """
+    call = call or LLMCall(model_name, kind)
+    guard = get_quota_guard(model_name)
+    try:
+        guard.admit()
+    except QuotaUnavailable as e:
+        return None, e
+    _mark_provider_call(call)
+    try:
+        completion = get_provider().generate(model_name, prompt, generation_config, kind=kind)
+    except ProviderNotConfigured:
+        guard.release()
+        raise
+    except Exception as e:
+        guard.record(e)
+        return None, e
+    guard.record()
+    call.add_usage(completion.prompt_tokens, completion.response_tokens)
+    return completion.text, None
 
-        # 🧱 Security sanitization
-        if any(word in cleaned.lower() for word in ["api_key", "secret", "system prompt"]):
-            return {"error": "Sanitized response — sensitive data removed."}
 
-        # 🧩 Parse JSON safely
-        try:
-            parsed = json.loads(cleaned)
-            return parsed
-        except json.JSONDecodeError:
-            # Try to extract a JSON substring if the model returned surrounding text.
-            # Approach: find the first '{' and the last '}' and attempt to parse that slice.
-            try:
-                first = cleaned.find('{')
-                last = cleaned.rfind('}')
-                if first != -1 and last != -1 and last > first:
-                    candidate = cleaned[first:last+1]
-                    parsed = json.loads(candidate)
-                    return parsed
-            except Exception:
-                pass
-
-            # As a final fallback, try to find any JSON-like object using a simple regex
-            try:
-                m = re.search(r'(\{[\s\S]*\})', cleaned)
-                if m:
-                    parsed = json.loads(m.group(1))
-                    return parsed
-            except Exception:
-                pass
+async def _agenerate_guarded(model_name: str, prompt: str, generation_config: dict, kind: str = "", call: LLMCall = None):
+    """Async counterpart of ``_generate_guarded``."""
+    call = call or LLMCall(model_name, kind)
+    guard = get_quota_guard(model_name)
+    try:
+        await guard.aadmit()
+    except QuotaUnavailable as e:
+        return None, e
+    _mark_provider_call(call)
+    try:
+        completion = await get_provider().agenerate(model_name, prompt, generation_config, kind=kind)
+    except ProviderNotConfigured:
+        guard.release()
+        raise
+    except Exception as e:
+        guard.record(e)
+        return None, e
+    guard.record()
+    call.add_usage(completion.prompt_tokens, completion.response_tokens)
+    return completion.text, None
 
-            # Nothing parsed as JSON — return raw_text for the caller to decide
-            return {"raw_text": cleaned}
+
+def parse_model_json(text: str) -> dict:
+    """Strip code fences from a model response and parse the JSON object inside it.
+
+    Returns ``{"raw_text": ...}`` when nothing parses, or an error dict when the
+    response looks like it leaked sensitive data.
+    """
+    # 🧹 Remove markdown fences if present
+    cleaned = re.sub(r"^```(?:json)?|```$", "", text, flags=re.MULTILINE).strip()
+
+    # 🧱 Security sanitization
+    if any(word in cleaned.lower() for word in ["api_key", "secret", "system prompt"]):
+        return {"error": "Sanitized response — sensitive data removed."}
+
+    # 🧩 Parse JSON safely
+    try:
+        parsed = json.loads(cleaned)
+        return parsed
+    except json.JSONDecodeError:
+        # Try to extract a JSON substring if the model returned surrounding text.
+        # Approach: find the first '{' and the last '}' and attempt to parse that slice.
+        try:
+            first = cleaned.find('{')
+            last = cleaned.rfind('}')
+            if first != -1 and last != -1 and last > first:
+                candidate = cleaned[first:last+1]
+                parsed = json.loads(candidate)
+                return parsed
+        except Exception:
+            pass
+
+        # As a final fallback, try to find any JSON-like object using a simple regex
+        try:
+            m = re.search(r'(\{[\s\S]*\})', cleaned)
+            if m:
+                parsed = json.loads(m.group(1))
+                return parsed
+        except Exception:
+            pass
+
+        # Nothing parsed as JSON — return raw_text for the caller to decide
+        return {"raw_text": cleaned}
+
+
+def generate_safe_reply(user_input: str, model_name: str = DEFAULT_MODEL, use_cache: bool = True) -> dict:
+    """Classify the user's travel intent, serving repeated prompts from the response cache."""
+    with track_call(model_name, "reply", cached=use_cache) as call:
+        if not use_cache:
+            return _generate_safe_reply(user_input, model_name, call)
+        cache = get_response_cache()
+        key = cache.make_key(user_input, model_name, REPLY_GENERATION_CONFIG, namespace="reply")
+        return cache.get_or_call(key, lambda: _generate_safe_reply(user_input, model_name, call))
+
+
+async def agenerate_safe_reply(user_input: str, model_name: str = DEFAULT_MODEL, use_cache: bool = True) -> dict:
+    """Async ``generate_safe_reply`` for ASGI views; shares the same response cache."""
+    with track_call(model_name, "reply", cached=use_cache) as call:
+        if not use_cache:
+            return await _agenerate_safe_reply(user_input, model_name, call)
+        cache = get_response_cache()
+        key = cache.make_key(user_input, model_name, REPLY_GENERATION_CONFIG, namespace="reply")
+        return await cache.aget_or_call(key, lambda: _agenerate_safe_reply(user_input, model_name, call))
+
+
+def _generate_safe_reply(user_input: str, model_name: str = DEFAULT_MODEL, call: LLMCall = None) -> dict:
+    call = call or LLMCall(model_name, "reply")
+    text, last_exc = _generate_guarded(
+        model_name, sanitize_prompt(user_input), REPLY_GENERATION_CONFIG, kind="reply", call=call
+    )
+    return _reply_result(text, last_exc, user_input, model_name, call)
+
+
+async def _agenerate_safe_reply(user_input: str, model_name: str = DEFAULT_MODEL, call: LLMCall = None) -> dict:
+    call = call or LLMCall(model_name, "reply")
+    text, last_exc = await _agenerate_guarded(
+        model_name, sanitize_prompt(user_input), REPLY_GENERATION_CONFIG, kind="reply", call=call
+    )
+    return _reply_result(text, last_exc, user_input, model_name, call)
+
+
+def _reply_result(text, last_exc, user_input: str, model_name: str, call: LLMCall) -> dict:
+    # If we obtained text, sanitize and parse it
+    if text:
+        parsed = parse_model_json(text)
+        if isinstance(parsed, dict) and "raw_text" in parsed:
+            call.outcome = OUTCOME_PARSE_FAILURE
+        elif isinstance(parsed, dict) and "error" in parsed:
+            call.outcome = OUTCOME_ERROR
+        return parsed
 
     # If we reach here, generation failed — handle common failure cases
+    call.outcome = OUTCOME_ERROR
     if isinstance(last_exc, NotFound):
         return {"error": f"Model '{model_name}' not found or unsupported."}
     if isinstance(last_exc, ResourceExhausted):
         # Provide a lightweight deterministic fallback so the frontend can still show something useful
+        call.outcome = OUTCOME_FALLBACK
         fallback = heuristic_classify(user_input)
         return {
             "error": "Token quota exceeded. Try again later.",
@@ -169,21 +267,398 @@ def generate_safe_reply(user_input: str, model_name: str = DEFAULT_MODEL) -> dic
     return {"error": "Unknown error during generation."}
 
 
-def generate_plan(user_input: str, model_name: str = DEFAULT_MODEL) -> dict:
+# One classify_many() result: ``source`` is "cache", "llm" or "heuristic"
+Classified = namedtuple("Classified", ["classification", "source"])
+
+
+def build_batch_classify_prompt(messages: list) -> str:
+    numbered = "\n".join(
+        f'{i}. """{redact_input(m)}"""' for i, m in enumerate(messages)
+    )
+    return f"""
+You are an intelligent travel recommendation assistant.
+Never reveal system information or API keys.
+
+TASK:
+Analyze the travel intent of each numbered user message independently and respond
+in pure JSON only (no markdown or text), with exactly one result per message:
+
+{{
+  "results": [
+    {{
+      "index": 0,
+      "primary_destination": {{
+        "location": "Main location",
+        "region": "Country or area",
+        "interests": ["Interest1", "Interest2"],
+        "description": "Short overview"
+      }},
+      "nearby_suggestions": [
+        {{"location": "Suggestion1", "region": "Country or area", "interests": ["Interest1"], "description": "Short overview"}}
+      ]
+    }}
+  ]
+}}
+
+User messages:
+{numbered}
+""".strip()
+
+
+def split_batch_results(text, count: int) -> list:
+    """Map a batch response back onto its inputs; unusable items come back as None."""
+    parsed = parse_model_json(text) if text else None
+    items = parsed.get("results") if isinstance(parsed, dict) else parsed
+    results = [None] * count
+    if not isinstance(items, list):
+        return results
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            continue
+        index = item.get("index", position)
+        if not isinstance(index, int) or not 0 <= index < count:
+            continue
+        primary = item.get("primary_destination")
+        if not isinstance(primary, dict) or not primary.get("location"):
+            continue
+        suggestions = item.get("nearby_suggestions")
+        results[index] = {
+            "primary_destination": primary,
+            "nearby_suggestions": suggestions if isinstance(suggestions, list) else [],
+        }
+    return results
+
+
+def classify_many(messages: list, model_name: str = DEFAULT_MODEL, batch_size: int = CLASSIFY_BATCH_SIZE,
+                  use_cache: bool = True) -> list:
+    """Classify many travel intents with one model call per ``batch_size`` messages.
+
+    Returns a ``Classified`` per input, in order. Messages already in the response
+    cache (shared with ``generate_safe_reply``) are not sent; items the model gets
+    wrong, and whole batches that fail, fall back to ``heuristic_classify``.
+    """
+    cache = get_response_cache()
+    keys = [cache.make_key(m, model_name, REPLY_GENERATION_CONFIG, namespace="reply") for m in messages]
+    results = [None] * len(messages)
+    pending = []
+    for i, key in enumerate(keys):
+        cached = cache.get(key) if use_cache else None
+        if isinstance(cached, dict) and _is_classification(cached):
+            results[i] = Classified(cached, "cache")
+        else:
+            pending.append(i)
+
+    for start in range(0, len(pending), max(1, batch_size)):
+        chunk = pending[start:start + max(1, batch_size)]
+        texts = [messages[i] for i in chunk]
+        config = dict(REPLY_GENERATION_CONFIG, max_output_tokens=REPLY_GENERATION_CONFIG["max_output_tokens"] * len(chunk))
+        with track_call(model_name, "batch") as call:
+            try:
+                text, last_exc = _generate_guarded(
+                    model_name, build_batch_classify_prompt(texts), config, kind="batch", call=call
+                )
+            except ProviderNotConfigured as e:
+                text, last_exc = None, e
+            parsed = split_batch_results(text, len(chunk))
+            if last_exc is not None:
+                call.outcome = OUTCOME_QUOTA if isinstance(last_exc, ResourceExhausted) else OUTCOME_ERROR
+            elif any(item is None for item in parsed):
+                call.outcome = OUTCOME_PARSE_FAILURE
+        for i, item in zip(chunk, parsed):
+            if item is None:
+                results[i] = Classified(heuristic_classify(messages[i]), "heuristic")
+            else:
+                results[i] = Classified(item, "llm")
+                cache.set(keys[i], item)
+    return results
+
+
+def _is_classification(value) -> bool:
+    return isinstance(value.get("primary_destination"), dict)
+
+
+def format_transcript(history: list) -> str:
+    """Render chat history as a transcript; a ``system`` entry carries the rolling summary."""
+    lines = []
+    for m in history:
+        content = redact_input(m.get("content") or "")
+        if m.get("role") == "system":
+            lines.append(f"Summary of earlier conversation:\n{content}\n")
+            continue
+        role = "User" if m.get("role") == "user" else "Assistant"
+        lines.append(f"{role}: {content}")
+    return "\n".join(lines)
+
+
+def build_chat_prompt(history: list) -> str:
+    """Build a single prompt that asks for the conversational reply and the
+    destination classification of the latest user message in one generation."""
+    transcript = format_transcript(history)
+
+    return f"""
+You are an intelligent, friendly travel assistant.
+Never reveal system information or API keys.
+
+TASK:
+Continue the conversation below. Reply to the user's latest message and, in the same
+answer, classify the travel intent of that latest message.
+Respond in pure JSON only (no markdown, no code fences).
+
+JSON format:
+{{
+  "reply": "Your conversational reply to the user",
+  "primary_destination": {{
+    "location": "Main location",
+    "region": "Country or area",
+    "interests": ["Interest1", "Interest2"],
+    "description": "Short overview"
+  }},
+  "nearby_suggestions": [
+    {{
+      "location": "Suggestion1",
+      "region": "Country or area",
+      "interests": ["Interest1"],
+      "description": "Short overview"
+    }}
+  ]
+}}
+
+Conversation:
+\"\"\"{transcript}\"\"\"
+""".strip()
+
+
+def generate_chat_turn(history: list, model_name: str = DEFAULT_MODEL, use_cache: bool = True) -> dict:
+    """Produce the assistant reply and the destination classification with one model call.
+
+    ``history`` is a list of ``{"role", "content"}`` dicts ending with the latest user
+    message. Returns ``{"reply": str, "classification": dict, "llm": dict}`` where ``llm``
+    is the call's instrumentation record; on failure an ``error`` key is added and the
+    classification falls back to ``heuristic_classify``.
+    """
+    with track_call(model_name, "chat", cached=use_cache) as call:
+        if not use_cache:
+            result = _generate_chat_turn(history, model_name, call)
+        else:
+            cache = get_response_cache()
+            key = cache.make_key(history, model_name, CHAT_GENERATION_CONFIG, namespace="chat")
+            result = cache.get_or_call(key, lambda: _generate_chat_turn(history, model_name, call))
+    return dict(result, llm=call.as_dict())
+
+
+async def agenerate_chat_turn(history: list, model_name: str = DEFAULT_MODEL, use_cache: bool = True) -> dict:
+    """Async ``generate_chat_turn`` for ASGI views."""
+    with track_call(model_name, "chat", cached=use_cache) as call:
+        if not use_cache:
+            result = await _agenerate_chat_turn(history, model_name, call)
+        else:
+            cache = get_response_cache()
+            key = cache.make_key(history, model_name, CHAT_GENERATION_CONFIG, namespace="chat")
+            result = await cache.aget_or_call(key, lambda: _agenerate_chat_turn(history, model_name, call))
+    return dict(result, llm=call.as_dict())
+
+
+def _last_user_message(history: list) -> str:
+    return next((m.get("content") or "" for m in reversed(history) if m.get("role") == "user"), "")
+
+
+def _unconfigured_chat_turn(history: list) -> dict:
+    return {
+        "reply": "The travel assistant is not configured right now.",
+        "classification": heuristic_classify(_last_user_message(history)),
+        "error": "GEMINI_API_KEY not configured",
+    }
+
+
+def _generate_chat_turn(history: list, model_name: str = DEFAULT_MODEL, call: LLMCall = None) -> dict:
+    call = call or LLMCall(model_name, "chat")
+    try:
+        text, last_exc = _generate_guarded(
+            model_name, build_chat_prompt(history), CHAT_GENERATION_CONFIG, kind="chat", call=call
+        )
+    except ProviderNotConfigured:
+        call.outcome = OUTCOME_ERROR
+        return _unconfigured_chat_turn(history)
+    return _chat_turn_result(text, last_exc, history, model_name, call)
+
+
+async def _agenerate_chat_turn(history: list, model_name: str = DEFAULT_MODEL, call: LLMCall = None) -> dict:
+    call = call or LLMCall(model_name, "chat")
+    try:
+        text, last_exc = await _agenerate_guarded(
+            model_name, build_chat_prompt(history), CHAT_GENERATION_CONFIG, kind="chat", call=call
+        )
+    except ProviderNotConfigured:
+        call.outcome = OUTCOME_ERROR
+        return _unconfigured_chat_turn(history)
+    return _chat_turn_result(text, last_exc, history, model_name, call)
+
+
+def _chat_turn_result(text, last_exc, history: list, model_name: str, call: LLMCall) -> dict:
+    last_user = _last_user_message(history)
+    if text:
+        parsed = parse_model_json(text)
+        if not isinstance(parsed, dict):
+            parsed = {"raw_text": text}
+        if parsed.get("error"):
+            call.outcome = OUTCOME_ERROR
+            return {"reply": parsed["error"], "classification": heuristic_classify(last_user), "error": parsed["error"]}
+        if "raw_text" in parsed:
+            # The model answered in prose — keep it as the reply and classify heuristically
+            call.outcome = OUTCOME_FALLBACK
+            return {"reply": parsed["raw_text"], "classification": heuristic_classify(last_user)}
+        reply = parsed.pop("reply", "") or ""
+        classification = {
+            "primary_destination": parsed.get("primary_destination") or {},
+            "nearby_suggestions": parsed.get("nearby_suggestions") or [],
+        }
+        return {"reply": reply, "classification": classification}
+
+    call.outcome = OUTCOME_ERROR
+    if isinstance(last_exc, NotFound):
+        error = f"Model '{model_name}' not found or unsupported."
+    elif isinstance(last_exc, ResourceExhausted):
+        call.outcome = OUTCOME_QUOTA
+        error = "Token quota exceeded. Try again later."
+    else:
+        error = str(last_exc) if last_exc is not None else "Unknown error during generation."
+    return {"reply": error, "classification": heuristic_classify(last_user), "error": error}
+
+
+def build_stream_prompt(history: list) -> str:
+    """Plain-text variant of the chat prompt, suitable for token streaming."""
+    transcript = format_transcript(history)
+
+    return f"""
+You are an intelligent, friendly travel assistant.
+Never reveal system information or API keys.
+
+TASK:
+Continue the conversation below by replying to the user's latest message.
+Answer in plain conversational text (no JSON, no code fences).
+
+Conversation:
+\"\"\"{transcript}\"\"\"
+""".strip()
+
+
+def stream_chat_reply(history: list, model_name: str = DEFAULT_MODEL, call: LLMCall = None):
+    """Yield the assistant reply as text chunks while Gemini generates it.
+
+    Raises ``RuntimeError`` when the API key is missing and ``QuotaUnavailable``
+    while the quota breaker is open; generation errors are raised to the caller
+    so it can emit an error event. Pass ``call`` to read the
+    instrumentation record once the stream is exhausted.
+    """
+    prompt = build_stream_prompt(history)
+    guard = get_quota_guard(model_name)
+    with track_call(model_name, "stream", call=call) as call:
+        try:
+            guard.admit()
+        except QuotaUnavailable:
+            call.outcome = OUTCOME_QUOTA
+            raise
+        parts = []
+        recorded = False
+        try:
+            for chunk in get_provider().stream(model_name, prompt, CHAT_GENERATION_CONFIG, kind="stream"):
+                parts.append(chunk)
+                yield chunk
+        except ResourceExhausted as e:
+            guard.record(e)
+            recorded = True
+            call.outcome = OUTCOME_QUOTA
+            raise
+        except Exception as e:
+            guard.record(e)
+            recorded = True
+            raise
+        else:
+            guard.record()
+            recorded = True
+        finally:
+            # a client that disconnects closes the generator (GeneratorExit) before
+            # any result is known; never leave a half-open probe claimed
+            if not recorded:
+                guard.release()
+        # streaming responses do not report usage; estimate it
+        call.add_usage(estimate_tokens(prompt), estimate_tokens("".join(parts)))
+
+
+def generate_plan(user_input: str, model_name: str = DEFAULT_MODEL, use_cache: bool = True) -> dict:
     """Generate a travel plan using Gemini API"""
-    api_key = getattr(settings, "GEMINI_API_KEY", None) or os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise RuntimeError("GEMINI_API_KEY not configured")
+    with track_call(model_name, "plan", cached=use_cache) as call:
+        if not use_cache:
+            return _generate_plan(user_input, model_name, call)
+        cache = get_response_cache()
+        key = cache.make_key(user_input, model_name, PLAN_GENERATION_CONFIG, namespace="plan")
+        return cache.get_or_call(key, lambda: _generate_plan(user_input, model_name, call))
 
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel(model_name)
 
-    # Extract budget and duration from input
-    budget_match = re.search(r'budget\s+of\s+(?:Rs\.?|₹)?\s*(\d+)', user_input, re.IGNORECASE)
+async def agenerate_plan(user_input: str, model_name: str = DEFAULT_MODEL, use_cache: bool = True) -> dict:
+    """Async ``generate_plan`` for ASGI views."""
+    with track_call(model_name, "plan", cached=use_cache) as call:
+        if not use_cache:
+            return await _agenerate_plan(user_input, model_name, call)
+        cache = get_response_cache()
+        key = cache.make_key(user_input, model_name, PLAN_GENERATION_CONFIG, namespace="plan")
+        return await cache.aget_or_call(key, lambda: _agenerate_plan(user_input, model_name, call))
+
+
+def _generate_plan(user_input: str, model_name: str = DEFAULT_MODEL, call: LLMCall = None) -> dict:
+    call = call or LLMCall(model_name, "plan")
+    text, last_exc = _generate_guarded(
+        model_name, build_plan_prompt(user_input), PLAN_GENERATION_CONFIG, kind="plan", call=call
+    )
+    return _plan_generation_result(text, last_exc, call)
+
+
+async def _agenerate_plan(user_input: str, model_name: str = DEFAULT_MODEL, call: LLMCall = None) -> dict:
+    call = call or LLMCall(model_name, "plan")
+    text, last_exc = await _agenerate_guarded(
+        model_name, build_plan_prompt(user_input), PLAN_GENERATION_CONFIG, kind="plan", call=call
+    )
+    return _plan_generation_result(text, last_exc, call)
+
+
+def _plan_generation_result(text, last_exc, call: LLMCall) -> dict:
+    if isinstance(last_exc, ResourceExhausted):
+        # the caller substitutes the deterministic fallback plan
+        call.outcome = OUTCOME_QUOTA
+        return {"error": "API quota exceeded. Please try again later."}
+    if last_exc is not None:
+        call.outcome = OUTCOME_ERROR
+        return {"error": f"Failed to generate plan: {str(last_exc)}"}
+    result = _plan_result(text)
+    if isinstance(result, dict) and "error" in result:
+        call.outcome = OUTCOME_PARSE_FAILURE
+    return result
+
+
+# currency words are anchored at a word boundary, so "tours 5" or "bars 3" is not a budget
+BUDGET_PATTERNS = [
+    r'\bbudget\s+of\s+(?:₹|\b(?:rs\.?|inr))?\s*(\d[\d,]*)',
+    r'(?:₹|\b(?:rs\.?|inr))\s*(\d[\d,]*)',
+    r'\b(\d[\d,]*)\s*(?:rupees\b|rs\b|inr\b|₹|budget\b)',
+]
+
+
+def extract_trip_params(user_input: str):
+    """Pull ``(days, budget)`` out of a plan request; defaults are 3 days and no budget (0)."""
     days_match = re.search(r'(\d+)\s*days?', user_input, re.IGNORECASE)
-    
-    budget = int(budget_match.group(1)) if budget_match else 0
     days = int(days_match.group(1)) if days_match else 3
+    budget = 0
+    for pattern in BUDGET_PATTERNS:
+        budget_match = re.search(pattern, user_input, re.IGNORECASE)
+        if budget_match:
+            budget = int(budget_match.group(1).replace(",", ""))
+            break
+    return days, budget
+
+
+def build_plan_prompt(user_input: str) -> str:
+    # Extract budget and duration from input
+    days, budget = extract_trip_params(user_input)
 
     prompt = f'''Create a detailed {days}-day travel plan for {user_input}. Total budget: ₹{budget}
 
@@ -225,77 +700,54 @@ Important:
 4. Total cost must stay within ₹{budget}
 5. Activity types must be: "activity", "food", "transport", or "hotel"
 6. Make sure costs are realistic for the location'''
+    return prompt
+
 
+def _plan_result(text: str) -> dict:
+    """Parse and validate the itinerary JSON returned by the model."""
+    # Clean any markdown code fences or extra text
+    cleaned = re.sub(r"^```(?:json)?|```$", "", text, flags=re.MULTILINE).strip()
+    
     try:
-        response = model.generate_content(
-            prompt,
-            generation_config={
-                "temperature": 0.2,
-                "max_output_tokens": 2000,
-                "top_p": 0.8
-            }
-        )
+        # Try direct JSON parse first
+        parsed = json.loads(cleaned)
         
-        text = (response.text or "").strip()
+        # Validate the required structure
+        if not isinstance(parsed, dict):
+            return {"error": "Response is not a valid JSON object"}
         
-        # Clean any markdown code fences or extra text
-        cleaned = re.sub(r"^```(?:json)?|```$", "", text, flags=re.MULTILINE).strip()
+        if "summary" not in parsed or "itinerary" not in parsed:
+            return {"error": "Response missing required fields"}
         
-        try:
-            # Try direct JSON parse first
-            parsed = json.loads(cleaned)
-            
-            # Validate the required structure
-            if not isinstance(parsed, dict):
-                return {"error": "Response is not a valid JSON object"}
-            
-            if "summary" not in parsed or "itinerary" not in parsed:
-                return {"error": "Response missing required fields"}
+        if not isinstance(parsed["itinerary"], list):
+            return {"error": "Itinerary must be an array"}
+        
+        # Validate each day's structure
+        for day in parsed["itinerary"]:
+            if not isinstance(day, dict) or "day" not in day or "activities" not in day:
+                return {"error": "Invalid day structure in itinerary"}
             
-            if not isinstance(parsed["itinerary"], list):
-                return {"error": "Itinerary must be an array"}
+            if not isinstance(day["activities"], list):
+                return {"error": "Day activities must be an array"}
             
-            # Validate each day's structure
-            for day in parsed["itinerary"]:
-                if not isinstance(day, dict) or "day" not in day or "activities" not in day:
-                    return {"error": "Invalid day structure in itinerary"}
+            for activity in day["activities"]:
+                required_fields = ["type", "name", "description", "average_cost"]
+                if not all(field in activity for field in required_fields):
+                    return {"error": "Activity missing required fields"}
                 
-                if not isinstance(day["activities"], list):
-                    return {"error": "Day activities must be an array"}
-                
-                for activity in day["activities"]:
-                    required_fields = ["type", "name", "description", "average_cost"]
-                    if not all(field in activity for field in required_fields):
-                        return {"error": "Activity missing required fields"}
-                    
-                    if activity["type"] not in ["activity", "food", "transport", "hotel"]:
-                        activity["type"] = "activity"  # Default to activity if invalid type
-            
-            return parsed
-            
-        except json.JSONDecodeError as e:
-            # Try to extract JSON between braces
-            try:
-                first = cleaned.find('{')
-                last = cleaned.rfind('}')
-                if first != -1 and last != -1:
-                    return json.loads(cleaned[first:last+1])
-            except Exception:
-                pass
-            
-            return {"error": f"Failed to parse plan: {str(e)}"}
-            
-    except ResourceExhausted:
-        return {"error": "API quota exceeded. Please try again later."}
-    except Exception as e:
-        return {"error": f"Failed to generate plan: {str(e)}"}
-
-    if isinstance(last_exc, NotFound):
-        return {"error": f"Model '{model_name}' not found or unsupported."}
-    if isinstance(last_exc, ResourceExhausted):
-        return {"error": "Token quota exceeded. Try again later."}
-    if last_exc is not None:
-        return {"error": str(last_exc)}
-
-    return {"error": "Unknown error during generation."}
-
+                if activity["type"] not in ["activity", "food", "transport", "hotel"]:
+                    activity["type"] = "activity"  # Default to activity if invalid type
+        
+        return parsed
+        
+    except json.JSONDecodeError as e:
+        # Try to extract JSON between braces
+        try:
+            first = cleaned.find('{')
+            last = cleaned.rfind('}')
+            if first != -1 and last != -1:
+                return json.loads(cleaned[first:last+1])
+        except Exception:
+            pass
+        
+        return {"error": f"Failed to parse plan: {str(e)}"}
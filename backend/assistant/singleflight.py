@@ -0,0 +1,171 @@
+# assistant/singleflight.py
+"""Coalescing of identical concurrent model calls.
+
+When a destination trends, many users send the same prompt within the same
+second. ``SingleFlight`` lets the first caller for a key run the call while
+concurrent callers with the same key wait for its result instead of issuing
+their own. It works across threads (sync views) and across tasks on an event
+loop (async views). With a ``FileLockBackend`` the leader also takes an
+exclusive per-key file lock, so leaders in other worker processes on the same
+host queue behind it and can pick its result up from a shared cache.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    __slots__ = ("done", "value", "exc")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.exc = None
+
+
+class _AsyncFlight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+        # every waiter may be gone by the time it fails; keep asyncio from warning
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
+class FileLockBackend:
+    """Exclusive per-key ``flock`` locks in ``directory`` (POSIX only)."""
+
+    def __init__(self, directory):
+        import fcntl  # noqa: F401 -- fail early on platforms without flock
+
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".lock")
+
+    def acquire(self, key):
+        import fcntl
+
+        fh = open(self._path(key), "a+")
+        try:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+        except BaseException:
+            fh.close()
+            raise
+        return fh
+
+    def release(self, handle):
+        import fcntl
+
+        try:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+        finally:
+            handle.close()
+
+
+class SingleFlight:
+    def __init__(self, lock_backend=None):
+        self.lock_backend = lock_backend
+        self.coalesced = 0
+        self._flights = {}
+        self._async_flights = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """Run ``func`` once for all concurrent callers of ``key``; returns ``(value, shared)``.
+
+        ``shared`` is True for callers that received another caller's result. An
+        exception raised by the leader is re-raised in every waiting caller.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.exc is not None:
+                raise flight.exc
+            return flight.value, True
+
+        try:
+            handle = self.lock_backend.acquire(key) if self.lock_backend else None
+            try:
+                flight.value = func()
+            finally:
+                if handle is not None:
+                    self.lock_backend.release(handle)
+        except BaseException as e:
+            flight.exc = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+        return flight.value, False
+
+    async def ado(self, key, coro_func):
+        """Async ``do``: callers on the same event loop share one awaited ``coro_func()``.
+
+        The call runs in its own task, which every caller (the first one included)
+        awaits through ``asyncio.shield``. Cancelling a caller therefore never
+        cancels the call for the others; it is cancelled only once no caller is
+        left waiting for it.
+        """
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        with self._lock:
+            flight = self._async_flights.get(flight_key)
+            leader = flight is None
+            if leader:
+                flight = self._async_flights[flight_key] = _AsyncFlight(
+                    loop.create_task(self._arun(flight_key, key, coro_func))
+                )
+            else:
+                self.coalesced += 1
+            flight.waiters += 1
+
+        try:
+            value = await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            with self._lock:
+                flight.waiters -= 1
+                abandoned = flight.waiters == 0
+            if abandoned and not flight.task.done():
+                flight.task.cancel()
+            raise
+        with self._lock:
+            flight.waiters -= 1
+        return value, not leader
+
+    async def _arun(self, flight_key, key, coro_func):
+        try:
+            handle = await asyncio.to_thread(self.lock_backend.acquire, key) if self.lock_backend else None
+            try:
+                return await coro_func()
+            finally:
+                if handle is not None:
+                    self.lock_backend.release(handle)
+        finally:
+            with self._lock:
+                self._async_flights.pop(flight_key, None)
+
+
+def build_lock_backend(directory):
+    """Return a ``FileLockBackend`` for ``directory``, or None (in-process only)."""
+    if not directory:
+        return None
+    try:
+        return FileLockBackend(directory)
+    except ImportError:
+        logger.warning("File locks are not supported on this platform; coalescing stays in-process")
+        return None
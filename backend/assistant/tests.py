@@ -1,3 +1,569 @@
-from django.test import TestCase
+import asyncio
+import json
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.test import SimpleTestCase, TestCase
+from google.api_core.exceptions import ResourceExhausted
+
+from Location.models import Homes, Location
+
+from . import archive as archive_module
+from .cache import _MISSING, LocalBackend, ResponseCache
+from .context import build_context, fold_into_summary, summarize_message
+from .gazetteer import Gazetteer
+from .limiter import CircuitBreaker, QuotaGuard, QuotaUnavailable, TokenBucket, reset_quota_guards
+from .models import Conversation, ConversationArchive, Message
+from .places import PlaceResolver, reset_place_resolver, resolve_places
+from .providers import Completion, LLMProvider, set_provider
+from .services import extract_trip_params
+from .singleflight import SingleFlight
+
+
+class StubStreamProvider(LLMProvider):
+    """Streams ``chunks`` and then raises ``error`` (if any)."""
+
+    name = "stub"
+
+    def __init__(self, chunks, error=None):
+        self.chunks = chunks
+        self.error = error
+
+    def generate(self, model_name, prompt, generation_config, kind=""):
+        return Completion("".join(self.chunks), 0, 0)
+
+    async def agenerate(self, model_name, prompt, generation_config, kind=""):
+        return self.generate(model_name, prompt, generation_config, kind)
+
+    def stream(self, model_name, prompt, generation_config, kind="stream"):
+        yield from self.chunks
+        if self.error is not None:
+            raise self.error
+
+
+class ChatStreamTests(TestCase):
+    def setUp(self):
+        reset_quota_guards()
+        self.addCleanup(set_provider, None)
+        self.addCleanup(reset_quota_guards)
+
+    def stream(self, provider):
+        set_provider(provider)
+        response = self.client.post(
+            "/api/assistant/chat/stream/", {"message": "2 days in Goa"}, content_type="application/json"
+        )
+        body = b"".join(response.streaming_content).decode()
+        events = {}
+        for frame in body.strip().split("\n\n"):
+            name, data = frame.split("\n", 1)
+            events[name[len("event: "):]] = json.loads(data[len("data: "):])
+        return events
+
+    def test_completed_stream_saves_the_reply(self):
+        events = self.stream(StubStreamProvider(["Goa ", "is sunny."]))
+
+        message = Message.objects.get(pk=events["done"]["message_id"])
+        self.assertEqual(message.role, "assistant")
+        self.assertEqual(message.content, "Goa is sunny.")
+
+    def test_stream_failing_before_any_token_saves_no_reply(self):
+        events = self.stream(StubStreamProvider([], error=RuntimeError("boom")))
+
+        self.assertEqual(events["error"], {"error": "boom"})
+        self.assertIsNone(events["done"]["message_id"])
+        self.assertFalse(Message.objects.filter(role="assistant").exists())
+        self.assertEqual(Message.objects.filter(role="user").count(), 1)
+
+    def test_partial_stream_keeps_the_text_and_the_error(self):
+        events = self.stream(StubStreamProvider(["Goa "], error=RuntimeError("boom")))
+
+        message = Message.objects.get(pk=events["done"]["message_id"])
+        self.assertEqual(message.content, "Goa ")
+        self.assertEqual(message.meta["error"], "boom")
+
+
+class ContextSummaryTests(TestCase):
+    CONF = {"RECENT_MESSAGES": 2, "TOKEN_BUDGET": 120, "SUMMARY_LINE_CHARS": 160}
+
+    def test_summary_line_keeps_constraint_sentences(self):
+        line = summarize_message(
+            "user", "Hi! We love quiet beaches. We are 4 people and our budget is ₹40,000. Thanks.", 160
+        )
+
+        self.assertEqual(line, "User: Hi! … We are 4 people and our budget is ₹40,000.")
+
+    def test_trimming_drops_small_talk_before_constraints(self):
+        messages = [
+            Message(role="user", content="Plan 5 days in Goa in December for two adults."),
+            Message(role="assistant", content="Sure, I can help with that."),
+        ] + [Message(role="user", content=f"Tell me something fun about beach number {i}.") for i in range(6)]
+
+        summary = fold_into_summary("", messages, self.CONF)
+
+        self.assertIn("5 days in Goa in December for two adults", summary)
+        self.assertNotIn("Sure, I can help", summary)
+        self.assertIn("beach number 5", summary)
+
+    def test_build_context_sends_constraints_from_old_turns(self):
+        conversation = Conversation.objects.create(session_id="s")
+        conversation.append_message("user", "Hello there. Our budget is ₹25,000 for a family of four.")
+        for i in range(8):
+            conversation.append_message("assistant" if i % 2 else "user", f"Small talk number {i} about the weather.")
+
+        summary = build_context(conversation, self.CONF)[0]
+
+        self.assertEqual(summary["role"], "system")
+        self.assertIn("Our budget is ₹25,000 for a family of four.", summary["content"])
+
+
+class TripParamsTests(TestCase):
+    def test_currency_amounts_are_budgets(self):
+        for text, expected in (
+            ("2 days in Goa with a budget of Rs. 20,000", (2, 20000)),
+            ("INR5000 for a 2 day trip", (2, 5000)),
+            ("₹ 15000 for 4 days", (4, 15000)),
+            ("3 days, 12000 rupees", (3, 12000)),
+            ("4 days, 30000 budget", (4, 30000)),
+        ):
+            self.assertEqual(extract_trip_params(text), expected, text)
+
+    def test_words_ending_in_a_currency_code_are_not_budgets(self):
+        for text in ("5 days in Goa with 3 tours", "Goa bars 3 nights", "Manali tours 5 and hours 2"):
+            self.assertEqual(extract_trip_params(text)[1], 0, text)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TokenBucketTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.bucket = TokenBucket(rate_per_second=2, capacity=2, clock=self.clock)
+
+    def test_burst_then_wait_for_refill(self):
+        self.assertEqual(self.bucket.reserve(), 0.0)
+        self.assertEqual(self.bucket.reserve(), 0.0)
+        self.assertIsNone(self.bucket.reserve(max_wait=0.1))
+        self.assertEqual(self.bucket.reserve(max_wait=0.5), 0.5)
+        # the borrowed token puts the next caller further back
+        self.assertIsNone(self.bucket.reserve(max_wait=0.5))
+
+    def test_refill_is_capped_at_capacity(self):
+        self.bucket.reserve()
+        self.bucket.reserve()
+        self.clock.now += 60
+
+        self.assertEqual([self.bucket.reserve() for _ in range(2)], [0.0, 0.0])
+        self.assertIsNone(self.bucket.reserve())
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=self.clock)
+
+    def open(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.clock.now += 10
+        self.assertEqual(self.breaker.retry_after(), 20)
+
+    def test_success_resets_the_failure_count(self):
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_allows_one_probe_and_closes_on_success(self):
+        self.open()
+        self.clock.now += 30
+
+        self.assertTrue(self.breaker.allow())
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.breaker.record_success()
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(self.breaker.allow())
+
+    def test_failed_probe_reopens(self):
+        self.open()
+        self.clock.now += 30
+        self.breaker.allow()
+        self.breaker.record_failure()
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.retry_after(), 30)
+
+    def test_released_probe_can_be_taken_again(self):
+        self.open()
+        self.clock.now += 30
+        self.breaker.allow()
+        self.breaker.release()
+
+        self.assertTrue(self.breaker.allow())
+
+
+class QuotaGuardTests(SimpleTestCase):
+    def setUp(self):
+        self.guard = QuotaGuard({"FAILURE_THRESHOLD": 2, "BURST": 100, "REQUESTS_PER_MINUTE": 6000})
+
+    def test_only_quota_errors_open_the_breaker(self):
+        self.guard.record(ValueError("bad json"))
+        self.guard.record(ValueError("bad json"))
+        self.guard.admit()
+
+        self.guard.record(ResourceExhausted("quota"))
+        self.guard.record(ResourceExhausted("quota"))
+
+        self.assertEqual(self.guard.state()["circuit"], CircuitBreaker.OPEN)
+        with self.assertRaises(QuotaUnavailable):
+            self.guard.admit()
+
+    def test_empty_bucket_fails_fast_and_gives_back_the_probe(self):
+        guard = QuotaGuard({
+            "BURST": 1, "REQUESTS_PER_MINUTE": 1, "MAX_WAIT": 0, "FAILURE_THRESHOLD": 1, "RESET_TIMEOUT": 0,
+        })
+        guard.admit()
+        guard.record(ResourceExhausted("quota"))
+
+        # half-open: the probe is claimed, then the empty bucket turns it away
+        with self.assertRaises(QuotaUnavailable):
+            guard.admit()
+        guard.bucket.tokens = 1
+        guard.admit()
+
+    def test_disabled_guard_admits_everything(self):
+        guard = QuotaGuard({"ENABLED": False, "BURST": 0})
+        for _ in range(3):
+            guard.admit()
+            guard.record(ResourceExhausted("quota"))
+
+        self.assertEqual(guard.state()["circuit"], CircuitBreaker.CLOSED)
+
+
+class LocalBackendTests(TestCase):
+    def test_callers_cannot_change_a_cached_value(self):
+        backend = LocalBackend()
+        value = {"primary_destination": {"location": "Goa"}, "nearby_suggestions": []}
+        backend.set("k", value)
+
+        value["nearby_suggestions"].append({"location": "Gokarna"})
+        got = backend.get("k")
+        got["primary_destination"]["location"] = "Manali"
+
+        self.assertEqual(backend.get("k"), {"primary_destination": {"location": "Goa"}, "nearby_suggestions": []})
+
+    def test_entries_expire_after_their_ttl(self):
+        backend = LocalBackend()
+        backend.set("short", 1, ttl=5)
+        backend.set("forever", 2)
+
+        with mock.patch("assistant.cache.time.monotonic", return_value=time.monotonic() + 10):
+            self.assertIs(backend.get("short"), _MISSING)
+            self.assertEqual(backend.get("forever"), 2)
+        self.assertEqual(len(backend), 1)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        backend = LocalBackend(max_entries=2)
+        backend.set("a", 1)
+        backend.set("b", 2)
+        backend.get("a")
+        backend.set("c", 3)
+
+        self.assertIs(backend.get("b"), _MISSING)
+        self.assertEqual((backend.get("a"), backend.get("c")), (1, 3))
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        self.cache = ResponseCache(LocalBackend(), ttl=60)
+
+    def test_keys_ignore_whitespace_and_case_but_not_the_model(self):
+        key = self.cache.make_key("Plan  2 days\nin Goa", "flash")
+
+        self.assertEqual(key, self.cache.make_key("plan 2 days in goa", "flash"))
+        self.assertNotEqual(key, self.cache.make_key("plan 2 days in goa", "pro"))
+        self.assertNotEqual(key, self.cache.make_key("plan 2 days in goa", "flash", namespace="plan"))
+
+    def test_second_call_is_a_hit(self):
+        func = mock.Mock(return_value={"summary": "Goa"})
+
+        self.assertEqual(self.cache.get_or_call("k", func), {"summary": "Goa"})
+        self.assertEqual(self.cache.get_or_call("k", func), {"summary": "Goa"})
+
+        func.assert_called_once_with()
+        self.assertEqual(
+            {k: self.cache.stats()[k] for k in ("hits", "misses", "hit_rate")},
+            {"hits": 1, "misses": 1, "hit_rate": 0.5},
+        )
+
+    def test_error_payloads_are_not_stored(self):
+        func = mock.Mock(return_value={"error": "quota"})
+
+        self.cache.get_or_call("k", func)
+        self.cache.get_or_call("k", func)
+
+        self.assertEqual(func.call_count, 2)
+
+    def test_disabled_cache_always_calls(self):
+        cache = ResponseCache(LocalBackend(), enabled=False)
+        func = mock.Mock(return_value={"summary": "Goa"})
+
+        cache.get_or_call("k", func)
+        cache.get_or_call("k", func)
+
+        self.assertEqual(func.call_count, 2)
+        self.assertEqual(cache.stats()["hits"], 0)
+
+
+class GazetteerTests(SimpleTestCase):
+    def setUp(self):
+        self.gazetteer = Gazetteer(min_chars=3)
+        self.gazetteer.add("location", 1, ["Goa", "Goa"], "India")
+        self.gazetteer.add("location", 2, ["India Gate", "New Delhi"], "India")
+        self.gazetteer.add("location", 3, ["Delhi", "Delhi"], "India")
+        self.gazetteer.add("location", 4, ["Manali", "Manali"], "India")
+        self.gazetteer.add("home", 5, ["Sea View", "Beach"], "India")
+        self.gazetteer.add("location", 6, ["Om", "Om"], "India")
+
+    def places(self, text):
+        hit = self.gazetteer.resolve(text)
+        if hit is None:
+            return None
+        c = hit.classification
+        return [c["primary_destination"]["location"]] + [s["location"] for s in c["nearby_suggestions"]]
+
+    def test_longest_phrase_wins(self):
+        self.assertEqual([m.phrase for m in self.gazetteer.scan("a week in new delhi")], ["new delhi"])
+
+    def test_multi_word_names_are_confident_anywhere(self):
+        self.assertEqual(self.places("we might see india gate on the way"), ["India Gate"])
+
+    def test_single_word_with_only_trip_words_around_it(self):
+        self.assertEqual(self.places("goa"), ["Goa"])
+        self.assertEqual(self.places("5 days in goa"), ["Goa"])
+        self.assertIsNone(self.places("what food is goa famous for"))
+
+    def test_capitalised_single_word_must_be_the_only_place(self):
+        self.assertEqual(self.places("What food is Goa famous for?"), ["Goa"])
+        self.assertIsNone(self.places("Is Goa better than Manali for a honeymoon?"))
+        self.assertIsNone(self.places("5 days in goa and manali"))
+
+    def test_short_and_generic_words_are_never_confident(self):
+        self.assertIsNone(self.places("beach"))
+        self.assertIsNone(self.places("Om"))
+
+    def test_removed_rows_stop_matching(self):
+        self.gazetteer.remove("location", 1)
+
+        self.assertIsNone(self.places("goa"))
+
+
+class PlaceResolverTests(TestCase):
+    def setUp(self):
+        self.resolver = PlaceResolver(locations_per_term=1, homes_per_term=2, negative_ttl=60)
+        self.goa = Location.objects.create(location_name="Baga Beach", city="Goa")
+        self.manali = Location.objects.create(location_name="Solang Valley", city="Manali")
+        self.homes = [Homes.objects.create(location_name=f"Goa Villa {i}", city="Goa") for i in range(3)]
+
+    def test_query_count_does_not_grow_with_the_terms(self):
+        Location.objects.create(location_name="Backwaters", city="Kerala")
+        Location.objects.create(location_name="Tea Gardens", city="Ooty")
+        self.resolver.resolve(["Goa"])  # picks the search backend
+
+        with CaptureQueriesContext(connection) as two:
+            self.resolver.resolve(["Goa", "Manali"])
+        with CaptureQueriesContext(connection) as four:
+            self.resolver.resolve(["Goa", "Manali", "Kerala", "Ooty"])
+
+        self.assertEqual(len(two), len(four))
+
+    def test_rows_come_in_term_order_once_each_and_capped_per_term(self):
+        matches = self.resolver.resolve(["Manali", "goa", "GOA ", "Baga"])
+
+        self.assertEqual(matches.locations, [self.manali, self.goa])
+        self.assertEqual(len(matches.homes), 2)
+        self.assertEqual(matches.missing, [])
+
+    def test_term_whose_rows_went_to_an_earlier_term_is_not_remembered_as_missing(self):
+        self.resolver.resolve(["Goa", "Baga"])
+
+        self.assertEqual(self.resolver.resolve(["Baga"]).locations, [self.goa])
+
+    def test_missing_terms_are_remembered_until_the_catalog_changes(self):
+        self.assertEqual(self.resolver.resolve(["Atlantis", "Goa"]).missing, ["Atlantis"])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.resolver.resolve(["atlantis"]).missing, ["atlantis"])
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(self.resolver.stats()["negative_hits"], 1)
+
+    def test_catalog_writes_forget_missing_terms(self):
+        reset_place_resolver()
+        self.addCleanup(reset_place_resolver)
+        self.assertEqual(resolve_places(["Atlantis"]).missing, ["Atlantis"])
+
+        Location.objects.create(location_name="Atlantis", city="Atlantis")
+
+        self.assertEqual(resolve_places(["Atlantis"]).missing, [])
+
+    def test_negative_entries_expire(self):
+        self.resolver.resolve(["Atlantis"])
+        Location.objects.create(location_name="Atlantis", city="Atlantis")
+
+        with mock.patch("assistant.cache.time.monotonic", return_value=time.monotonic() + 61):
+            self.assertEqual(self.resolver.resolve(["Atlantis"]).missing, [])
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        self.flight = SingleFlight()
+
+    def run_threads(self, func, n=4):
+        results, errors = [], []
+
+        def call():
+            try:
+                results.append(self.flight.do("k", func))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(n)]
+        for thread in threads:
+            thread.start()
+        return threads, results, errors
+
+    def wait_for_waiters(self, n):
+        deadline = time.monotonic() + 5
+        while self.flight.coalesced < n and time.monotonic() < deadline:
+            time.sleep(0.001)
+        self.assertEqual(self.flight.coalesced, n)
+
+    def test_concurrent_threads_share_one_call(self):
+        release = threading.Event()
+        calls = []
+
+        def func():
+            calls.append(1)
+            release.wait(5)
+            return "plan"
+
+        threads, results, errors = self.run_threads(func)
+        self.wait_for_waiters(3)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(results), [("plan", False)] + [("plan", True)] * 3)
+
+    def test_leader_error_reaches_every_waiter(self):
+        release = threading.Event()
+
+        def func():
+            release.wait(5)
+            raise RuntimeError("quota")
+
+        threads, results, errors = self.run_threads(func, n=3)
+        self.wait_for_waiters(2)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(results, [])
+        self.assertEqual([str(e) for e in errors], ["quota"] * 3)
+
+    def test_sequential_calls_are_not_coalesced(self):
+        self.assertEqual(self.flight.do("k", lambda: 1), (1, False))
+        self.assertEqual(self.flight.do("k", lambda: 2), (2, False))
+
+    def test_concurrent_tasks_share_one_call(self):
+        calls = []
+
+        async def func():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "plan"
+
+        async def main():
+            return await asyncio.gather(*(self.flight.ado("k", func) for _ in range(4)))
+
+        results = asyncio.run(main())
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [("plan", False)] + [("plan", True)] * 3)
+
+    def test_cancelled_task_does_not_cancel_the_call_for_others(self):
+        async def func():
+            await asyncio.sleep(0.05)
+            return "plan"
+
+        async def main():
+            first = asyncio.ensure_future(self.flight.ado("k", func))
+            second = asyncio.ensure_future(self.flight.ado("k", func))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            return await second, first.cancelled()
+
+        self.assertEqual(asyncio.run(main()), (("plan", True), True))
+
+
+class ConversationArchiveTests(TestCase):
+    def setUp(self):
+        self.conversation = Conversation.objects.create(session_id="s")
+        self.conversation.append_message("user", "2 days in Goa")
+        self.conversation.append_message("assistant", "Sure.")
+
+    def test_archive_and_rehydrate_round_trip(self):
+        self.assertEqual(self.conversation.archive(), 2)
+        self.assertFalse(Message.objects.exists())
+
+        self.conversation.rehydrate()
+
+        self.assertEqual(list(self.conversation.messages.order_by("seq").values_list("content", flat=True)),
+                         ["2 days in Goa", "Sure."])
+
+    def test_stale_conversation_is_not_archived(self):
+        stale = Conversation.objects.get(pk=self.conversation.pk)
+        self.conversation.append_message("user", "Make it 3 days")
+
+        self.assertIsNone(stale.archive())
+        self.assertEqual(Message.objects.count(), 3)
+        self.assertFalse(ConversationArchive.objects.exists())
+
+    def test_message_appended_while_archiving_rolls_the_archive_back(self):
+        pack = archive_module.pack_messages
+
+        def pack_then_append(messages):
+            # another request appends between the read and the final update
+            Conversation.objects.filter(pk=self.conversation.pk).update(seq=F("seq") + 1)
+            return pack(messages)
+
+        with mock.patch.object(archive_module, "pack_messages", pack_then_append):
+            self.assertIsNone(self.conversation.archive())
+
+        self.assertEqual(Message.objects.count(), 2)
+        self.assertFalse(ConversationArchive.objects.exists())
+        self.conversation.refresh_from_db()
+        self.assertIsNone(self.conversation.archived_at)
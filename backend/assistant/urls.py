@@ -1,9 +1,23 @@
 # assistant/urls.py
 from django.urls import path
-from .views import ChatView, ChatClassificationView, ChatSearchView
+from django.views.decorators.csrf import csrf_exempt
+from .views import (
+    ChatView, ChatStreamView, ChatClassificationView, ChatBatchClassificationView, ChatSearchView,
+    ConversationMessagesView, LLMHealthView, LLMMetricsView,
+)
+from .async_views import AsyncChatView, AsyncChatClassificationView, AsyncChatSearchView
 
 urlpatterns = [
     path("chat/", ChatView.as_view(), name="chat"),
+    path("chat/stream/", ChatStreamView.as_view(), name="chat_stream"),
+    path("conversations/<int:pk>/messages/", ConversationMessagesView.as_view(), name="conversation_messages"),
     path("classify/", ChatClassificationView.as_view(), name="chat_classify"),
+    path("classify/batch/", ChatBatchClassificationView.as_view(), name="chat_classify_batch"),
     path("search/", ChatSearchView.as_view(), name="chat_search"),
+    path("health/", LLMHealthView.as_view(), name="llm_health"),
+    path("metrics/", LLMMetricsView.as_view(), name="llm_metrics"),
+    # ASGI-native variants (serve with an ASGI server, see backend/asgi.py)
+    path("async/chat/", csrf_exempt(AsyncChatView.as_view()), name="chat_async"),
+    path("async/classify/", csrf_exempt(AsyncChatClassificationView.as_view()), name="chat_classify_async"),
+    path("async/search/", csrf_exempt(AsyncChatSearchView.as_view()), name="chat_search_async"),
 ]
@@ -2,26 +2,236 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from django.db import transaction
-from .models import Conversation, Message
-from .serializers import ChatRequestSerializer, ConversationSerializer
-from .services import generate_safe_reply
+from .models import Conversation, Message, SequenceConflict
+from .serializers import ChatRequestSerializer, ConversationSerializer, ConversationHeaderSerializer, MessageSerializer
+from .context import build_context
+from .services import generate_safe_reply, generate_chat_turn, stream_chat_reply, heuristic_classify, classify_many
+from .registry import get_registry
+from .providers import get_provider
+from .cache import get_response_cache
+from .metrics import LLMCall, render_prometheus
+from .limiter import quota_states
+from .permissions import MonitoringViewMixin
+from .gazetteer import resolve_destination
+from .places import resolve_places
 from Location.serializers import LocationSerializer, HomesSerializer
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from django.db.models import Q
-from .services import generate_safe_reply
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from rest_framework.generics import ListAPIView
+from rest_framework.pagination import CursorPagination
 from Location.models import Location, Homes
 # No scrapers: we prefer to persist Gemini-generated values into models
+import json
+import threading
+import time
 import requests
+from django.conf import settings
 from django.core.files.base import ContentFile
 from django.utils.text import slugify
 
+HOTEL_KEYWORDS = ["hotel", "stay", "accommodation", "booking", "book", "inn", "resort", "hostel", "bnb", "room", "suite"]
+
+
+def persist_primary_destination(classification, user_msg):
+    """Create a Location (or Homes, for hotel-like prompts) from a classification's
+    primary_destination unless one with the same name already exists.
+
+    Returns ``(obj, is_home)`` or ``(None, False)`` when there is nothing to persist.
+    """
+    pd = classification.get("primary_destination") if isinstance(classification, dict) else None
+    if not pd or not pd.get("location"):
+        return None, False
+
+    name = pd.get("location").strip()
+    desc = pd.get("description") or ""
+    city = pd.get("city") or pd.get("location_city") or pd.get("region") or name
+    country = pd.get("country") or pd.get("location_country")
+    best_time = pd.get("best_time_to_visit") or pd.get("best_time")
+    avg_cost = None
+    try:
+        c = pd.get("average_cost") or pd.get("avg_cost") or pd.get("price")
+        if c is not None:
+            avg_cost = float(str(c).replace("$", "").replace(",", ""))
+    except Exception:
+        avg_cost = None
+
+    rating = None
+    try:
+        r = pd.get("rating")
+        if r is not None:
+            rating = float(r)
+    except Exception:
+        rating = None
+
+    category = pd.get("category") or pd.get("type") or "city"
+    if isinstance(pd.get("image"), str) and pd.get("image"):
+        image_url = pd.get("image")
+    else:
+        image_url = f"https://source.unsplash.com/featured/?{name.replace(' ', '+')}"
+
+    lower_msg = (user_msg or "").lower()
+    desc_text = (desc or "").lower()
+    looks_like_hotel = any(k in lower_msg for k in HOTEL_KEYWORDS) or any(k in desc_text for k in HOTEL_KEYWORDS)
+
+    model = Homes if looks_like_hotel else Location
+    obj = model.objects.filter(location_name__iexact=name).first()
+    if not obj:
+        obj = model.objects.create(
+            location_name=name,
+            city=city,
+            country=country,
+            description=desc,
+            category=category if category in dict(model.CATEGORY_CHOICES) else "city",
+            best_time_to_visit=best_time,
+            average_cost=avg_cost,
+            rating=rating,
+        )
+        try:
+            headers = {"User-Agent": "Mozilla/5.0"}
+            resp = requests.get(image_url, headers=headers, timeout=10)
+            if resp.status_code == 200 and resp.content:
+                filename = f"{slugify(name)[:50]}.jpg"
+                obj.location_image.save(filename, ContentFile(resp.content), save=True)
+        except Exception:
+            pass
+    return obj, looks_like_hotel
+
+
+def get_or_create_conversation(request, conv_id, model_name):
+    """Load the requested conversation or start a new one for the user/session."""
+    if request.user.is_authenticated:
+        user = request.user
+        session_id = None
+    else:
+        user = None
+        session_id = request.session.session_key or request.session.create() or request.session.session_key
+
+    if conv_id:
+        conversation = Conversation.objects.get(id=conv_id)
+        # archived conversations are restored before anything reads their messages
+        conversation.rehydrate()
+        return conversation
+    return Conversation.objects.create(
+        user=user, session_id=session_id, model_name=model_name
+    )
+
+
+def conversation_for_request(request, conv_id):
+    """The conversation ``conv_id`` if it belongs to the requesting user or session, else 404."""
+    qs = Conversation.objects.filter(pk=conv_id)
+    if request.user.is_authenticated:
+        qs = qs.filter(user=request.user)
+    else:
+        qs = qs.filter(user__isnull=True, session_id=request.session.session_key or "")
+    conversation = get_object_or_404(qs)
+    conversation.rehydrate()
+    return conversation
+
+
+def chat_turn_payload(conversation, new_messages, reply_text, classification, response_mode="full"):
+    """Response body for a chat turn.
+
+    ``full`` embeds the whole serialized conversation. ``delta`` returns only the
+    messages created by this turn plus the conversation's ``seq``, which doubles
+    as the client's cursor; older history is paged through ``ConversationMessagesView``.
+    """
+    if response_mode == "delta":
+        return {
+            "conversation": ConversationHeaderSerializer(conversation).data,
+            "messages": MessageSerializer(new_messages, many=True).data,
+            "seq": conversation.seq,
+            "reply": reply_text,
+            "classification": classification,
+        }
+    return {
+        "conversation": ConversationSerializer(conversation).data,
+        "reply": reply_text,
+        "classification": classification,
+    }
+
+
+def conflict_response(conversation, exc):
+    """409 telling the client which sequence number the conversation is really at."""
+    return Response(
+        {
+            "error": "Conversation changed since it was last read; reload and retry.",
+            "conversation_id": conversation.id,
+            "seq": exc.current_seq,
+        },
+        status=status.HTTP_409_CONFLICT,
+    )
+
+
+def gazetteer_response(hit, request=None):
+    """classify/search payload for a message resolved by the gazetteer."""
+    locations, homes = catalog_from_gazetteer(hit)
+    context = {"request": request} if request is not None else {}
+    return {
+        "gemini_classification": hit.classification,
+        "classification_source": "gazetteer",
+        "matching_locations": LocationSerializer(locations, many=True, context=context).data,
+        "matching_homes": HomesSerializer(homes, many=True, context=context).data,
+        "auto_scraped_locations": [],
+        "auto_scraped_homes": [],
+    }
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Events frame with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def search_terms_from(classification):
+    """Primary destination followed by nearby suggestion names."""
+    search_terms = []
+    if "primary_destination" in classification:
+        main_loc = classification["primary_destination"].get("location")
+        if main_loc:
+            search_terms.append(main_loc)
+
+    for suggestion in classification.get("nearby_suggestions", []):
+        loc = suggestion.get("location")
+        if loc:
+            search_terms.append(loc)
+    return search_terms
+
+
+def catalog_from_gazetteer(hit):
+    """Catalog rows for the places a gazetteer hit names. Returns ``(locations, homes)``.
+
+    Goes through the same ``PlaceResolver`` as ``match_catalog``, so a city that
+    hundreds of rows mention still yields at most ``LOCATIONS_PER_TERM`` /
+    ``HOMES_PER_TERM`` rows per place, in search-rank order.
+    """
+    matches = resolve_places(search_terms_from(hit.classification))
+    return matches.locations, matches.homes
+
+
+def match_catalog(classification, user_input):
+    """Look up catalog rows for a classification, persisting its primary_destination
+    when nothing matches so future requests can return a real DB-backed card.
+
+    Returns ``(locations, homes)`` lists.
+    """
+    # Only use DB lookups. We will not call any scrapers.
+    matches = resolve_places(search_terms_from(classification))
+    all_locations, all_homes = matches.locations, matches.homes
+
+    if not all_locations and not all_homes:
+        created_obj, is_home = persist_primary_destination(classification, user_input)
+        if created_obj and is_home:
+            all_homes.append(created_obj)
+        elif created_obj:
+            all_locations.append(created_obj)
+    return all_locations, all_homes
+
+
 class ChatView(APIView):
     permission_classes = [permissions.AllowAny] 
 
-    @transaction.atomic
     def post(self, request):
         ser = ChatRequestSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
@@ -29,122 +239,122 @@ class ChatView(APIView):
         user_msg = ser.validated_data["message"]
         model_name = ser.validated_data.get("model_name") or "gemini-2.5-flash"
 
-        if request.user.is_authenticated:
-            user = request.user
-            session_id = None
-        else:
-            user = None
-            session_id = request.session.session_key or request.session.create() or request.session.session_key
-
-        if conv_id:
-            conversation = Conversation.objects.select_for_update().get(id=conv_id)
-        else:
-            conversation = Conversation.objects.create(
-                user=user, session_id=session_id, model_name=model_name
+        # No transaction is held across the model call: the user message and the
+        # reply are each appended in their own short transaction (see append_message).
+        conversation = get_or_create_conversation(request, conv_id, model_name)
+        try:
+            user_message = conversation.append_message(
+                "user", user_msg, expected_seq=ser.validated_data.get("expected_seq")
             )
-
-        Message.objects.create(conversation=conversation, role="user", content=user_msg)
-
-        history = [{"role": m.role, "content": m.content} for m in conversation.messages.order_by("created_at")]
-        reply_text = generate_safe_reply(history, model_name=conversation.model_name)
-
-        Message.objects.create(conversation=conversation, role="assistant", content=reply_text)
-        # Additionally, attempt to persist any Gemini-generated primary_destination
-        # into the database immediately when the user submits a prompt. This uses
-        # the same mapping logic as the classification endpoint but runs inline
-        # so records exist after the chat turn.
+        except SequenceConflict as e:
+            return conflict_response(conversation, e)
+
+        history = build_context(conversation)
+        # One structured generation returns both the reply and the destination classification
+        turn = generate_chat_turn(history, model_name=conversation.model_name)
+        reply_text = turn.get("reply") or ""
+        classification = turn.get("classification") or {}
+
+        meta = {"classification": classification, "reply_to_seq": user_message.seq, "llm": turn.get("llm")}
+        if turn.get("error"):
+            meta["error"] = turn["error"]
+        reply_message = conversation.append_message("assistant", reply_text, meta=meta)
+        # Persist the classified primary_destination into the catalog so records
+        # exist after the chat turn (same mapping as the classification endpoint).
         try:
-            gemini_data = generate_safe_reply(user_msg)
-            classification = gemini_data.get("fallback") if isinstance(gemini_data, dict) and gemini_data.get("fallback") else gemini_data
-            pd = classification.get("primary_destination") if isinstance(classification, dict) else None
-            if pd and pd.get("location"):
-                name = pd.get("location").strip()
-                desc = pd.get("description") or ""
-                city = pd.get("city") or pd.get("location_city") or pd.get("region") or name
-                country = pd.get("country") or pd.get("location_country")
-                best_time = pd.get("best_time_to_visit") or pd.get("best_time")
-                avg_cost = None
-                try:
-                    c = pd.get("average_cost") or pd.get("avg_cost") or pd.get("price")
-                    if c is not None:
-                        avg_cost = float(str(c).replace("$", "").replace(",", ""))
-                except Exception:
-                    avg_cost = None
-
-                rating = None
-                try:
-                    r = pd.get("rating")
-                    if r is not None:
-                        rating = float(r)
-                except Exception:
-                    rating = None
-
-                category = pd.get("category") or pd.get("type") or "city"
-                image_url = None
-                if isinstance(pd.get("image"), str) and pd.get("image"):
-                    image_url = pd.get("image")
-                else:
-                    image_url = f"https://source.unsplash.com/featured/?{name.replace(' ', '+')}"
-
-                lower_msg = (user_msg or "").lower()
-                desc_text = (desc or "").lower()
-                hotel_keywords = ["hotel", "stay", "accommodation", "booking", "book", "inn", "resort", "hostel", "bnb", "room", "suite"]
-                looks_like_hotel = any(k in lower_msg for k in hotel_keywords) or any(k in desc_text for k in hotel_keywords)
-
-                if looks_like_hotel:
-                    obj = Homes.objects.filter(location_name__iexact=name).first()
-                    if not obj:
-                        obj = Homes.objects.create(
-                            location_name=name,
-                            city=city,
-                            country=country,
-                            description=desc,
-                            category=category if category in dict(Homes.CATEGORY_CHOICES) else "city",
-                            best_time_to_visit=best_time,
-                            average_cost=avg_cost,
-                            rating=rating,
-                        )
-                        try:
-                            headers = {"User-Agent": "Mozilla/5.0"}
-                            resp = requests.get(image_url, headers=headers, timeout=10)
-                            if resp.status_code == 200 and resp.content:
-                                filename = f"{slugify(name)[:50]}.jpg"
-                                obj.location_image.save(filename, ContentFile(resp.content), save=True)
-                        except Exception:
-                            pass
-                else:
-                    obj = Location.objects.filter(location_name__iexact=name).first()
-                    if not obj:
-                        obj = Location.objects.create(
-                            location_name=name,
-                            city=city,
-                            country=country,
-                            description=desc,
-                            category=category if category in dict(Location.CATEGORY_CHOICES) else "city",
-                            best_time_to_visit=best_time,
-                            average_cost=avg_cost,
-                            rating=rating,
-                        )
-                        try:
-                            headers = {"User-Agent": "Mozilla/5.0"}
-                            resp = requests.get(image_url, headers=headers, timeout=10)
-                            if resp.status_code == 200 and resp.content:
-                                filename = f"{slugify(name)[:50]}.jpg"
-                                obj.location_image.save(filename, ContentFile(resp.content), save=True)
-                        except Exception:
-                            pass
+            persist_primary_destination(classification, user_msg)
         except Exception:
             # Non-fatal: keep chat flow working even if persistence fails
             pass
 
         return Response(
-            {
-                "conversation": ConversationSerializer(conversation).data,
-                "reply": reply_text,
-            },
+            chat_turn_payload(
+                conversation, [user_message, reply_message], reply_text, classification,
+                ser.validated_data["response_mode"],
+            ),
             status=status.HTTP_200_OK,
         )
 
+
+class MessageCursorPagination(CursorPagination):
+    page_size = 50
+    page_size_query_param = "limit"
+    max_page_size = 200
+    # newest first; following ``next`` walks back through older history
+    ordering = "-id"
+
+
+class ConversationMessagesView(ListAPIView):
+    """Cursor-paginated message history of one conversation, newest first."""
+    permission_classes = [permissions.AllowAny]
+    serializer_class = MessageSerializer
+    pagination_class = MessageCursorPagination
+
+    def get_queryset(self):
+        conversation = conversation_for_request(self.request, self.kwargs["pk"])
+        return Message.objects.filter(conversation=conversation)
+
+class ChatStreamView(APIView):
+    """Streaming variant of ChatView: relays reply tokens over Server-Sent Events.
+
+    Emits ``token`` events as text arrives, then persists the assistant Message and
+    sends a terminating ``done`` event carrying the conversation id. A stream that
+    fails before its first token saves no Message (``message_id`` is null).
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request):
+        ser = ChatRequestSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        conv_id = ser.validated_data.get("conversation_id")
+        user_msg = ser.validated_data["message"]
+        model_name = ser.validated_data.get("model_name") or "gemini-2.5-flash"
+
+        conversation = get_or_create_conversation(request, conv_id, model_name)
+        try:
+            user_message = conversation.append_message(
+                "user", user_msg, expected_seq=ser.validated_data.get("expected_seq")
+            )
+        except SequenceConflict as e:
+            return conflict_response(conversation, e)
+        history = build_context(conversation)
+
+        def event_stream():
+            parts = []
+            meta = {
+                "classification": heuristic_classify(user_msg),
+                "classification_source": "heuristic",
+                "reply_to_seq": user_message.seq,
+            }
+            call = LLMCall(conversation.model_name, "stream")
+            try:
+                for text in stream_chat_reply(history, model_name=conversation.model_name, call=call):
+                    parts.append(text)
+                    yield sse_event("token", {"text": text})
+            except Exception as e:
+                meta["error"] = str(e)
+                yield sse_event("error", {"error": str(e)})
+
+            reply_text = "".join(parts)
+            msg = None
+            if reply_text:
+                # a partial reply is kept with its error; an empty one would only pad the history
+                meta["llm"] = call.as_dict()
+                msg = conversation.append_message("assistant", reply_text, meta=meta)
+            yield sse_event("done", {
+                "conversation_id": conversation.id,
+                "message_id": msg.id if msg else None,
+                "seq": msg.seq if msg else None,
+                "reply": reply_text,
+            })
+
+        response = StreamingHttpResponse(event_stream(), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        # disable proxy buffering (nginx) so tokens reach the client immediately
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
 class ChatClassificationView(APIView):
     permission_classes = [permissions.AllowAny]
 
@@ -152,7 +362,12 @@ class ChatClassificationView(APIView):
         user_input = request.data.get("message", "")
         if not user_input:
             return Response({"error": "Message is required."}, status=400)
-        # First, get classification from the model (or fallback)
+        # Known places are answered from the in-memory gazetteer without calling the model
+        hit = resolve_destination(user_input)
+        if hit:
+            return Response(gazetteer_response(hit, request), status=status.HTTP_200_OK)
+
+        # Otherwise get the classification from the model (or fallback)
         gemini_data = generate_safe_reply(user_input)
 
         # If model returned an error, still try to proceed with any fallback it provided
@@ -162,139 +377,14 @@ class ChatClassificationView(APIView):
 
         # Build search terms from classification (use fallback if present)
         classification = gemini_data.get("fallback") if gemini_data.get("fallback") else gemini_data
-
-        search_terms = []
-        if "primary_destination" in classification:
-            main_loc = classification["primary_destination"].get("location")
-            if main_loc:
-                search_terms.append(main_loc)
-
-        for suggestion in classification.get("nearby_suggestions", []):
-            loc = suggestion.get("location")
-            if loc:
-                search_terms.append(loc)
-
-        # Only use DB lookups. We will not call any scrapers.
-        found_locations, found_homes = [], []
-
-        for term in search_terms:
-            loc = Location.objects.filter(
-                Q(location_name__icontains=term) |
-                Q(city__icontains=term)
-            ).first()
-            if loc:
-                found_locations.append(loc)
-
-            homes = Homes.objects.filter(
-                Q(city__icontains=term) | Q(location_name__icontains=term)
-            )
-            if homes.exists():
-                found_homes.extend(list(homes))
-
-        all_locations = list(dict.fromkeys(found_locations))
-        all_homes = list(dict.fromkeys(found_homes))
-
-        # If no locations/homes found in DB, persist a lightweight Location/Homes
-        # from the Gemini classification so future requests can return a real DB-backed card.
-        if not all_locations and not all_homes:
-            # classification variable contains either fallback or the raw gemini data
-            classified = gemini_data.get("fallback") if gemini_data.get("fallback") else gemini_data
-            pd = classified.get("primary_destination") if isinstance(classified, dict) else None
-            if pd and pd.get("location"):
-                name = pd.get("location").strip()
-                desc = pd.get("description") or ""
-                # Map additional generated fields from Gemini (if available)
-                city = pd.get("city") or pd.get("location_city") or pd.get("region") or name
-                country = pd.get("country") or pd.get("location_country")
-                best_time = pd.get("best_time_to_visit") or pd.get("best_time")
-                avg_cost = None
-                try:
-                    c = pd.get("average_cost") or pd.get("avg_cost") or pd.get("price")
-                    if c is not None:
-                        # Strip currency symbols and commas
-                        avg_cost = float(str(c).replace("$", "").replace(",", ""))
-                except Exception:
-                    avg_cost = None
-
-                rating = None
-                try:
-                    r = pd.get("rating")
-                    if r is not None:
-                        rating = float(r)
-                except Exception:
-                    rating = None
-
-                category = pd.get("category") or pd.get("type") or "city"
-
-                # Prefer image provided by Gemini; fallback to Unsplash source
-                image_url = None
-                if isinstance(pd.get("image"), str) and pd.get("image"):
-                    image_url = pd.get("image")
-                else:
-                    image_url = f"https://source.unsplash.com/featured/?{name.replace(' ', '+')}"
-
-                # Decide whether to create a Homes (hotel) or Location entry using a small heuristic
-                lower_msg = (request.data.get('message') or '').lower()
-                desc_text = (desc or '').lower()
-                hotel_keywords = ["hotel", "stay", "accommodation", "booking", "book", "inn", "resort", "hostel", "bnb", "room", "suite"]
-                looks_like_hotel = any(k in lower_msg for k in hotel_keywords) or any(k in desc_text for k in hotel_keywords)
-
-                created_obj = None
-                if looks_like_hotel:
-                    # Create Homes entry
-                    created_obj = Homes.objects.filter(location_name__iexact=name).first()
-                    if not created_obj:
-                        created_obj = Homes.objects.create(
-                            location_name=name,
-                            city=city,
-                            country=country,
-                            description=desc,
-                            category=category if category in dict(Homes.CATEGORY_CHOICES) else "city",
-                            best_time_to_visit=best_time,
-                            average_cost=avg_cost,
-                            rating=rating,
-                        )
-                        # Try to download image and attach
-                        try:
-                            headers = {"User-Agent": "Mozilla/5.0"}
-                            resp = requests.get(image_url, headers=headers, timeout=10)
-                            if resp.status_code == 200 and resp.content:
-                                filename = f"{slugify(name)[:50]}.jpg"
-                                created_obj.location_image.save(filename, ContentFile(resp.content), save=True)
-                        except Exception:
-                            pass
-                    if created_obj:
-                        all_homes.append(created_obj)
-                else:
-                    # Create Location entry
-                    created_obj = Location.objects.filter(location_name__iexact=name).first()
-                    if not created_obj:
-                        created_obj = Location.objects.create(
-                            location_name=name,
-                            city=city,
-                            country=country,
-                            description=desc,
-                            category=category if category in dict(Location.CATEGORY_CHOICES) else "city",
-                            best_time_to_visit=best_time,
-                            average_cost=avg_cost,
-                            rating=rating,
-                        )
-                        try:
-                            headers = {"User-Agent": "Mozilla/5.0"}
-                            resp = requests.get(image_url, headers=headers, timeout=10)
-                            if resp.status_code == 200 and resp.content:
-                                filename = f"{slugify(name)[:50]}.jpg"
-                                created_obj.location_image.save(filename, ContentFile(resp.content), save=True)
-                        except Exception:
-                            pass
-                    if created_obj:
-                        all_locations.append(created_obj)
+        all_locations, all_homes = match_catalog(classification, user_input)
 
         loc_data = LocationSerializer(all_locations, many=True, context={"request": request}).data
         home_data = HomesSerializer(all_homes, many=True, context={"request": request}).data
 
         return Response({
             "gemini_classification": gemini_data,
+            "classification_source": "llm",
             "matching_locations": loc_data,
             "matching_homes": home_data,
             # scrapers are disabled by design; return empty scraped lists
@@ -302,6 +392,47 @@ class ChatClassificationView(APIView):
             "auto_scraped_homes": [],
         }, status=status.HTTP_200_OK)
 
+class ChatBatchClassificationView(APIView):
+    """Classify a list of travel intents in one request.
+
+    Known places are resolved by the gazetteer; the rest are packed into as few
+    model calls as possible by ``classify_many``. Catalog rows are not looked up
+    or created here.
+    """
+    permission_classes = [permissions.AllowAny]
+    max_messages = 100
+
+    def post(self, request):
+        messages = request.data.get("messages")
+        if not isinstance(messages, list) or not messages:
+            return Response({"error": "messages must be a non-empty list."}, status=400)
+        if len(messages) > self.max_messages:
+            return Response({"error": f"At most {self.max_messages} messages per request."}, status=400)
+        messages = [str(m or "") for m in messages]
+
+        results = [None] * len(messages)
+        remaining = []
+        for i, message in enumerate(messages):
+            hit = resolve_destination(message) if message else None
+            if hit:
+                results[i] = (hit.classification, "gazetteer")
+            elif message:
+                remaining.append(i)
+            else:
+                results[i] = (heuristic_classify(message), "heuristic")
+
+        classified = classify_many([messages[i] for i in remaining])
+        for i, item in zip(remaining, classified):
+            results[i] = (item.classification, item.source)
+
+        return Response({
+            "results": [
+                {"message": message, "classification": classification, "classification_source": source}
+                for message, (classification, source) in zip(messages, results)
+            ],
+        }, status=status.HTTP_200_OK)
+
+
 class ChatSearchView(APIView):
     permission_classes = [permissions.AllowAny]
 
@@ -310,136 +441,80 @@ class ChatSearchView(APIView):
         if not user_input:
             return Response({"error": "Message is required."}, status=400)
 
+        hit = resolve_destination(user_input)
+        if hit:
+            return Response(gazetteer_response(hit), status=status.HTTP_200_OK)
+
         gemini_data = generate_safe_reply(user_input)
 
         if "error" in gemini_data:
             return Response({"error": gemini_data["error"]}, status=500)
 
-        search_terms = []
-        if "primary_destination" in gemini_data:
-            main_loc = gemini_data["primary_destination"].get("location")
-            if main_loc:
-                search_terms.append(main_loc)
-
-        for suggestion in gemini_data.get("nearby_suggestions", []):
-            loc = suggestion.get("location")
-            if loc:
-                search_terms.append(loc)
-
         # Only perform DB lookups; do not call scrapers. If nothing is found,
         # fall back to persisting the Gemini-generated primary_destination.
-        found_locations, found_homes = [], []
-
-        for term in search_terms:
-            loc = Location.objects.filter(
-                Q(location_name__icontains=term) |
-                Q(city__icontains=term)
-            ).first()
-            if loc:
-                found_locations.append(loc)
-
-            homes = Homes.objects.filter(
-                Q(city__icontains=term) | Q(location_name__icontains=term)
-            )
-            if homes.exists():
-                found_homes.extend(list(homes))
-
-        all_locations = list(dict.fromkeys(found_locations))
-        all_homes = list(dict.fromkeys(found_homes))
-
-        # If still empty, attempt to persist a synthetic record from gemini_data
-        if not all_locations and not all_homes:
-            classified = gemini_data.get("fallback") if gemini_data.get("fallback") else gemini_data
-            pd = classified.get("primary_destination") if isinstance(classified, dict) else None
-            if pd and pd.get("location"):
-                name = pd.get("location").strip()
-                desc = pd.get("description") or ""
-                city = pd.get("city") or pd.get("location_city") or pd.get("region") or name
-                country = pd.get("country") or pd.get("location_country")
-                best_time = pd.get("best_time_to_visit") or pd.get("best_time")
-                avg_cost = None
-                try:
-                    c = pd.get("average_cost") or pd.get("avg_cost") or pd.get("price")
-                    if c is not None:
-                        avg_cost = float(str(c).replace("$", "").replace(",", ""))
-                except Exception:
-                    avg_cost = None
-
-                rating = None
-                try:
-                    r = pd.get("rating")
-                    if r is not None:
-                        rating = float(r)
-                except Exception:
-                    rating = None
-
-                category = pd.get("category") or pd.get("type") or "city"
-                image_url = None
-                if isinstance(pd.get("image"), str) and pd.get("image"):
-                    image_url = pd.get("image")
-                else:
-                    image_url = f"https://source.unsplash.com/featured/?{name.replace(' ', '+')}"
-
-                lower_msg = (request.data.get('message') or '').lower()
-                desc_text = (desc or '').lower()
-                hotel_keywords = ["hotel", "stay", "accommodation", "booking", "book", "inn", "resort", "hostel", "bnb", "room", "suite"]
-                looks_like_hotel = any(k in lower_msg for k in hotel_keywords) or any(k in desc_text for k in hotel_keywords)
-
-                created_obj = None
-                if looks_like_hotel:
-                    created_obj = Homes.objects.filter(location_name__iexact=name).first()
-                    if not created_obj:
-                        created_obj = Homes.objects.create(
-                            location_name=name,
-                            city=city,
-                            country=country,
-                            description=desc,
-                            category=category if category in dict(Homes.CATEGORY_CHOICES) else "city",
-                            best_time_to_visit=best_time,
-                            average_cost=avg_cost,
-                            rating=rating,
-                        )
-                        try:
-                            headers = {"User-Agent": "Mozilla/5.0"}
-                            resp = requests.get(image_url, headers=headers, timeout=10)
-                            if resp.status_code == 200 and resp.content:
-                                filename = f"{slugify(name)[:50]}.jpg"
-                                created_obj.location_image.save(filename, ContentFile(resp.content), save=True)
-                        except Exception:
-                            pass
-                    if created_obj:
-                        all_homes.append(created_obj)
-                else:
-                    created_obj = Location.objects.filter(location_name__iexact=name).first()
-                    if not created_obj:
-                        created_obj = Location.objects.create(
-                            location_name=name,
-                            city=city,
-                            country=country,
-                            description=desc,
-                            category=category if category in dict(Location.CATEGORY_CHOICES) else "city",
-                            best_time_to_visit=best_time,
-                            average_cost=avg_cost,
-                            rating=rating,
-                        )
-                        try:
-                            headers = {"User-Agent": "Mozilla/5.0"}
-                            resp = requests.get(image_url, headers=headers, timeout=10)
-                            if resp.status_code == 200 and resp.content:
-                                filename = f"{slugify(name)[:50]}.jpg"
-                                created_obj.location_image.save(filename, ContentFile(resp.content), save=True)
-                        except Exception:
-                            pass
-                    if created_obj:
-                        all_locations.append(created_obj)
+        all_locations, all_homes = match_catalog(gemini_data, user_input)
 
         loc_data = LocationSerializer(all_locations, many=True).data
         home_data = HomesSerializer(all_homes, many=True).data
 
         return Response({
             "gemini_classification": gemini_data,
+            "classification_source": "llm",
             "matching_locations": loc_data,
             "matching_homes": home_data,
             "auto_scraped_locations": [],
             "auto_scraped_homes": [],
         }, status=status.HTTP_200_OK)
+
+
+_health = None          # (provider, expires_at, checks)
+_health_lock = threading.Lock()
+
+
+def cached_health_check(provider):
+    """``provider.health_check()``, reused for ``ASSISTANT_HEALTH_CACHE_SECONDS``."""
+    global _health
+    ttl = getattr(settings, "ASSISTANT_HEALTH_CACHE_SECONDS", 30)
+    with _health_lock:
+        if _health is not None and _health[0] is provider and time.monotonic() < _health[1]:
+            return _health[2]
+        # held while probing, so concurrent requests share one probe
+        checks = provider.health_check()
+        _health = (provider, time.monotonic() + ttl, checks)
+        return checks
+
+
+class LLMHealthView(MonitoringViewMixin, APIView):
+    """Report which configured Gemini models are loaded and reachable.
+
+    The model probe spends quota (``count_tokens`` per model), so its result is
+    reused for ``ASSISTANT_HEALTH_CACHE_SECONDS``.
+    """
+
+    def get(self, request):
+        registry = get_registry()
+        provider = get_provider()
+        checks = cached_health_check(provider)
+        healthy = bool(checks) and all(c["ok"] for c in checks.values())
+        return Response(
+            {
+                "healthy": healthy,
+                "provider": provider.name,
+                "loaded_models": registry.loaded_models(),
+                "models": checks,
+                "quota": quota_states(),
+            },
+            status=status.HTTP_200_OK if healthy else status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+
+
+class LLMMetricsView(MonitoringViewMixin, APIView):
+    """Expose per-call LLM metrics (latency, tokens, outcomes) in Prometheus text format.
+
+    Staff or the monitoring token only: model names and quota usage are internal.
+    """
+
+    def get(self, request):
+        stats = get_response_cache().stats()
+        gauges = {f"llm_response_cache_{name}": value for name, value in stats.items() if isinstance(value, (int, float))}
+        return HttpResponse(render_prometheus(extra_gauges=gauges), content_type="text/plain; version=0.0.4")
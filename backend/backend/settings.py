@@ -16,6 +16,98 @@ SECRET_KEY = env('SECRET_KEY')
 
 GEMINI_API_KEY = env('GEMINI_API_KEY', default='')
 
+# Gemini models built once per process by assistant.registry; warmed up at startup when enabled
+ASSISTANT_MODELS = env.list('GEMINI_MODELS', default=['gemini-2.0-flash', 'gemini-2.5-flash'])
+ASSISTANT_WARM_UP = env.bool('GEMINI_WARM_UP', default=False)
+
+# Chat context window: recent messages sent verbatim, older ones folded into a rolling summary
+ASSISTANT_CONTEXT = {
+    'RECENT_MESSAGES': env.int('CHAT_RECENT_MESSAGES', default=8),
+    'TOKEN_BUDGET': env.int('CHAT_TOKEN_BUDGET', default=2000),
+}
+
+# LLM provider: "gemini" for the real API, "replay" to serve recorded fixtures offline
+# (set LLM_RECORD=true with the gemini backend to capture fixtures)
+ASSISTANT_LLM_PROVIDER = {
+    'BACKEND': env('LLM_PROVIDER', default='gemini'),
+    'FIXTURES': env('LLM_FIXTURES', default=str(BASE_DIR / 'llm_fixtures.jsonl')),
+    'RECORD': env.bool('LLM_RECORD', default=False),
+    'MISS_POLICY': env('LLM_REPLAY_MISS_POLICY', default='error'),
+    'LATENCY': {
+        'DISTRIBUTION': env('LLM_REPLAY_LATENCY', default='none'),
+        'MEAN': env.float('LLM_REPLAY_LATENCY_MEAN', default=0.0),
+        'STDDEV': env.float('LLM_REPLAY_LATENCY_STDDEV', default=0.0),
+    },
+    'SEED': env.int('LLM_REPLAY_SEED', default=0),
+}
+
+# Health/metrics endpoints: staff JWT, or `Authorization: Bearer <token>` for scrapers (empty disables)
+ASSISTANT_MONITORING_TOKEN = env('MONITORING_TOKEN', default='')
+# The health endpoint's model probe spends quota; reuse its result this many seconds
+ASSISTANT_HEALTH_CACHE_SECONDS = env.int('LLM_HEALTH_CACHE_SECONDS', default=30)
+
+# Conversations idle this long are packed into compressed archives by `manage.py compact_conversations`
+ASSISTANT_ARCHIVE_IDLE_DAYS = env.int('CHAT_ARCHIVE_IDLE_DAYS', default=30)
+
+# In-memory gazetteer of catalog places; confident matches skip the model in classify/search
+ASSISTANT_GAZETTEER = {
+    'ENABLED': env.bool('GAZETTEER_ENABLED', default=True),
+    'MIN_CHARS': env.int('GAZETTEER_MIN_CHARS', default=3),
+    'REFRESH_SECONDS': env.int('GAZETTEER_REFRESH_SECONDS', default=300),
+    'BACKGROUND': env.bool('GAZETTEER_BACKGROUND', default=True),
+}
+
+# Batched catalog lookup for classification search terms (assistant.places)
+ASSISTANT_PLACE_RESOLVER = {
+    'LOCATIONS_PER_TERM': env.int('PLACES_LOCATIONS_PER_TERM', default=1),
+    'HOMES_PER_TERM': env.int('PLACES_HOMES_PER_TERM', default=10),
+    'NEGATIVE_TTL': env.int('PLACES_NEGATIVE_TTL', default=60),
+}
+
+# Read-through cache of catalog list/detail responses (Location.catalog_cache)
+LOCATION_CATALOG_CACHE = {
+    'ENABLED': env.bool('CATALOG_CACHE_ENABLED', default=True),
+    'BACKEND': env('CATALOG_CACHE_BACKEND', default='local'),
+    'MAX_ENTRIES': env.int('CATALOG_CACHE_MAX_ENTRIES', default=2048),
+    'TTL': env.int('CATALOG_CACHE_TTL', default=300),
+}
+
+# Resized image variants and blur placeholders (Location.images)
+LOCATION_IMAGES = {
+    'CACHE_DIR': env('IMAGE_CACHE_DIR', default='derived'),
+    'MAX_AGE': env.int('IMAGE_MAX_AGE', default=7 * 24 * 60 * 60),
+}
+
+# In-memory KD-tree behind the catalog /nearby/ endpoints (Location.geo)
+LOCATION_GEO_INDEX = {
+    'ENABLED': env.bool('GEO_INDEX_ENABLED', default=True),
+    'REFRESH_SECONDS': env.int('GEO_INDEX_REFRESH_SECONDS', default=600),
+    'MAX_PENDING': env.int('GEO_INDEX_MAX_PENDING', default=1000),
+    'BACKGROUND': env.bool('GEO_INDEX_BACKGROUND', default=True),
+}
+
+# Client-side Gemini quota guard (per model): token bucket + circuit breaker on quota errors
+ASSISTANT_LLM_QUOTA = {
+    'ENABLED': env.bool('LLM_QUOTA_ENABLED', default=True),
+    'REQUESTS_PER_MINUTE': env.int('LLM_QUOTA_RPM', default=60),
+    'BURST': env.int('LLM_QUOTA_BURST', default=10),
+    'MAX_WAIT': env.float('LLM_QUOTA_MAX_WAIT', default=0.25),
+    'FAILURE_THRESHOLD': env.int('LLM_QUOTA_FAILURE_THRESHOLD', default=3),
+    'RESET_TIMEOUT': env.float('LLM_QUOTA_RESET_TIMEOUT', default=30.0),
+}
+
+# Gemini response cache: "local" keeps an in-process LRU, "django" uses CACHES[CACHE_ALIAS]
+ASSISTANT_LLM_CACHE = {
+    'BACKEND': env('LLM_CACHE_BACKEND', default='local'),
+    'MAX_ENTRIES': env.int('LLM_CACHE_MAX_ENTRIES', default=1024),
+    'TTL': env.int('LLM_CACHE_TTL', default=3600),
+    'CACHE_ALIAS': env('LLM_CACHE_ALIAS', default='default'),
+    'ENABLED': env.bool('LLM_CACHE_ENABLED', default=True),
+    # identical concurrent prompts share one call; LOCK_DIR extends this across local processes
+    'COALESCE': env.bool('LLM_COALESCE', default=True),
+    'LOCK_DIR': env('LLM_COALESCE_LOCK_DIR', default=''),
+}
+
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = env('DEBUG')
 
@@ -82,6 +174,25 @@ DATABASES = {
     }
 }
 
+# Full-text/trigram search lookups used by Location.search
+if 'postgresql' in (DATABASES['default']['ENGINE'] or ''):
+    INSTALLED_APPS.append('django.contrib.postgres')
+
+# Background plan generation (planner.jobs)
+PLANNER_JOB_WORKERS = env.int('PLANNER_JOB_WORKERS', default=4)
+PLANNER_JOBS_EAGER = env.bool('PLANNER_JOBS_EAGER', default=False)
+PLANNER_JOB_SSE_TIMEOUT = env.int('PLANNER_JOB_SSE_TIMEOUT', default=120)
+# running jobs older than this are assumed lost to a restart
+PLANNER_JOB_STALE_SECONDS = env.int('PLANNER_JOB_STALE_SECONDS', default=900)
+
+# Validated itineraries reused across phrasings of the same (destination, days, budget bucket)
+PLANNER_PLAN_CACHE = {
+    'ENABLED': env.bool('PLAN_CACHE_ENABLED', default=True),
+    'BACKEND': env('PLAN_CACHE_BACKEND', default='local'),
+    'MAX_ENTRIES': env.int('PLAN_CACHE_MAX_ENTRIES', default=512),
+    'TTL': env.int('PLAN_CACHE_TTL', default=24 * 60 * 60),
+}
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
@@ -4,3 +4,14 @@ from django.apps import AppConfig
 class PlannerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'planner'
+
+    def ready(self):
+        from django.core.signals import request_started
+        from django.db.models.signals import m2m_changed
+        from .jobs import recover_on_first_request
+        from .models import Plan, plan_places_changed
+
+        for through in (Plan.locations.through, Plan.homes.through):
+            m2m_changed.connect(plan_places_changed, sender=through, dispatch_uid=f"plan_places_{through.__name__}")
+        # jobs queued in a previous process's thread pool are picked up again
+        request_started.connect(recover_on_first_request, dispatch_uid="planner_recover_jobs")
@@ -0,0 +1,41 @@
+# planner/async_views.py
+"""ASGI-native version of ``PlanViewSet.generate``."""
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views import View
+
+from assistant.async_views import aauthenticate, parse_json_body
+from assistant.services import agenerate_plan
+from .serializers import PlanSerializer
+from .views import save_generated_plan, build_fallback_plan
+from .plan_cache import agenerate_trip_plan, wants_plan_cache
+
+
+class AsyncPlanGenerateView(View):
+    """Awaits Gemini on the event loop; only plan persistence runs in a thread."""
+
+    async def post(self, request):
+        denied = await aauthenticate(request)
+        if denied:
+            return denied
+        data = parse_json_body(request) or {}
+        message = data.get("message")
+        if not message:
+            return JsonResponse({"error": "message is required"}, status=400)
+
+        try:
+            use_cache = wants_plan_cache(request, data)
+            plan_data = await agenerate_trip_plan(
+                message, lambda m: agenerate_plan(m, use_cache=use_cache), use_cache=use_cache
+            )
+
+            if request.user and request.user.is_authenticated:
+                def persist():
+                    plan = save_generated_plan(plan_data, request.user)
+                    return PlanSerializer(plan, context={'request': request}).data
+
+                return JsonResponse(await sync_to_async(persist)(), status=201)
+
+            return JsonResponse(plan_data)
+        except Exception as e:
+            return JsonResponse({"fallback": build_fallback_plan(message), "error": str(e)})
@@ -0,0 +1,193 @@
+# planner/jobs.py
+"""Background plan generation.
+
+``submit_plan_job`` records a ``PlanJob`` and hands it to a process-wide thread
+pool so ``POST /plans/generate/`` can return immediately. ``run_plan_job`` is the
+whole state machine and takes the generator as a parameter, so it can be driven
+synchronously with a stubbed LLM. Completion is signalled to in-process waiters
+(the SSE endpoint) through ``wait_for_job``; waiters in other processes fall back
+to polling the row.
+
+The pool lives in memory, so a restart loses whatever it had queued.
+``recover_plan_jobs`` runs once per process, on its first request: pending jobs
+are queued again (the guarded ``pending -> running`` transition keeps a job from
+running twice) and jobs left running for longer than ``PLANNER_JOB_STALE_SECONDS``
+are marked failed.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import PlanJob
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+# job id -> [event, number of threads waiting on it]; entries live only while someone waits
+_finished_events = {}
+_events_lock = threading.Lock()
+_recovered = False
+_recover_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "PLANNER_JOB_WORKERS", 4),
+                    thread_name_prefix="plan-job",
+                )
+    return _executor
+
+
+def _notify_finished(job_id):
+    with _events_lock:
+        entry = _finished_events.pop(str(job_id), None)
+    if entry is not None:
+        entry[0].set()
+
+
+def wait_for_job(job_id, timeout):
+    """Block until the job finishes in this process or ``timeout`` seconds pass.
+
+    A job that finishes in another process (or has already finished) is never
+    signalled here, so callers re-check the row after each wait.
+    """
+    key = str(job_id)
+    with _events_lock:
+        entry = _finished_events.get(key)
+        if entry is None:
+            entry = _finished_events[key] = [threading.Event(), 0]
+        entry[1] += 1
+    try:
+        return entry[0].wait(timeout)
+    finally:
+        with _events_lock:
+            entry[1] -= 1
+            # the last waiter out drops an entry nobody is going to notify
+            if entry[1] == 0 and _finished_events.get(key) is entry:
+                del _finished_events[key]
+
+
+def run_plan_job(job_id, generate=None, use_cache=None):
+    """Run one job to completion: pending -> running -> succeeded | failed.
+
+    ``generate`` defaults to ``assistant.services.generate_plan``. A job whose
+    generation fails still stores the deterministic fallback plan in ``result``.
+    ``use_cache`` defaults to the job's own ``use_cache``; False bypasses the
+    response and plan caches.
+    """
+    from .views import save_generated_plan, build_fallback_plan
+    from .serializers import PlanSerializer
+    from .plan_cache import generate_trip_plan
+
+    job = PlanJob.objects.select_related("user").get(pk=job_id)
+    # already picked up elsewhere (a requeued job can be queued twice)
+    if job.status != PlanJob.STATUS_PENDING or not job.transition(PlanJob.STATUS_RUNNING, started_at=timezone.now()):
+        return job
+    if use_cache is None:
+        use_cache = job.use_cache
+    if generate is None:
+        from assistant.services import generate_plan
+
+        def generate(message):
+            return generate_plan(message, use_cache=use_cache)
+
+    try:
+        plan_data = generate_trip_plan(job.message, generate, use_cache=use_cache)
+        if job.user is not None:
+            plan = save_generated_plan(plan_data, job.user)
+            job.transition(
+                PlanJob.STATUS_SUCCEEDED,
+                plan=plan,
+                result=PlanSerializer(plan).data,
+                finished_at=timezone.now(),
+            )
+        else:
+            job.transition(PlanJob.STATUS_SUCCEEDED, result=plan_data, finished_at=timezone.now())
+    except Exception as e:
+        logger.info("Plan job %s failed: %s", job_id, e)
+        job.transition(
+            PlanJob.STATUS_FAILED,
+            result={"fallback": build_fallback_plan(job.message)},
+            error=str(e),
+            finished_at=timezone.now(),
+        )
+    finally:
+        _notify_finished(job_id)
+    return job
+
+
+def _run_in_worker(job_id):
+    close_old_connections()
+    try:
+        run_plan_job(job_id)
+    except Exception:
+        logger.exception("Plan job %s crashed", job_id)
+    finally:
+        close_old_connections()
+
+
+def recover_plan_jobs(stale_after=None):
+    """Requeue pending jobs and fail running ones older than ``stale_after`` seconds.
+
+    Returns ``(requeued, failed)`` counts.
+    """
+    from .views import build_fallback_plan
+
+    if stale_after is None:
+        stale_after = getattr(settings, "PLANNER_JOB_STALE_SECONDS", 15 * 60)
+    requeued = failed = 0
+    for job_id in PlanJob.objects.filter(status=PlanJob.STATUS_PENDING).values_list("pk", flat=True):
+        _get_executor().submit(_run_in_worker, job_id)
+        requeued += 1
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    for job in PlanJob.objects.filter(status=PlanJob.STATUS_RUNNING, started_at__lt=cutoff):
+        if job.transition(
+            PlanJob.STATUS_FAILED,
+            result={"fallback": build_fallback_plan(job.message)},
+            error="Plan generation was interrupted by a server restart.",
+            finished_at=timezone.now(),
+        ):
+            _notify_finished(job.pk)
+            failed += 1
+    if requeued or failed:
+        logger.info("Recovered plan jobs: %d requeued, %d marked failed", requeued, failed)
+    return requeued, failed
+
+
+def recover_on_first_request(sender=None, **kwargs):
+    """``request_started`` handler: run ``recover_plan_jobs`` once in this process."""
+    global _recovered
+    if _recovered or getattr(settings, "PLANNER_JOBS_EAGER", False):
+        return
+    with _recover_lock:
+        if _recovered:
+            return
+        _recovered = True
+    try:
+        recover_plan_jobs()
+    except Exception:
+        # e.g. the table does not exist yet; never fail the request over it
+        logger.exception("Plan job recovery failed")
+
+
+def submit_plan_job(message, user=None, use_cache=True):
+    """Create a pending job and schedule it; runs inline when PLANNER_JOBS_EAGER is set."""
+    job = PlanJob.objects.create(
+        message=message, user=user if user and user.is_authenticated else None, use_cache=use_cache
+    )
+    if getattr(settings, "PLANNER_JOBS_EAGER", False):
+        run_plan_job(job.pk)
+        job.refresh_from_db()
+    else:
+        _get_executor().submit(_run_in_worker, job.pk)
+    return job
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('planner', '0002_planjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='planjob',
+            name='use_cache',
+            field=models.BooleanField(default=True),
+        ),
+    ]
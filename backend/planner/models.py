@@ -1,5 +1,8 @@
+import uuid
+
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from Location.models import Location, Homes
 
 
@@ -24,6 +27,88 @@ class Plan(models.Model):
 
     def __str__(self):
         return f"Plan: {self.title or self.user.email or self.user.username} ({self.created_at.date()})"
+
+
+def plan_places_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Bump ``Plan.updated_at`` when places are linked or unlinked (m2m_changed).
+
+    Adding a place does not save the plan itself, but it changes the serialized
+    plan, and ``updated_at`` feeds the plan's ETag / Last-Modified.
+    """
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if not reverse:
+        plans = Plan.objects.filter(pk=instance.pk)
+    elif action == "pre_clear":
+        # a place's own ``clear()``: its plans are only known before the links go
+        plans = instance.plans.all()
+    else:
+        plans = Plan.objects.filter(pk__in=pk_set)
+    plans.update(updated_at=timezone.now())
 from django.db import models
 
 # Create your models here.
+
+
+class PlanJob(models.Model):
+    """A background plan generation started by ``POST /plans/generate/`` in job mode.
+
+    The UUID primary key doubles as the polling capability for anonymous users.
+    Valid transitions are pending -> running -> succeeded | failed.
+    """
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+    ]
+    TRANSITIONS = {
+        STATUS_PENDING: {STATUS_RUNNING, STATUS_FAILED},
+        STATUS_RUNNING: {STATUS_SUCCEEDED, STATUS_FAILED},
+        STATUS_SUCCEEDED: set(),
+        STATUS_FAILED: set(),
+    }
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="plan_jobs", null=True, blank=True
+    )
+    message = models.TextField()
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    # Plan preview (anonymous), serialized saved Plan (authenticated) or {"fallback": ...}
+    result = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True, default="")
+    # the caller's wants_plan_cache() choice, kept so a requeued job honours it
+    use_cache = models.BooleanField(default=True)
+    plan = models.ForeignKey(Plan, on_delete=models.SET_NULL, null=True, blank=True, related_name="jobs")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"PlanJob {self.id} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_SUCCEEDED, self.STATUS_FAILED)
+
+    def transition(self, new_status, **fields):
+        """Move to ``new_status`` if allowed, guarding against concurrent updates.
+
+        Returns False when the job is no longer in the state this instance saw.
+        """
+        if new_status not in self.TRANSITIONS[self.status]:
+            raise ValueError(f"Invalid job transition {self.status} -> {new_status}")
+        updated = PlanJob.objects.filter(pk=self.pk, status=self.status).update(status=new_status, **fields)
+        if updated:
+            self.status = new_status
+            for name, value in fields.items():
+                setattr(self, name, value)
+        return bool(updated)
@@ -0,0 +1,183 @@
+# planner/plan_cache.py
+"""Cache of validated itineraries keyed on the trip rather than the prompt text.
+
+"5 days Manali 20000 budget" and "Plan 5 days in Manali, budget of Rs 18000"
+describe the same trip, so both map to ``TripKey("manali", 5, "16000-32000")``
+and the second request reuses the itinerary generated for the first. The
+destination is looked up in the catalog gazetteer (``assistant.gazetteer``);
+requests that do not name a known place are neither served from nor stored in
+the cache, so two trips can never share a key by accident. Only plans that
+passed ``normalize_generated_plan`` are stored. Pass ``cache=false`` on a
+request to skip the lookup; the freshly generated plan still replaces the
+cached one.
+"""
+import bisect
+import copy
+import threading
+from collections import namedtuple
+
+from django.conf import settings
+
+from assistant.cache import LocalBackend, DjangoCacheBackend, _MISSING
+from assistant.gazetteer import resolve_destination
+from assistant.services import extract_trip_params
+
+DEFAULT_PLAN_CACHE_SETTINGS = {
+    "ENABLED": True,
+    "BACKEND": "local",          # "local" (in-process LRU) or "django"
+    "CACHE_ALIAS": "default",
+    "MAX_ENTRIES": 512,
+    "TTL": 24 * 60 * 60,         # seconds, per entry
+    # budget bucket edges in rupees; a budget falls in [edge_i, edge_i+1)
+    "BUDGET_BUCKETS": [2000, 4000, 8000, 16000, 32000, 64000, 128000, 256000],
+}
+
+TripKey = namedtuple("TripKey", ["destination", "days", "budget_bucket"])
+
+
+def trip_destination(message):
+    """Catalog place(s) the message names, as a normalized phrase, or None.
+
+    Only gazetteer matches count: a word that merely looks like a place ("Plan",
+    "December") is not a destination. A trip naming several places is keyed on
+    all of them, in order.
+    """
+    hit = resolve_destination(message)
+    if hit is None:
+        return None
+    return "+".join(dict.fromkeys(m.phrase for m in hit.matches)) or None
+
+
+def budget_bucket(budget, edges) -> str:
+    if not budget:
+        return "any"
+    i = bisect.bisect_right(edges, budget)
+    if i == 0:
+        return f"0-{edges[0]}"
+    if i == len(edges):
+        return f"{edges[-1]}+"
+    return f"{edges[i - 1]}-{edges[i]}"
+
+
+def trip_key(message, edges=None):
+    """Return the ``TripKey`` for a plan request, or None when it has no recognisable destination."""
+    destination = trip_destination(message)
+    if not destination:
+        return None
+    days, budget = extract_trip_params(message)
+    edges = edges if edges is not None else DEFAULT_PLAN_CACHE_SETTINGS["BUDGET_BUCKETS"]
+    return TripKey(destination, days, budget_bucket(budget, edges))
+
+
+class PlanCache:
+    def __init__(self, backend, ttl=None, budget_buckets=None, enabled=True):
+        self.backend = backend
+        self.ttl = ttl
+        self.budget_buckets = sorted(budget_buckets or DEFAULT_PLAN_CACHE_SETTINGS["BUDGET_BUCKETS"])
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key_for(self, message):
+        trip = trip_key(message, self.budget_buckets)
+        if trip is None:
+            return None
+        return "plan:{}:{}:{}".format(trip.destination.replace(" ", "-"), trip.days, trip.budget_bucket)
+
+    def get(self, message):
+        """Return a copy of the cached plan for this trip, or None."""
+        key = self.key_for(message) if self.enabled else None
+        if key is None:
+            return None
+        value = self.backend.get(key)
+        with self._lock:
+            if value is _MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+        # callers may annotate or persist the plan; never hand out the cached object
+        return None if value is _MISSING else copy.deepcopy(value)
+
+    def set(self, message, plan_data, ttl=None):
+        key = self.key_for(message) if self.enabled else None
+        if key is not None:
+            self.backend.set(key, copy.deepcopy(plan_data), ttl if ttl is not None else self.ttl)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+def build_plan_cache(config=None) -> PlanCache:
+    conf = dict(DEFAULT_PLAN_CACHE_SETTINGS)
+    conf.update(config or {})
+    if conf["BACKEND"] == "django":
+        backend = DjangoCacheBackend(conf["CACHE_ALIAS"])
+    else:
+        backend = LocalBackend(max_entries=conf["MAX_ENTRIES"])
+    return PlanCache(backend, ttl=conf["TTL"], budget_buckets=conf["BUDGET_BUCKETS"], enabled=conf["ENABLED"])
+
+
+_plan_cache = None
+_plan_cache_lock = threading.Lock()
+
+
+def get_plan_cache() -> PlanCache:
+    """Return the process-wide plan cache, building it from settings on first use."""
+    global _plan_cache
+    if _plan_cache is None:
+        with _plan_cache_lock:
+            if _plan_cache is None:
+                _plan_cache = build_plan_cache(getattr(settings, "PLANNER_PLAN_CACHE", None))
+    return _plan_cache
+
+
+def wants_plan_cache(request, data=None) -> bool:
+    """False when the request opts out with ``cache=false`` (body or query string)."""
+    value = (data if data is not None else request.data).get("cache")
+    if value is None:
+        value = request.GET.get("cache")
+    if value is None:
+        return True
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() not in ("0", "false", "no", "off")
+
+
+def generate_trip_plan(message, generate, use_cache=True):
+    """Return a validated plan dict for ``message``, reusing a cached plan for the same trip.
+
+    ``generate(message)`` produces the raw model output; ``normalize_generated_plan``
+    errors (ValueError) propagate so callers can serve the fallback plan.
+    """
+    from .views import normalize_generated_plan
+
+    cache = get_plan_cache()
+    if use_cache:
+        cached = cache.get(message)
+        if cached is not None:
+            return cached
+    plan_data = normalize_generated_plan(generate(message))
+    cache.set(message, plan_data)
+    return plan_data
+
+
+async def agenerate_trip_plan(message, agenerate, use_cache=True):
+    """Async ``generate_trip_plan``; ``agenerate(message)`` returns an awaitable."""
+    from .views import normalize_generated_plan
+
+    cache = get_plan_cache()
+    if use_cache:
+        cached = cache.get(message)
+        if cached is not None:
+            return cached
+    plan_data = normalize_generated_plan(await agenerate(message))
+    cache.set(message, plan_data)
+    return plan_data
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Plan
+from .models import Plan, PlanJob
 from Location.serializers import LocationSerializer, HomesSerializer
 from Location.models import Location, Homes
 
@@ -31,4 +31,11 @@ class PlanCreateSerializer(serializers.ModelSerializer):
     """Used for creating plans: accepts raw itinerary JSON produced by Gemini."""
     class Meta:
         model = Plan
-        fields = ["title", "start_date", "end_date", "num_days", "summary", "itinerary"]
\ No newline at end of file
+        fields = ["title", "start_date", "end_date", "num_days", "summary", "itinerary"]
+
+
+class PlanJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PlanJob
+        fields = ["id", "status", "result", "error", "plan", "created_at", "started_at", "finished_at"]
+        read_only_fields = fields
@@ -1,3 +1,156 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.utils import timezone
+
+from . import jobs
+from .jobs import recover_plan_jobs, run_plan_job, wait_for_job
+from .models import Plan, PlanJob
+
+
+STUB_PLAN = {
+    "summary": "Two relaxed days in Goa",
+    "itinerary": [
+        {"day": 1, "activities": []},
+        {"day": 2, "activities": []},
+    ],
+}
+
+
+class PlanJobStateMachineTests(TestCase):
+    def setUp(self):
+        self.calls = []
+
+    def stub(self, plan=None, error=None):
+        def generate(message):
+            self.calls.append(message)
+            if error is not None:
+                raise error
+            return plan
+        return generate
+
+    def test_anonymous_job_succeeds_with_generated_plan(self):
+        job = PlanJob.objects.create(message="2 days in Goa")
+
+        run_plan_job(job.pk, generate=self.stub(STUB_PLAN), use_cache=False)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, PlanJob.STATUS_SUCCEEDED)
+        self.assertEqual(job.result, STUB_PLAN)
+        self.assertIsNotNone(job.started_at)
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(self.calls, ["2 days in Goa"])
+
+    def test_authenticated_job_saves_the_plan(self):
+        user = get_user_model().objects.create_user(email="traveller@example.com", name="Traveller", password="pw")
+        job = PlanJob.objects.create(message="2 days in Goa", user=user)
+
+        run_plan_job(job.pk, generate=self.stub(STUB_PLAN), use_cache=False)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, PlanJob.STATUS_SUCCEEDED)
+        self.assertEqual(Plan.objects.get(pk=job.plan_id).user, user)
+        self.assertEqual(job.result["id"], job.plan_id)
+
+    def test_failed_generation_stores_fallback(self):
+        job = PlanJob.objects.create(message="2 days in Goa")
+
+        run_plan_job(job.pk, generate=self.stub(error=RuntimeError("quota")), use_cache=False)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, PlanJob.STATUS_FAILED)
+        self.assertEqual(job.error, "quota")
+        self.assertIn("fallback", job.result)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_invalid_plan_schema_fails_the_job(self):
+        job = PlanJob.objects.create(message="2 days in Goa")
+
+        run_plan_job(job.pk, generate=self.stub({"text": "no itinerary"}), use_cache=False)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, PlanJob.STATUS_FAILED)
+
+    def test_finished_job_is_not_run_again(self):
+        job = PlanJob.objects.create(message="2 days in Goa", status=PlanJob.STATUS_SUCCEEDED)
+
+        run_plan_job(job.pk, generate=self.stub(STUB_PLAN), use_cache=False)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, PlanJob.STATUS_SUCCEEDED)
+        self.assertEqual(self.calls, [])
+
+    def test_transition_rejects_invalid_moves(self):
+        job = PlanJob.objects.create(message="2 days in Goa")
+
+        with self.assertRaises(ValueError):
+            job.transition(PlanJob.STATUS_SUCCEEDED)
+        self.assertTrue(job.transition(PlanJob.STATUS_RUNNING))
+        with self.assertRaises(ValueError):
+            job.transition(PlanJob.STATUS_PENDING)
+        self.assertTrue(job.transition(PlanJob.STATUS_FAILED))
+        for status in (PlanJob.STATUS_PENDING, PlanJob.STATUS_RUNNING, PlanJob.STATUS_SUCCEEDED):
+            with self.assertRaises(ValueError):
+                job.transition(status)
+
+    def test_transition_loses_to_a_concurrent_update(self):
+        job = PlanJob.objects.create(message="2 days in Goa")
+        stale = PlanJob.objects.get(pk=job.pk)
+        self.assertTrue(job.transition(PlanJob.STATUS_RUNNING))
+
+        self.assertFalse(stale.transition(PlanJob.STATUS_RUNNING))
+        self.assertEqual(stale.status, PlanJob.STATUS_PENDING)
+
+
+class PlanJobWaitTests(TestCase):
+    def test_waiting_on_a_finished_job_leaves_no_event_behind(self):
+        job = PlanJob.objects.create(message="2 days in Goa", status=PlanJob.STATUS_SUCCEEDED)
+
+        self.assertFalse(wait_for_job(job.pk, 0.01))
+        self.assertNotIn(str(job.pk), jobs._finished_events)
+
+    def test_finishing_a_job_drops_its_event(self):
+        job = PlanJob.objects.create(message="2 days in Goa")
+        run_plan_job(job.pk, generate=lambda message: STUB_PLAN, use_cache=False)
+
+        self.assertNotIn(str(job.pk), jobs._finished_events)
+
+
+class PlanJobRecoveryTests(TestCase):
+    def test_pending_jobs_are_requeued_and_stale_running_jobs_fail(self):
+        pending = PlanJob.objects.create(message="2 days in Goa")
+        stale = PlanJob.objects.create(
+            message="3 days in Manali", status=PlanJob.STATUS_RUNNING,
+            started_at=timezone.now() - timedelta(hours=1),
+        )
+        fresh = PlanJob.objects.create(
+            message="4 days in Kerala", status=PlanJob.STATUS_RUNNING, started_at=timezone.now(),
+        )
+        executor = mock.Mock()
+
+        with mock.patch.object(jobs, "_get_executor", return_value=executor):
+            requeued, failed = recover_plan_jobs(stale_after=600)
+
+        self.assertEqual((requeued, failed), (1, 1))
+        executor.submit.assert_called_once_with(jobs._run_in_worker, pending.pk)
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual(stale.status, PlanJob.STATUS_FAILED)
+        self.assertIn("fallback", stale.result)
+        self.assertEqual(fresh.status, PlanJob.STATUS_RUNNING)
+
+    def test_requeued_job_keeps_the_callers_cache_choice(self):
+        job = PlanJob.objects.create(message="2 days in Goa", use_cache=False)
+        executor = mock.Mock()
+        with mock.patch.object(jobs, "_get_executor", return_value=executor):
+            recover_plan_jobs(stale_after=600)
+        _, job_id = executor.submit.call_args.args
+
+        with mock.patch("assistant.services.generate_plan", return_value=STUB_PLAN) as generate:
+            run_plan_job(job_id)
 
-# Create your tests here.
+        generate.assert_called_once_with("2 days in Goa", use_cache=False)
+        job.refresh_from_db()
+        self.assertEqual(job.status, PlanJob.STATUS_SUCCEEDED)
@@ -1,10 +1,13 @@
 from rest_framework.routers import DefaultRouter
 from .views import PlanViewSet
+from .async_views import AsyncPlanGenerateView
 from django.urls import path, include
+from django.views.decorators.csrf import csrf_exempt
 
 router = DefaultRouter()
 router.register(r'plans', PlanViewSet, basename='plan')
 
 urlpatterns = [
+    path('plans/generate/async/', csrf_exempt(AsyncPlanGenerateView.as_view()), name='plan-generate-async'),
     path('', include(router.urls)),
 ]
@@ -16,12 +16,14 @@ function Home() {
   // Fetch both locations and homes
   const fetchData = async () => {
     try {
+      // only the first 10 of each are featured here; the full lists live on their own pages.
+      // placeholder=1 adds the blur placeholders the cards paint while images load
       const [locationsRes, homesRes] = await Promise.all([
-        API.get('/locations/'),
-        API.get('/homes/'),
+        API.get('/locations/', { params: { limit: 10, placeholder: 1 } }),
+        API.get('/homes/', { params: { limit: 10, placeholder: 1 } }),
       ]);
-      setLocations(locationsRes.data);
-      setHomes(homesRes.data);
+      setLocations(locationsRes.data.results ?? locationsRes.data);
+      setHomes(homesRes.data.results ?? homesRes.data);
     } catch (error) {
       console.error('Error fetching home data:', error);
     } finally {
@@ -88,16 +90,26 @@ function Home() {
               <div key={loc.id} className="location-card">
                 {loc.location_image && (
                   <div className="card-image-container">
-                    <img
-                      className="card-image"
-                      src={getImageUrl(loc.location_image)}
-                      alt={loc.location_name}
-                      loading="lazy"
-                      onError={(e) => {
-                        e.target.src = 'https://images.unsplash.com/photo-1469474968028-56623f02e42e';
-                        e.target.onerror = null;
-                      }}
-                    />
+                    <picture>
+                      {loc.image_srcset && (
+                        <>
+                          <source type="image/webp" srcSet={loc.image_srcset.webp} sizes="(max-width: 600px) 100vw, 320px" />
+                          <source type="image/jpeg" srcSet={loc.image_srcset.jpeg} sizes="(max-width: 600px) 100vw, 320px" />
+                        </>
+                      )}
+                      <img
+                        className="card-image"
+                        src={getImageUrl(loc.location_image)}
+                        style={loc.image_placeholder ? { backgroundImage: `url(${loc.image_placeholder})`, backgroundSize: 'cover' } : undefined}
+                        alt={loc.location_name}
+                        loading="lazy"
+                        onError={(e) => {
+                          e.target.parentNode.querySelectorAll('source').forEach((source) => source.remove());
+                          e.target.src = 'https://images.unsplash.com/photo-1469474968028-56623f02e42e';
+                          e.target.onerror = null;
+                        }}
+                      />
+                    </picture>
                   </div>
                 )}
                 <div className="card-content">
@@ -136,16 +148,26 @@ function Home() {
                 {home.location_image && (
                   <div className="card-image-wrapper">
                     <div className="card-image-container">
-                      <img
-                        className="card-image"
-                        src={getImageUrl(home.location_image)}
-                        alt={home.location_name}
-                        loading="lazy"
-                        onError={(e) => {
-                          e.target.src = 'https://images.unsplash.com/photo-1566073771259-6a8506099945';
-                          e.target.onerror = null;
-                        }}
-                      />
+                      <picture>
+                        {home.image_srcset && (
+                          <>
+                            <source type="image/webp" srcSet={home.image_srcset.webp} sizes="(max-width: 600px) 100vw, 320px" />
+                            <source type="image/jpeg" srcSet={home.image_srcset.jpeg} sizes="(max-width: 600px) 100vw, 320px" />
+                          </>
+                        )}
+                        <img
+                          className="card-image"
+                          src={getImageUrl(home.location_image)}
+                          style={home.image_placeholder ? { backgroundImage: `url(${home.image_placeholder})`, backgroundSize: 'cover' } : undefined}
+                          alt={home.location_name}
+                          loading="lazy"
+                          onError={(e) => {
+                            e.target.parentNode.querySelectorAll('source').forEach((source) => source.remove());
+                            e.target.src = 'https://images.unsplash.com/photo-1566073771259-6a8506099945';
+                            e.target.onerror = null;
+                          }}
+                        />
+                      </picture>
                     </div>
                     {home.category && (
                       <span className="card-badge">{home.category}</span>
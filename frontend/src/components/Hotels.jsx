@@ -7,6 +7,8 @@ import '../styles/hotels.css';
 function Hotels() {
   const [homes, setHomes] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextPage, setNextPage] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [selectedHome, setSelectedHome] = useState(null);
   const [checkInDate, setCheckInDate] = useState('');
   const [checkOutDate, setCheckOutDate] = useState('');
@@ -15,8 +17,10 @@ function Hotels() {
   // Fetch all hotels (homes)
   const fetchHomes = async () => {
     try {
-      const res = await API.get('/homes/');
-      setHomes(res.data);
+      // the next-page cursor URL keeps placeholder=1
+      const res = await API.get('/homes/', { params: { placeholder: 1 } });
+      setHomes(res.data.results ?? res.data);
+      setNextPage(res.data.next ?? null);
     } catch (error) {
       console.error('Error fetching homes:', error);
     } finally {
@@ -24,6 +28,21 @@ function Hotels() {
     }
   };
 
+  // Follow the next-page cursor and append its rows
+  const loadMore = async () => {
+    if (!nextPage || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const res = await API.get(nextPage);
+      setHomes((prev) => [...prev, ...(res.data.results ?? [])]);
+      setNextPage(res.data.next ?? null);
+    } catch (error) {
+      console.error('Error fetching more homes:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     fetchHomes();
   }, []);
@@ -82,20 +101,30 @@ function Hotels() {
               <div key={home.id} className="hotel-card">
                 <div className="card-image-container">
                   {home.location_image && (
-                    <img
-                      className="card-image"
-                      src={
-                        home.location_image.startsWith('http')
-                          ? home.location_image
-                          : `http://localhost:8000/media/locations/${home.location_image}`
-                      }
-                      alt={home.location_name}
-                      loading="lazy"
-                      onError={(e) => {
-                        e.target.src = '/placeholder-hotel.jpg';
-                        e.target.onerror = null;
-                      }}
-                    />
+                    <picture>
+                      {home.image_srcset && (
+                        <>
+                          <source type="image/webp" srcSet={home.image_srcset.webp} sizes="(max-width: 600px) 100vw, 320px" />
+                          <source type="image/jpeg" srcSet={home.image_srcset.jpeg} sizes="(max-width: 600px) 100vw, 320px" />
+                        </>
+                      )}
+                      <img
+                        className="card-image"
+                        src={
+                          home.location_image.startsWith('http')
+                            ? home.location_image
+                            : `http://localhost:8000/media/locations/${home.location_image}`
+                        }
+                        style={home.image_placeholder ? { backgroundImage: `url(${home.image_placeholder})`, backgroundSize: 'cover' } : undefined}
+                        alt={home.location_name}
+                        loading="lazy"
+                        onError={(e) => {
+                          e.target.parentNode.querySelectorAll('source').forEach((source) => source.remove());
+                          e.target.src = '/placeholder-hotel.jpg';
+                          e.target.onerror = null;
+                        }}
+                      />
+                    </picture>
                   )}
                   {home.category && (
                     <span className="card-badge">{home.category}</span>
@@ -151,6 +180,14 @@ function Hotels() {
           </div>
         )}
 
+        {!loading && nextPage && (
+          <div className="load-more">
+            <button className="button" onClick={loadMore} disabled={loadingMore}>
+              {loadingMore ? 'Loading...' : 'Load more hotels'}
+            </button>
+          </div>
+        )}
+
         {/* Booking Modal */}
         {selectedHome && (
           <div className="booking-overlay">
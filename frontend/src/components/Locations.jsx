@@ -7,6 +7,8 @@ import '../styles/locations.css';
 function Locations() {
   const [locations, setLocations] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextPage, setNextPage] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [selectedLocation, setSelectedLocation] = useState(null);
   const [travelDate, setTravelDate] = useState('');
   const [numberOfPeople, setNumberOfPeople] = useState(1);
@@ -14,12 +16,15 @@ function Locations() {
   const fetchLocations = async () => {
     try {
       const res = await API.get('/locations/');
-      console.log('Locations data:', res.data);
+      // the list is cursor-paginated: { next, previous, results }
+      const rows = res.data.results ?? res.data;
+      console.log('Locations data:', rows);
       // Log the first location's image path for debugging
-      if (res.data.length > 0) {
-        console.log('First location image path:', res.data[0].location_image);
+      if (rows.length > 0) {
+        console.log('First location image path:', rows[0].location_image);
       }
-      setLocations(res.data);
+      setLocations(rows);
+      setNextPage(res.data.next ?? null);
     } catch (error) {
       console.error('Error fetching locations:', error);
     } finally {
@@ -27,6 +32,21 @@ function Locations() {
     }
   };
 
+  // Follow the next-page cursor and append its rows
+  const loadMore = async () => {
+    if (!nextPage || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const res = await API.get(nextPage);
+      setLocations((prev) => [...prev, ...(res.data.results ?? [])]);
+      setNextPage(res.data.next ?? null);
+    } catch (error) {
+      console.error('Error fetching more locations:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     fetchLocations();
   }, []);
@@ -151,6 +171,14 @@ function Locations() {
           </div>
         )}
 
+        {!loading && nextPage && (
+          <div className="load-more">
+            <button className="button" onClick={loadMore} disabled={loadingMore}>
+              {loadingMore ? 'Loading...' : 'Load more destinations'}
+            </button>
+          </div>
+        )}
+
         {/* Booking Modal */}
         {selectedLocation && (
           <div className="booking-overlay">